@@ -0,0 +1,251 @@
+# access_log.py - Streaming Nginx/Apache Access Log Ingestion
+import gzip
+import io
+import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+
+# Configuration (override with environment variables)
+VISITOR_LOG_PATH = os.environ.get('VISITOR_LOG_PATH', '')  # combined-format log, plain or gzip; empty uses sample data
+VISITOR_LOG_MAX_HITS = int(os.environ.get('VISITOR_LOG_MAX_HITS', 100000))  # most recent hits kept from a gzip log
+VISITOR_LOG_TAIL = os.environ.get('VISITOR_LOG_TAIL', '0') == '1'  # refresh the visitor section on a timer
+VISITOR_TAIL_REFRESH = float(os.environ.get('VISITOR_TAIL_REFRESH', 10))  # seconds between live refreshes
+VISITOR_TAIL_CAPACITY = int(os.environ.get('VISITOR_TAIL_CAPACITY', VISITOR_LOG_MAX_HITS))
+CHUNK_SIZE = 1 << 20
+
+# Combined log format; the trailing referer/user agent are optional so common-format logs parse too.
+# Lines stay bytes until they match, so dropped lines are never decoded
+LOG_LINE = re.compile(
+    rb'(?P<ip>[0-9A-Fa-f.:]+) \S+ \S+ \[(?P<time>[^\]]+)\] '
+    rb'"(?P<method>[A-Z]+) (?P<path>[^ "?#]*)[^ "]* [^"]*" (?P<status>\d{3}) \S+'
+    rb'(?: "[^"]*" "(?P<agent>[^"]*)")?'
+)
+# Static assets are recognized by extension or directory (cheaper than a second regex per hit)
+STATIC_EXTENSIONS = frozenset(
+    b'css js mjs map png jpg jpeg gif svg ico webp avif bmp woff woff2 ttf otf eot mp4 webm txt xml'.split()
+)
+STATIC_PREFIXES = (b'/static/', b'/assets/', b'/wp-content/', b'/wp-includes/', b'/_next/', b'/images/', b'/fonts/')
+MONTHS = {month.encode(): number for number, month in enumerate(
+    ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'], 1
+)}
+
+
+def open_log(path):
+    """Open a log for binary reading, decompressing gzip files (detected by magic bytes)"""
+    with open(path, 'rb') as f:
+        gzipped = f.read(2) == b'\x1f\x8b'
+    return gzip.open(path, 'rb') if gzipped else open(path, 'rb')
+
+
+def iter_chunks(f, chunk_size=CHUNK_SIZE):
+    """Yield blocks of complete lines; the partial last line is carried into the next block"""
+    tail = b''
+    while True:
+        block = f.read(chunk_size)
+        if not block:
+            if tail:
+                yield tail
+            return
+        block = tail + block
+        end = block.rfind(b'\n') + 1
+        if end:
+            tail = block[end:]
+            yield block[:end]
+        else:
+            tail = block
+
+
+def is_static(path):
+    return path[path.rfind(b'.') + 1:].lower() in STATIC_EXTENSIONS or path.startswith(STATIC_PREFIXES)
+
+
+def parse_log_time(text):
+    """'30/Jul/2025:14:30:15 +0000' -> '2025-07-30 14:30:15' (the server's local time, as logged)"""
+    month = MONTHS.get(text[3:6])
+    if month is None or len(text) < 20:
+        return None
+    return f"{text[7:11].decode()}-{month:02d}-{text[0:2].decode()} {text[12:20].decode()}"
+
+
+def iter_hits(f, chunk_size=CHUNK_SIZE, stats=None):
+    """Yield (ip, timestamp, page, status, user_agent) for each page hit in a binary log stream
+
+    Static assets and unparseable lines are dropped. Only one chunk is held
+    in memory at a time. If given, stats counts 'lines', 'hits', 'static'
+    and 'malformed'.
+    """
+    stats = stats if stats is not None else {}
+    for key in ('lines', 'hits', 'static', 'malformed'):
+        stats.setdefault(key, 0)
+    last_time = timestamp = None  # Consecutive lines mostly share a second
+
+    for chunk in iter_chunks(f, chunk_size):
+        lines = chunk.split(b'\n')
+        if not lines[-1]:
+            lines.pop()
+        matched = static = 0
+        for match in map(LOG_LINE.match, lines):
+            if match is None:
+                continue
+            matched += 1
+            ip, raw_time, _method, path, status, agent = match.groups()
+            if is_static(path):
+                static += 1
+                continue
+            if raw_time != last_time:
+                last_time, timestamp = raw_time, parse_log_time(raw_time)
+            yield (
+                ip.decode('ascii'), timestamp, path.decode('utf-8', 'replace') or '/',
+                int(status), agent.decode('utf-8', 'replace') if agent else ''
+            )
+        stats['lines'] += len(lines)
+        stats['hits'] += matched - static
+        stats['static'] += static
+        stats['malformed'] += len(lines) - matched
+
+
+def recent_hits(path, max_hits=VISITOR_LOG_MAX_HITS, stats=None):
+    """Stream a log and keep only its last max_hits page hits, oldest first"""
+    with open_log(path) as f:
+        return list(deque(iter_hits(f, stats=stats), maxlen=max_hits))
+
+
+class LogTailer:
+    """Follow a plain-text log like tail -F, returning only newly appended complete lines
+
+    Rotation (the path now names a different file) is handled by draining
+    the old file before switching to the new one from its start; truncation
+    in place (copytruncate) restarts from the beginning. A partial last line
+    is held back until its newline arrives.
+
+    position and identity (the file's inode) resume a previous read, e.g.
+    from a persisted watermark; they are ignored if the path now names a
+    different file or one shorter than position.
+    """
+
+    def __init__(self, path, chunk_size=CHUNK_SIZE, position=0, identity=None):
+        self.path = str(path)
+        self.chunk_size = chunk_size
+        self.position = 0
+        self.identity = None
+        self._f = None
+        self._partial = b''
+        self._resume = (position, identity) if position else None
+
+    @property
+    def consumed(self):
+        """Bytes of the current file returned as complete lines (where the next read resumes)"""
+        return self.position - len(self._partial)
+
+    def _open(self):
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            return False
+        if f.read(2) == b'\x1f\x8b':
+            f.close()
+            raise ValueError(f'{self.path} is gzip-compressed and cannot be followed')
+        stat = os.fstat(f.fileno())
+        position, self._resume = (self._resume or (0, None)), None
+        position = position[0] if position[1] == stat.st_ino and position[0] <= stat.st_size else 0
+        f.seek(position)
+        self._f, self.identity, self.position, self._partial = f, stat.st_ino, position, b''
+        return True
+
+    def _drain(self, limit):
+        """Read up to limit bytes of what was appended to the open file, split at the last newline"""
+        block = self._f.read(limit)
+        self.position += len(block)
+        block = self._partial + block
+        end = block.rfind(b'\n') + 1
+        self._partial = block[end:]
+        return block[:end]
+
+    def read(self, limit=64 << 20):
+        """New complete lines since the last call (at most about limit bytes per call)"""
+        if self._f is None and not self._open():
+            return b''
+
+        if os.fstat(self._f.fileno()).st_size < self.position:
+            # Truncated in place; whatever was written since belongs to the new content
+            self._f.seek(0)
+            self.position, self._partial = 0, b''
+        start = self.position
+        lines = self._drain(limit)
+        drained = self.position - start < limit
+
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return lines  # Rotated away and not recreated yet; keep reading the old file
+        if stat.st_ino != self.identity and drained:
+            # Rotated: the old file is fully drained, continue with the new one
+            tail = self._partial
+            self._f.close()
+            self._f = None
+            if tail:
+                lines += tail + b'\n'
+            if self._open():
+                lines += self._drain(limit)
+        return lines
+
+    def close(self):
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+
+class LiveVisitorLog:
+    """Tail an access log into a fixed-capacity ring buffer of page hits
+
+    refresh() parses only the bytes appended since the previous call, so
+    the file is never re-read, and the buffer drops the oldest hits once
+    full, so memory stays flat however long the dashboard runs. version
+    increases whenever new hits arrive, for caching what's derived from them.
+    """
+
+    def __init__(self, path, capacity=VISITOR_TAIL_CAPACITY):
+        self.tailer = LogTailer(path)
+        self.buffer = deque(maxlen=capacity)
+        self.stats = {}
+        self.version = 0
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Append newly logged page hits to the buffer; returns how many arrived"""
+        with self._lock:
+            added = 0
+            while True:
+                lines = self.tailer.read()
+                if not lines:
+                    break
+                before = self.stats.get('hits', 0)
+                self.buffer.extend(iter_hits(io.BytesIO(lines), stats=self.stats))
+                added += self.stats['hits'] - before
+            if added:
+                self.version += 1
+            return added
+
+    def hits(self):
+        """Snapshot of the buffered hits, oldest first"""
+        with self._lock:
+            return list(self.buffer)
+
+
+if __name__ == '__main__':
+    # Throughput check: python access_log.py access.log[.gz] ...
+    for log_path in sys.argv[1:]:
+        counts = {}
+        start = time.perf_counter()
+        with open_log(log_path) as log:
+            for _ in iter_hits(log, stats=counts):
+                pass
+        elapsed = time.perf_counter() - start
+        print(
+            f"{log_path}: {counts['lines']:,} lines in {elapsed:.2f}s "
+            f"({counts['lines'] / max(elapsed, 1e-9):,.0f} lines/s), {counts['hits']:,} page hits, "
+            f"{counts['static']:,} static, {counts['malformed']:,} malformed"
+        )
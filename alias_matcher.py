@@ -0,0 +1,100 @@
+# alias_matcher.py - Aho-Corasick Company Alias Matcher
+import json
+import os
+from collections import deque
+from pathlib import Path
+
+COMPANY_ALIASES_PATH = os.environ.get(
+    'COMPANY_ALIASES_PATH', str(Path(__file__).parent / 'company_aliases.json')
+)
+
+
+class AliasMatcher:
+    """Aho-Corasick automaton finding every company alias in a string in one pass
+
+    aliases maps a company key to its alias strings. When several companies
+    match the same organization name (e.g. "United" and "Delta" both appear),
+    keys listed earlier in the mapping win. normalize is applied to aliases
+    and searched text alike; with whole_words, matches must start and end on
+    word boundaries so 'united' no longer matches inside 'unitedhealth'.
+    """
+
+    def __init__(self, aliases, normalize=str.lower, whole_words=False):
+        self.aliases = {key: list(values) for key, values in aliases.items()}
+        self.keys = list(aliases)
+        self.normalize = normalize
+        self.whole_words = whole_words
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]  # state -> [(priority, alias length)]
+
+        for priority, key in enumerate(self.keys):
+            for alias in aliases[key]:
+                alias = normalize(alias)
+                if alias:
+                    self._add(alias, priority)
+        self._build_failure_links()
+
+    def _add(self, alias, priority):
+        state = 0
+        for char in alias:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append((priority, len(alias)))
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                # Inherit matches that end at the same position via the failure link
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def _scan(self, text):
+        """Yield (priority, start, end) for every alias occurrence in text"""
+        goto, fail, output = self._goto, self._fail, self._output
+        text = self.normalize(text)
+        state = 0
+
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for priority, length in output[state]:
+                start, end = position + 1 - length, position + 1
+                if self.whole_words and (
+                    (start > 0 and text[start - 1].isalnum()) or (end < len(text) and text[end].isalnum())
+                ):
+                    continue
+                yield priority, start, end
+
+    def find_all(self, text):
+        """Return every alias occurrence as (start, end, key) in the normalized text"""
+        return [(start, end, self.keys[priority]) for priority, start, end in self._scan(text)]
+
+    def matches(self, text):
+        """Return the matched company keys, best first"""
+        found = {priority for priority, _, _ in self._scan(text)}
+        return [self.keys[priority] for priority in sorted(found)]
+
+    def match(self, text):
+        """Return the highest-priority company key found in text, or None"""
+        found = self.matches(text)
+        return found[0] if found else None
+
+
+def load_alias_matcher(path=None, normalize=str.lower, whole_words=False):
+    """Build the alias automaton from the company aliases JSON file"""
+    with open(path or COMPANY_ALIASES_PATH, 'r', encoding='utf-8') as f:
+        return AliasMatcher(json.load(f), normalize=normalize, whole_words=whole_words)
@@ -0,0 +1,109 @@
+# benchmark_contacts_db.py - Cold-Start Benchmark: JSON vs Binary Snapshot
+"""Compare contacts DB cold-start time for the JSON export and the mmap snapshot
+
+Usage: python benchmark_contacts_db.py [sizes...] [--workdir DIR] [--json-limit N]
+
+Sizes default to 10k, 1M and 10M contacts. Each load runs in a fresh
+interpreter so nothing is warm in-process; the OS page cache is not
+dropped. --json-limit skips the JSON load above N contacts (10M contacts
+need well over 10 GB of RAM to json.load).
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import contacts_store
+
+SENIORITIES = ['C-Level', 'VP-Level', 'Director', 'Manager']
+DEPARTMENTS = ['Executive', 'Operations', 'Engineering', 'Supply Chain', 'Sales', 'Procurement']
+CONTACTS_PER_COMPANY = 200
+
+# Imports happen before the clock starts; only opening the data is timed
+COLD_START = '''
+import json, sys, time
+import contacts_store
+start = time.perf_counter()
+if sys.argv[1] == 'json':
+    with open(sys.argv[2], 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    first = next(iter(data))
+    contact = data[first][0]
+else:
+    store = contacts_store.SnapshotContactsStore(sys.argv[2])
+    first = next(iter(store))
+    contact = store.get_contacts(first, [0])[0]
+print(time.perf_counter() - start)
+'''
+
+
+def write_synthetic_export(path, contacts):
+    """Write a {company: [contacts]} export of the given size without holding it in memory"""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{')
+        for start in range(0, contacts, CONTACTS_PER_COMPANY):
+            company = start // CONTACTS_PER_COMPANY
+            records = ','.join(
+                json.dumps({
+                    'name': f'Contact {n}',
+                    'title': f'{SENIORITIES[n % 4]} {DEPARTMENTS[n % 6]}',
+                    'email': f'contact.{n}@company{company}.com',
+                    'phone': f'+1-555-{n % 10000:04d}',
+                    'linkedin': f'linkedin.com/in/contact{n}',
+                    'department': DEPARTMENTS[n % 6],
+                    'seniority': SENIORITIES[n % 4]
+                })
+                for n in range(start, min(start + CONTACTS_PER_COMPANY, contacts))
+            )
+            f.write(f'{"," if company else ""}"company{company}":[{records}]')
+        f.write('}')
+
+
+def cold_start(kind, path):
+    """Seconds to open the database and read one contact in a fresh interpreter"""
+    result = subprocess.run(
+        [sys.executable, '-c', COLD_START, kind, path],
+        capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    return float(result.stdout)
+
+
+def parse_size(text):
+    multipliers = {'k': 1000, 'm': 1000000}
+    suffix = text[-1].lower()
+    return int(float(text[:-1]) * multipliers[suffix]) if suffix in multipliers else int(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('sizes', nargs='*', default=['10k', '1M', '10M'])
+    parser.add_argument('--workdir', default=None, help='Directory for generated files (default: temporary)')
+    parser.add_argument('--json-limit', type=parse_size, default=None)
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='contacts-bench-')
+    print(f"{'contacts':>10} {'json MB':>9} {'snap MB':>9} {'build s':>8} {'json load s':>12} {'snapshot s':>11}")
+    for size in map(parse_size, args.sizes):
+        json_path = os.path.join(workdir, f'contacts_{size}.json')
+        snapshot_path = os.path.join(workdir, f'contacts_{size}.snap')
+        if not os.path.exists(json_path):
+            write_synthetic_export(json_path, size)
+
+        start = time.perf_counter()
+        contacts_store.build_contacts_snapshot(json_path, snapshot_path)
+        build_time = time.perf_counter() - start
+
+        json_time = '-' if args.json_limit is not None and size > args.json_limit else f"{cold_start('json', json_path):.3f}"
+        snapshot_time = cold_start('snapshot', snapshot_path)
+        print(
+            f'{size:>10,} {os.path.getsize(json_path) / 1e6:>9.1f} {os.path.getsize(snapshot_path) / 1e6:>9.1f} '
+            f'{build_time:>8.1f} {json_time:>12} {snapshot_time:>11.3f}'
+        )
+
+
+if __name__ == '__main__':
+    main()
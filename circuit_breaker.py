@@ -0,0 +1,85 @@
+# circuit_breaker.py - Circuit Breaker for Slow or Failing Providers
+import threading
+import time
+from collections import deque
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+
+class CircuitBreaker:
+    """Stop calling a provider after repeated failures or a p95 latency breach
+
+    While open, callers should answer from local data. After reset_timeout a
+    single probe request is let through (half-open); its outcome closes the
+    breaker again or re-opens it for another reset_timeout.
+    """
+
+    def __init__(self, failure_threshold=5, latency_threshold=2.0, latency_window=20, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.latency_threshold = latency_threshold
+        self.reset_timeout = reset_timeout
+        self.min_samples = max(1, latency_window // 2)
+        self._latencies = deque(maxlen=latency_window)
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self.state = CLOSED
+        self.last_trip_reason = None
+
+    def allow(self):
+        """Return True if a provider call may be made now"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                self._probing = False
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self, latency=None):
+        """Record a successful call; latency is None for calls that shouldn't count (e.g. batches)"""
+        with self._lock:
+            if latency is not None:
+                self._latencies.append(latency)
+            self._failures = 0
+            if self.state == HALF_OPEN:
+                if latency is not None and latency > self.latency_threshold:
+                    self._trip(f'probe took {latency:.1f}s')
+                else:
+                    self.state = CLOSED
+                    self._latencies.clear()
+                    self._probing = False
+                return
+
+            p95 = self.p95_latency()
+            if p95 is not None and p95 > self.latency_threshold:
+                self._trip(f'p95 latency {p95:.1f}s over {self.latency_threshold:.1f}s')
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == HALF_OPEN:
+                self._trip('probe failed')
+            elif self._failures >= self.failure_threshold:
+                self._trip(f'{self._failures} consecutive failures')
+
+    def p95_latency(self):
+        """p95 of the recent latency window, or None until enough samples are in"""
+        if len(self._latencies) < self.min_samples:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+    def _trip(self, reason):
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self._probing = False
+        self._failures = 0
+        self._latencies.clear()
+        self.last_trip_reason = reason
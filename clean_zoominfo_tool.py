@@ -1,8 +1,18 @@
 # clean_zoominfo_tool.py - IP-to-ZoomInfo Lead Generator
 import streamlit as st
-import requests
 import json
+import os
 from datetime import datetime
+from pathlib import Path
+
+import alias_matcher
+import ip_resolver
+import provider_resources
+
+# Alias file for the demo company profiles below (same format as company_aliases.json)
+DEMO_COMPANY_ALIASES_PATH = os.environ.get(
+    'DEMO_COMPANY_ALIASES_PATH', str(Path(__file__).parent / 'demo_company_aliases.json')
+)
 
 st.set_page_config(
     page_title="IP-to-ZoomInfo Lead Generator",
@@ -57,29 +67,31 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
+# Resolver, cache, HTTP client, coalescer, breaker and limiter are process-wide (provider_resources)
 def get_company_from_ip(ip_address):
     """Convert IP to Company"""
-    try:
-        response = requests.get(f"http://ip-api.com/json/{ip_address}", timeout=5)
-        data = response.json()
-        
-        if data.get('org'):
-            return {
-                'success': True,
-                'ip': ip_address,
-                'organization': data['org'],
-                'city': data.get('city', 'Unknown'),
-                'region': data.get('regionName', 'Unknown'),
-                'country': data.get('country', 'Unknown'),
-                'isp': data.get('isp', 'Unknown')
-            }
-        return {'success': False, 'error': 'No company found'}
-    except Exception as e:
-        return {'success': False, 'error': str(e)}
+    return ip_resolver.resolve_ip(
+        ip_address,
+        resolver=provider_resources.load_ip_resolver(),
+        cache=provider_resources.load_ip_cache(),
+        client=provider_resources.get_http_client(),
+        coalescer=provider_resources.get_ip_coalescer(),
+        breaker=provider_resources.get_ip_breaker(),
+        limiter=provider_resources.get_ip_limiter(),
+        timeout=5
+    )
+
+# Demo profiles are matched with the same alias automaton the main dashboard uses
+@st.cache_resource
+def get_alias_matcher():
+    """Build the Aho-Corasick matcher for the demo company profiles"""
+    return alias_matcher.load_alias_matcher(DEMO_COMPANY_ALIASES_PATH)
 
 def search_zoominfo(company_name):
     """Simulate ZoomInfo search"""
-    if 'microsoft' in company_name.lower():
+    company_key = get_alias_matcher().match(company_name)
+    
+    if company_key == 'microsoft':
         return {
             'success': True,
             'company': {
@@ -106,7 +118,7 @@ def search_zoominfo(company_name):
                 }
             ]
         }
-    elif 'google' in company_name.lower():
+    elif company_key == 'google':
         return {
             'success': True,
             'company': {
@@ -213,6 +225,9 @@ if analyze_btn and ip_input:
         </div>
         """, unsafe_allow_html=True)
         
+        if company_result.get('degraded'):
+            st.warning("⚠️ Degraded path: cached answer used while the geolocation provider is unavailable")
+        
         # Step 2: ZoomInfo lookup
         with st.spinner("🔍 Step 2: Searching ZoomInfo for contacts..."):
             zoominfo_result = search_zoominfo(organization)
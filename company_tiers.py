@@ -0,0 +1,52 @@
+# company_tiers.py - Data-Driven Company Tier Table
+import json
+import os
+from pathlib import Path
+
+COMPANY_TIERS_PATH = os.environ.get(
+    'COMPANY_TIERS_PATH', str(Path(__file__).parent / 'company_tiers.json')
+)
+
+TIER_FIELDS = [
+    'lead_score', 'priority', 'score', 'revenue_potential', 'revenue_range', 'conversion_range',
+    'cost_range', 'contact_confidence', 'updated_days', 'verified_above', 'match_rates'
+]
+
+
+class TierTable:
+    """Scoring, revenue, conversion and cost parameters per company tier
+
+    Companies map to a tier by their canonical key; matched aviation keys
+    without an entry use default_tier and unmatched organizations use
+    generic_tier.
+    """
+
+    def __init__(self, data):
+        self.tiers = data['tiers']
+        self.companies = data.get('companies', {})
+        self.default_tier = data['default_tier']
+        self.generic_tier = data['generic_tier']
+
+        for name, tier in self.tiers.items():
+            missing = [field for field in TIER_FIELDS if field not in tier]
+            if missing:
+                raise ValueError(f"Tier '{name}' is missing {', '.join(missing)}")
+        for key, name in self.companies.items():
+            if name not in self.tiers:
+                raise ValueError(f"Company '{key}' refers to unknown tier '{name}'")
+
+    def tier_name(self, company_key):
+        """Tier name for a canonical company key (None for unmatched organizations)"""
+        if company_key is None:
+            return self.generic_tier
+        return self.companies.get(company_key, self.default_tier)
+
+    def get(self, tier_name):
+        """Tier parameters by name, falling back to the generic tier"""
+        return self.tiers.get(tier_name) or self.tiers[self.generic_tier]
+
+
+def load_tier_table(path=None):
+    """Load the company tier table from JSON"""
+    with open(path or COMPANY_TIERS_PATH, 'r', encoding='utf-8') as f:
+        return TierTable(json.load(f))
@@ -0,0 +1,101 @@
+# contact_metadata.py - Vectorized Counter-Based Contact Metadata Generation
+import numpy as np
+
+MATCH_FOUND = 0
+MATCH_PARTIAL = 1
+MATCH_NOT_FOUND = 2
+MATCH_LABELS = ('🟢 Found in ZoomInfo DB', '🟡 Partial Match', '🔴 Not Found in ZoomInfo')
+
+# Draw columns per contact: confidence, last updated, verified, match chance, match confidence
+DRAWS = 5
+
+_GAMMA = np.uint64(0x9E3779B97F4A7C15)
+_MIX1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX2 = np.uint64(0x94D049BB133111EB)
+
+
+def _mix64(x):
+    """SplitMix64 finalizer over a uint64 array (arithmetic wraps mod 2**64)"""
+    x = (x ^ (x >> np.uint64(30))) * _MIX1
+    x = (x ^ (x >> np.uint64(27))) * _MIX2
+    return x ^ (x >> np.uint64(31))
+
+
+def counter_uniforms(keys, contact_ids, draws=DRAWS):
+    """Uniforms in [0, 1) of shape (len(contact_ids), draws)
+
+    Element (i, j) is a pure function of (keys[i], contact_ids[i], j), so a
+    contact gets the same values whether it's generated alone, with the rest
+    of its company, or in a batch spanning many companies.
+    """
+    keys = np.asarray(keys, dtype=np.uint64)
+    contact_ids = np.asarray(contact_ids, dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        streams = _mix64(keys ^ _mix64((contact_ids + np.uint64(1)) * _GAMMA))
+        counters = streams[:, None] + np.arange(1, draws + 1, dtype=np.uint64) * _GAMMA
+        return (_mix64(counters) >> np.uint64(11)) * (1.0 / (1 << 53))
+
+
+def _randint(u, bounds):
+    """Map uniforms onto inclusive integer ranges given as an (n, 2) array"""
+    return (bounds[:, 0] + np.floor(u * (bounds[:, 1] - bounds[:, 0] + 1))).astype(np.int64)
+
+
+def generate_contact_metadata(keys, contact_ids, tiers, tier_index=None):
+    """Confidence, freshness, verification and ZoomInfo match arrays for many contacts at once
+
+    keys is one stable 64-bit key per contact (or a scalar for all of them),
+    typically stable_seed of the lead's IP and company, and contact_ids the
+    contacts' stable indexes in the database. tiers is a list of tier dicts
+    from the tier table and tier_index picks one per contact (default: the
+    first tier for every contact), which lets a batch span several companies.
+    """
+    contact_ids = np.asarray(contact_ids, dtype=np.uint64)
+    keys = np.broadcast_to(np.asarray(keys, dtype=np.uint64), contact_ids.shape)
+    tier_index = np.zeros(len(contact_ids), dtype=np.intp) if tier_index is None else np.asarray(tier_index)
+
+    def column(field):
+        return np.array([tier[field] for tier in tiers], dtype=np.float64)[tier_index]
+
+    def bounds(field, rates=False):
+        table = [(tier['match_rates'] if rates else tier)[field] for tier in tiers]
+        return np.array(table, dtype=np.int64).reshape(len(tiers), 2)[tier_index]
+
+    u = counter_uniforms(keys, contact_ids)
+    full_above = np.array([tier['match_rates']['full_above'] for tier in tiers])[tier_index]
+    partial_above = np.array([tier['match_rates']['partial_above'] for tier in tiers])[tier_index]
+
+    match_status = np.where(
+        u[:, 3] > full_above, MATCH_FOUND, np.where(u[:, 3] > partial_above, MATCH_PARTIAL, MATCH_NOT_FOUND)
+    ).astype(np.int8)
+    match_bounds = np.stack([
+        bounds('full_confidence', rates=True),
+        bounds('partial_confidence', rates=True),
+        bounds('not_found_confidence', rates=True)
+    ])[match_status, np.arange(len(contact_ids))]
+
+    return {
+        'confidence_score': _randint(u[:, 0], bounds('contact_confidence')),
+        'last_updated_day': _randint(u[:, 1], bounds('updated_days')),
+        'verified': u[:, 2] > column('verified_above'),
+        'match_status': match_status,
+        'match_confidence': _randint(u[:, 4], match_bounds)
+    }
+
+
+def metadata_records(metadata):
+    """Yield the display fields of each contact, in input order"""
+    for confidence, day, verified, status, match_confidence in zip(
+        metadata['confidence_score'].tolist(),
+        metadata['last_updated_day'].tolist(),
+        metadata['verified'].tolist(),
+        metadata['match_status'].tolist(),
+        metadata['match_confidence'].tolist()
+    ):
+        yield {
+            'confidence_score': f"{confidence}%",
+            'last_updated': f"2025-01-{day:02d}",
+            'verified': '✅ Verified' if verified else '⚠️ Pending',
+            'zoominfo_match': MATCH_LABELS[status],
+            'match_confidence': f"{match_confidence}%"
+        }
@@ -0,0 +1,202 @@
+# contacts_snapshot.py - Memory-Mapped Binary Snapshot Format
+import json
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+
+import numpy as np
+
+# File layout: header, 8-byte aligned sections, then a JSON directory naming
+# each section's offset, dtype and length plus free-form metadata. Strings
+# live in one UTF-8 blob addressed by a uint64 offsets array; every other
+# section is a fixed-width integer column.
+MAGIC = b'CSNAP\x00\x01\x00'
+HEADER = struct.Struct('<8sQQ')  # magic, directory offset, directory length
+MISSING = 0xFFFFFFFF  # string id for an absent value
+FLUSH_EVERY = 65536
+
+
+class InvalidSnapshotError(Exception):
+    pass
+
+
+class SnapshotWriter:
+    """Stream string and integer columns to a snapshot file with bounded memory
+
+    Columns are spooled to temporary files next to the target and assembled
+    on write(), which replaces the target atomically. Repeated strings (e.g.
+    seniority levels) are stored once, up to intern_limit distinct values.
+    """
+
+    def __init__(self, path, intern_limit=1 << 16):
+        self.path = str(path)
+        self.intern_limit = intern_limit
+        self._dir = tempfile.mkdtemp(prefix='.snapshot-', dir=os.path.dirname(os.path.abspath(self.path)))
+        self._intern = {}
+        self._blob = open(os.path.join(self._dir, 'strings.blob'), 'wb')
+        self._blob_size = 0
+        self._string_count = 0
+        self._columns = {}  # name -> [file, dtype, length, pending values]
+        self.add_column('strings.offsets', np.uint64)
+        self._columns['strings.offsets'][3].append(0)
+
+    def string_id(self, text):
+        """Id of text in the string table (MISSING for None), adding it if new"""
+        if text is None:
+            return MISSING
+        string_id = self._intern.get(text)
+        if string_id is not None:
+            return string_id
+
+        data = text.encode('utf-8')
+        self._blob.write(data)
+        self._blob_size += len(data)
+        string_id = self._string_count
+        self._string_count += 1
+        self.append('strings.offsets', self._blob_size)
+        if len(self._intern) < self.intern_limit:
+            self._intern[text] = string_id
+        return string_id
+
+    def add_column(self, name, dtype):
+        if name not in self._columns:
+            path = os.path.join(self._dir, f'{len(self._columns)}.col')
+            self._columns[name] = [open(path, 'wb'), np.dtype(dtype), 0, []]
+
+    def append(self, name, value):
+        column = self._columns[name]
+        column[3].append(value)
+        if len(column[3]) >= FLUSH_EVERY:
+            self._flush(column)
+
+    def _flush(self, column):
+        f, dtype, length, pending = column
+        if pending:
+            np.asarray(pending, dtype=dtype).tofile(f)
+            column[2] = length + len(pending)
+            column[3] = []
+
+    def write(self, metadata=None):
+        """Assemble the snapshot and move it into place"""
+        self._blob.close()
+        sections = {}
+        tmp_path = os.path.join(self._dir, 'snapshot')
+
+        try:
+            with open(tmp_path, 'wb') as out:
+                out.write(b'\0' * HEADER.size)
+                parts = [('strings.blob', self._blob.name, np.dtype(np.uint8), self._blob_size)]
+                for name, column in self._columns.items():
+                    self._flush(column)
+                    column[0].close()
+                    parts.append((name, column[0].name, column[1], column[2]))
+
+                for name, part_path, dtype, length in parts:
+                    out.write(b'\0' * (-out.tell() % 8))
+                    sections[name] = {'offset': out.tell(), 'dtype': dtype.str, 'length': length}
+                    with open(part_path, 'rb') as part:
+                        shutil.copyfileobj(part, out, 1 << 20)
+
+                directory = json.dumps({'sections': sections, 'metadata': metadata or {}}).encode('utf-8')
+                directory_offset = out.tell()
+                out.write(directory)
+                out.seek(0)
+                out.write(HEADER.pack(MAGIC, directory_offset, len(directory)))
+            os.replace(tmp_path, self.path)
+        finally:
+            shutil.rmtree(self._dir, ignore_errors=True)
+
+    def abort(self):
+        """Discard everything written so far"""
+        self._blob.close()
+        for column in self._columns.values():
+            column[0].close()
+        shutil.rmtree(self._dir, ignore_errors=True)
+
+
+def read_metadata(path):
+    """Return a snapshot's metadata without mapping the whole file"""
+    with open(path, 'rb') as f:
+        directory_offset, directory_length = _read_header(f.read(HEADER.size))
+        f.seek(directory_offset)
+        return json.loads(f.read(directory_length))['metadata']
+
+
+def update_metadata(path, changes, expected=None):
+    """Merge changes into a snapshot's metadata in place; returns False if expected values don't match
+
+    The sections are left as they are: the new directory is written after
+    the current one and only then is the header pointed at it, so readers
+    opening the file meanwhile see either the old directory or the new one.
+    """
+    with open(path, 'r+b') as f:
+        directory_offset, directory_length = _read_header(f.read(HEADER.size))
+        f.seek(directory_offset)
+        directory = json.loads(f.read(directory_length))
+        if any(directory['metadata'].get(key) != value for key, value in (expected or {}).items()):
+            return False
+        directory['metadata'].update(changes)
+        data = json.dumps(directory).encode('utf-8')
+
+        new_offset = directory_offset + directory_length
+        new_offset += -new_offset % 8
+        f.seek(new_offset)
+        f.write(data)
+        f.truncate()
+        f.flush()
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, new_offset, len(data)))
+    return True
+
+
+def _read_header(data):
+    if len(data) < HEADER.size:
+        raise InvalidSnapshotError('File too short for a snapshot header')
+    magic, directory_offset, directory_length = HEADER.unpack(data)
+    if magic != MAGIC:
+        raise InvalidSnapshotError('Not a contacts snapshot (bad magic)')
+    return directory_offset, directory_length
+
+
+class Snapshot:
+    """Read-only view of a snapshot file through mmap
+
+    Opening reads only the header and directory; columns are zero-copy NumPy
+    views, so pages are loaded on first touch and shared between processes
+    mapping the same file.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        with open(self.path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        directory_offset, directory_length = _read_header(self._mmap[:HEADER.size])
+        if directory_offset + directory_length > len(self._mmap):
+            raise InvalidSnapshotError('Snapshot directory points past the end of the file')
+        directory = json.loads(self._mmap[directory_offset:directory_offset + directory_length])
+        self.metadata = directory['metadata']
+        self._sections = directory['sections']
+        self._blob = self.column('strings.blob')
+        self._offsets = self.column('strings.offsets')
+
+    def column(self, name):
+        section = self._sections[name]
+        return np.frombuffer(
+            self._mmap, dtype=np.dtype(section['dtype']), count=section['length'], offset=section['offset']
+        )
+
+    def __contains__(self, name):
+        return name in self._sections
+
+    def string(self, string_id):
+        """Decode one string from the string table (None for MISSING)"""
+        if string_id == MISSING:
+            return None
+        start, end = self._offsets[string_id], self._offsets[string_id + 1]
+        return self._blob[start:end].tobytes().decode('utf-8')
+
+    def strings(self, string_ids):
+        return [self.string(string_id) for string_id in string_ids.tolist()]
@@ -0,0 +1,983 @@
+# contacts_store.py - Immutable Contacts Database and Per-Lead Overlays
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import shutil
+import tempfile
+import threading
+from collections import ChainMap, OrderedDict
+from collections.abc import Mapping
+from pathlib import Path
+from types import MappingProxyType
+
+import numpy as np
+import pandas as pd
+
+import contacts_snapshot
+import json_stream
+
+# Configuration (override with environment variables)
+CONTACTS_DATABASE_PATH = os.environ.get(
+    'CONTACTS_DATABASE_PATH', str(Path(__file__).parent / 'zoominfo_contacts_database.json')
+)
+CONTACTS_DB_PATH = os.environ.get('CONTACTS_DB_PATH', str(Path(__file__).parent / 'contacts.sqlite3'))
+CONTACTS_SNAPSHOT_PATH = os.environ.get('CONTACTS_SNAPSHOT_PATH', str(Path(__file__).parent / 'contacts.snap'))
+CONTACTS_SHARDS_PATH = os.environ.get('CONTACTS_SHARDS_PATH', str(Path(__file__).parent / 'contacts_shards'))
+CONTACTS_SHARD_CACHE_MB = float(os.environ.get('CONTACTS_SHARD_CACHE_MB', 256))
+CONTACTS_GENERATIONS = int(os.environ.get('CONTACTS_GENERATIONS', 3))  # stores kept readable across reloads
+CONTACTS_BACKEND = os.environ.get('CONTACTS_BACKEND', 'auto')  # 'auto', 'json', 'sqlite', 'snapshot' or 'shards'
+IMPORT_BATCH_SIZE = int(os.environ.get('CONTACTS_IMPORT_BATCH_SIZE', 10000))
+
+# Companies with more contacts than this are shown as complete coverage
+COMPLETE_COVERAGE_CONTACTS = 15
+CATEGORICAL_FIELDS = ('seniority', 'department')
+# Contact fields with their own SQLite/snapshot column; anything else goes into the JSON 'extra' column
+CONTACT_FIELDS = ('name', 'title', 'email', 'phone', 'linkedin', 'department', 'seniority')
+SHARD_MANIFEST = 'manifest.json'
+# Seniority counts shown per company: (stats column, seniority value)
+SENIORITY_COLUMNS = (('C-Level', 'C-Level'), ('VP-Level', 'VP-Level'), ('Directors', 'Director'))
+
+
+class ContactsStore(Mapping):
+    """Read-only {company key: contacts} database shared by every session and thread
+
+    Each company maps to a tuple of read-only contact mappings, so records
+    can be handed out without copying and nothing can annotate them in place.
+    Per-lead fields live in a separate overlay (see make_overlay/lead_contacts).
+
+    A columnar frame holds just what the aggregates and filters need
+    (company, seniority and department as categoricals, plus each contact's
+    index in its company); names, emails and other details are only in the
+    records. The per-company aggregates shown in the dashboard are computed
+    from it once, at load.
+    """
+
+    def __init__(self, data, version=''):
+        self.version = version
+        self._companies = {
+            key: tuple(MappingProxyType(dict(contact)) for contact in contacts)
+            for key, contacts in data.items()
+        }
+        self.frame = _build_frame(self._companies)
+        self._stats = _build_company_stats(self.frame)
+
+    def updated(self, data, version=''):
+        """Return (new store, diff) for a changed export, redoing work only where it changed
+
+        Contacts are matched by contact_key(). Unchanged companies keep their
+        record tuples and unchanged contacts their record objects; frame rows
+        and aggregates are rebuilt only for added or changed companies. This
+        store is left untouched, so readers holding it are unaffected.
+        """
+        companies = {}
+        diff = {'added': [], 'removed': [key for key in self._companies if key not in data], 'changed': {}}
+
+        for key, contacts in data.items():
+            old = self._companies.get(key)
+            if old is None:
+                companies[key] = tuple(MappingProxyType(dict(contact)) for contact in contacts)
+                diff['added'].append(key)
+                continue
+
+            companies[key], changes = _company_changes(old, contacts)
+            if changes is not None:
+                diff['changed'][key] = changes
+
+        store = ContactsStore.__new__(ContactsStore)
+        store.version = version
+        store._companies = companies
+        touched = diff['added'] + list(diff['changed'])
+        stale = touched + diff['removed']
+
+        new_rows = _build_frame({key: companies[key] for key in touched})
+        frame = pd.concat([self.frame[~self.frame['company'].isin(stale)], new_rows], ignore_index=True)
+        store.frame = _categorize(frame, list(companies))
+        store._stats = pd.concat([
+            self._stats.drop(index=stale, errors='ignore'), _build_company_stats(new_rows)
+        ]).reindex(list(companies))
+        return store, diff
+
+    def __getitem__(self, company_key):
+        return self._companies[company_key]
+
+    def __iter__(self):
+        return iter(self._companies)
+
+    def __len__(self):
+        return len(self._companies)
+
+    def contact_count(self, company_key):
+        return len(self._companies[company_key])
+
+    def get_contacts(self, company_key, contact_ids):
+        """Records at the given indexes of a company's contact list"""
+        contacts = self._companies[company_key]
+        return tuple(contacts[contact_id] for contact_id in contact_ids)
+
+    def total_contacts(self):
+        return len(self.frame)
+
+    def company_stats(self):
+        """Per-company totals, seniority counts and coverage (a copy, safe to modify)"""
+        return self._stats.reset_index(drop=True)
+
+
+def contact_key(contact):
+    """Stable identity of a contact across exports: email, else name and title"""
+    email = contact.get('email')
+    return email.lower() if email else f"{contact.get('name')}|{contact.get('title')}"
+
+
+def _company_changes(old, contacts):
+    """Match a company's new contacts to its old records by contact_key()
+
+    Returns (records, changes). Unchanged contacts keep their old record
+    objects; changes counts inserted, updated and deleted contacts, or is
+    None when the list is identical.
+    """
+    old_by_key = {contact_key(contact): contact for contact in old}
+    changes = {'inserted': 0, 'updated': 0, 'deleted': 0}
+    records = []
+    for contact in contacts:
+        previous = old_by_key.pop(contact_key(contact), None)
+        if previous is None:
+            changes['inserted'] += 1
+            records.append(MappingProxyType(dict(contact)))
+        elif previous == contact:
+            records.append(previous)
+        else:
+            changes['updated'] += 1
+            records.append(MappingProxyType(dict(contact)))
+    changes['deleted'] = len(old_by_key)
+
+    # Reordering alone also changes contact indexes, so compare positions too
+    if len(records) == len(old) and all(new is previous for new, previous in zip(records, old)):
+        return old, None
+    return tuple(records), changes
+
+
+def diff_stores(old, new):
+    """Diff two stores of any backend, in the same shape as ContactsStore.updated
+
+    Used for backends that are rebuilt rather than updated in place
+    (SQLite, snapshot, shards). Companies whose content hash is the same in
+    both stores are skipped; the others (or all of them, for files built
+    before hashes were recorded) are read from both stores and compared, so
+    this belongs on a background reload, not a page run.
+    """
+    diff = {'added': [key for key in new if key not in old], 'removed': [key for key in old if key not in new],
+            'changed': {}}
+    old_hashes, new_hashes = _company_hashes(old), _company_hashes(new)
+    hashed = old_hashes is not None and new_hashes is not None
+    for key in new:
+        if key not in old or (hashed and old_hashes[key] == new_hashes[key]):
+            continue
+        _, changes = _company_changes(old[key], new[key])
+        if changes is not None:
+            diff['changed'][key] = changes
+    return diff
+
+
+def _company_hashes(store):
+    """{company key: content hash} recorded in a derived store, or None"""
+    company_hashes = getattr(store, 'company_hashes', None)
+    return company_hashes() if company_hashes is not None else None
+
+
+def _company_hasher():
+    """Hash of one company's contacts, fed one JSON-encoded contact at a time"""
+    return hashlib.blake2b(digest_size=16)
+
+
+def _contact_bytes(contact):
+    return json.dumps(contact, ensure_ascii=False).encode('utf-8') + b'\n'
+
+
+def _categorize(frame, companies):
+    frame['company'] = pd.Categorical(frame['company'], categories=companies)
+    for field in CATEGORICAL_FIELDS:
+        if field in frame:
+            frame[field] = frame[field].astype('category')
+    return frame
+
+
+def _build_frame(companies):
+    """Columnar frame of {company key: contact records}, one row per contact
+
+    Only company, contact_index and the categorical fields are copied; the
+    rest of each contact is fetched from the records (get_contacts) on demand.
+    """
+    columns = {'company': [], 'contact_index': [], **{field: [] for field in CATEGORICAL_FIELDS}}
+    for key, contacts in companies.items():
+        for index, contact in enumerate(contacts):
+            columns['company'].append(key)
+            columns['contact_index'].append(index)
+            for field in CATEGORICAL_FIELDS:
+                columns[field].append(contact.get(field))
+    frame = pd.DataFrame(columns)
+    frame['contact_index'] = frame['contact_index'].astype(np.int32)
+    return _categorize(frame, list(companies))
+
+
+def _build_company_stats(frame):
+    """Per-company aggregates of a contacts frame, indexed by company key"""
+    totals = frame.groupby('company', observed=False).size()
+    if 'seniority' in frame:
+        by_seniority = frame.groupby(['company', 'seniority'], observed=False).size().unstack(fill_value=0)
+    else:
+        by_seniority = pd.DataFrame(index=totals.index)
+
+    stats = pd.DataFrame({
+        'Company': [key.title() for key in totals.index],
+        'Total Contacts': totals.values
+    }, index=list(totals.index))
+    for column, seniority in SENIORITY_COLUMNS:
+        stats[column] = by_seniority[seniority].values if seniority in by_seniority else 0
+    stats['Coverage'] = np.where(stats['Total Contacts'] > COMPLETE_COVERAGE_CONTACTS, '🟢 Complete', '🟡 Partial')
+    return stats
+
+
+class SQLiteContactsStore(Mapping):
+    """ContactsStore backed by an indexed SQLite file (see import_json_to_sqlite)
+
+    Only company keys and the per-company aggregates are held in memory;
+    contacts are fetched on demand with parameterized queries, so the
+    database can be much larger than RAM. The file is opened read-only.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            Path(self.path).resolve().as_uri() + '?mode=ro', uri=True, check_same_thread=False
+        )
+        self._keys = [row[0] for row in self._query('SELECT key FROM companies ORDER BY position')]
+        self._key_set = set(self._keys)
+        row = self._query("SELECT value FROM meta WHERE key = 'source_version'")
+        self.version = row[0][0] if row else ''
+        self._stats = self._build_company_stats()
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _build_company_stats(self):
+        rows = self._query('''
+            SELECT c.key, COUNT(t.company),
+                   COALESCE(SUM(t.seniority = 'C-Level'), 0),
+                   COALESCE(SUM(t.seniority = 'VP-Level'), 0),
+                   COALESCE(SUM(t.seniority = 'Director'), 0)
+            FROM companies c LEFT JOIN contacts t ON t.company = c.key
+            GROUP BY c.position ORDER BY c.position
+        ''')
+        return pd.DataFrame({
+            'Company': [row[0].title() for row in rows],
+            'Total Contacts': [row[1] for row in rows],
+            'C-Level': [row[2] for row in rows],
+            'VP-Level': [row[3] for row in rows],
+            'Directors': [row[4] for row in rows],
+            'Coverage': ['🟢 Complete' if row[1] > COMPLETE_COVERAGE_CONTACTS else '🟡 Partial' for row in rows]
+        })
+
+    @staticmethod
+    def _record(row):
+        contact = {field: value for field, value in zip(CONTACT_FIELDS, row) if value is not None}
+        if row[-1]:
+            contact.update(json.loads(row[-1]))
+        return MappingProxyType(contact)
+
+    def __getitem__(self, company_key):
+        if company_key not in self._key_set:
+            raise KeyError(company_key)
+        rows = self._query(
+            f'SELECT {", ".join(CONTACT_FIELDS)}, extra FROM contacts WHERE company = ? ORDER BY contact_index',
+            (company_key,)
+        )
+        return tuple(self._record(row) for row in rows)
+
+    def __contains__(self, company_key):
+        return company_key in self._key_set
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def contact_count(self, company_key):
+        return self._query('SELECT COUNT(*) FROM contacts WHERE company = ?', (company_key,))[0][0]
+
+    def get_contacts(self, company_key, contact_ids):
+        """Records at the given indexes of a company's contact list"""
+        contact_ids = [int(contact_id) for contact_id in contact_ids]
+        placeholders = ', '.join('?' * len(contact_ids))
+        rows = self._query(
+            f'SELECT contact_index, {", ".join(CONTACT_FIELDS)}, extra FROM contacts '
+            f'WHERE company = ? AND contact_index IN ({placeholders})',
+            [company_key] + contact_ids
+        )
+        by_index = {row[0]: self._record(row[1:]) for row in rows}
+        return tuple(by_index[contact_id] for contact_id in contact_ids)
+
+    def total_contacts(self):
+        return self._query('SELECT COUNT(*) FROM contacts')[0][0]
+
+    def company_hashes(self):
+        """Content hash of each company's contacts (None for databases imported without them)"""
+        try:
+            return dict(self._query('SELECT key, hash FROM companies'))
+        except sqlite3.OperationalError:
+            return None
+
+    def company_stats(self):
+        """Per-company totals, seniority counts and coverage (a copy, safe to modify)"""
+        return self._stats.copy()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class SnapshotContactsStore(Mapping):
+    """ContactsStore over a memory-mapped binary snapshot (see build_contacts_snapshot)
+
+    Opening maps the file and reads the company table; contact fields are
+    fixed-width string ids into a shared string table, decoded only for the
+    records actually requested. Per-company aggregates are stored in the
+    snapshot, so nothing is scanned at startup.
+    """
+
+    def __init__(self, path):
+        self.snapshot = contacts_snapshot.Snapshot(path)
+        self.version = self.snapshot.metadata['source_version']
+        self._keys = self.snapshot.strings(self.snapshot.column('company.key'))
+        self._positions = {key: position for position, key in enumerate(self._keys)}
+        self._starts = self.snapshot.column('company.start')
+        self._counts = self.snapshot.column('company.count')
+        self._fields = {field: self.snapshot.column(f'contact.{field}') for field in CONTACT_FIELDS + ('extra',)}
+
+    def _record(self, row):
+        contact = {}
+        for field, column in self._fields.items():
+            value = self.snapshot.string(int(column[row]))
+            if value is not None:
+                if field == 'extra':
+                    contact.update(json.loads(value))
+                else:
+                    contact[field] = value
+        return MappingProxyType(contact)
+
+    def __getitem__(self, company_key):
+        return self.get_contacts(company_key, range(self.contact_count(company_key)))
+
+    def __contains__(self, company_key):
+        return company_key in self._positions
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def contact_count(self, company_key):
+        return int(self._counts[self._positions[company_key]])
+
+    def get_contacts(self, company_key, contact_ids):
+        """Records at the given indexes of a company's contact list"""
+        position = self._positions[company_key]
+        start, count = int(self._starts[position]), int(self._counts[position])
+        records = []
+        for contact_id in contact_ids:
+            if not 0 <= contact_id < count:
+                raise IndexError(f'{company_key} has no contact {contact_id}')
+            records.append(self._record(start + contact_id))
+        return tuple(records)
+
+    def total_contacts(self):
+        return int(self._counts.sum())
+
+    def company_hashes(self):
+        """Content hash of each company's contacts (None for snapshots built without them)"""
+        if 'company.hash' not in self.snapshot:
+            return None
+        return dict(zip(self._keys, self.snapshot.strings(self.snapshot.column('company.hash'))))
+
+    def company_stats(self):
+        """Per-company totals, seniority counts and coverage"""
+        stats = pd.DataFrame({'Company': [key.title() for key in self._keys], 'Total Contacts': self._counts})
+        for column, _ in SENIORITY_COLUMNS:
+            stats[column] = self.snapshot.column(f'company.{column}')
+        stats['Coverage'] = np.where(stats['Total Contacts'] > COMPLETE_COVERAGE_CONTACTS, '🟢 Complete', '🟡 Partial')
+        return stats
+
+
+def build_contacts_snapshot(json_path=None, snapshot_path=None, progress=None):
+    """Compile the JSON export into a snapshot file; returns the contact count
+
+    The export is streamed, so memory stays bounded; progress works as in
+    import_json_to_sqlite. The source's size, mtime and content hash are
+    recorded so stale snapshots can be detected.
+    """
+    json_path = json_path or CONTACTS_DATABASE_PATH
+    snapshot_path = snapshot_path or CONTACTS_SNAPSHOT_PATH
+    source = os.stat(json_path)
+    digest = _source_hasher()
+    bytes_read = 0
+    count = 0
+
+    def on_chunk(raw):
+        nonlocal bytes_read
+        digest.update(raw)
+        bytes_read += len(raw)
+
+    writer = contacts_snapshot.SnapshotWriter(snapshot_path)
+    for field in CONTACT_FIELDS + ('extra',):
+        writer.add_column(f'contact.{field}', np.uint32)
+    for column in ('key', 'start', 'count', 'hash') + tuple(column for column, _ in SENIORITY_COLUMNS):
+        writer.add_column(f'company.{column}', np.uint64 if column == 'start' else np.uint32)
+
+    company_counts = {}  # stats of the company being read
+    company_hash = _company_hasher()
+
+    def finish_company():
+        if company_counts:
+            for column, value in company_counts.items():
+                writer.append(f'company.{column}', value)
+            writer.append('company.hash', writer.string_id(company_hash.hexdigest()))
+
+    def start_company(key):
+        nonlocal company_hash
+        finish_company()
+        company_hash = _company_hasher()
+        company_counts.clear()
+        company_counts.update({'key': writer.string_id(key), 'start': count, 'count': 0})
+        company_counts.update({column: 0 for column, _ in SENIORITY_COLUMNS})
+
+    try:
+        with open(json_path, 'rb') as f:
+            for _, _, contact in json_stream.iter_grouped_records(f, on_chunk=on_chunk, on_key=start_company):
+                for field in CONTACT_FIELDS:
+                    value = contact.get(field)
+                    writer.append(f'contact.{field}', writer.string_id(None if value is None else str(value)))
+                writer.append('contact.extra', writer.string_id(_extra_fields(contact)))
+                company_hash.update(_contact_bytes(contact))
+
+                company_counts['count'] += 1
+                for column, seniority in SENIORITY_COLUMNS:
+                    if contact.get('seniority') == seniority:
+                        company_counts[column] += 1
+                count += 1
+                if progress is not None and count % IMPORT_BATCH_SIZE == 0:
+                    progress(bytes_read, source.st_size, count)
+        finish_company()
+
+        writer.write({
+            'source_version': digest.hexdigest(),
+            'source_size': source.st_size,
+            'source_mtime_ns': source.st_mtime_ns,
+            'contacts': count
+        })
+    except BaseException:
+        writer.abort()
+        raise
+
+    if progress is not None:
+        progress(source.st_size, source.st_size, count)
+    return count
+
+
+def snapshot_is_fresh(json_path=None, snapshot_path=None):
+    """True when the snapshot was built from the current JSON export
+
+    Matching size and mtime are trusted; otherwise the export is re-hashed
+    and compared with the recorded content hash. When only the mtime
+    changed (the export was touched or copied), the new one is recorded so
+    the next start doesn't hash the export again.
+    """
+    json_path = json_path or CONTACTS_DATABASE_PATH
+    snapshot_path = snapshot_path or CONTACTS_SNAPSHOT_PATH
+    try:
+        metadata = contacts_snapshot.read_metadata(snapshot_path)
+    except (OSError, ValueError, contacts_snapshot.InvalidSnapshotError):
+        return False
+
+    def restamp(stamp):
+        contacts_snapshot.update_metadata(
+            snapshot_path, stamp, expected={'source_version': metadata.get('source_version')}
+        )
+
+    return _built_from(json_path, metadata, restamp)
+
+
+def _built_from(json_path, metadata, restamp=None):
+    """Compare the export against the size, mtime and hash recorded when a derived file was built
+
+    After a hash match, restamp (if given) is called with the export's
+    current source_size and source_mtime_ns to record in the derived file;
+    it must only write them if the file still holds the hashed version.
+    """
+    try:
+        source = os.stat(json_path)
+    except FileNotFoundError:
+        return True  # Deployed with the derived file only
+    if (source.st_size, source.st_mtime_ns) == (metadata.get('source_size'), metadata.get('source_mtime_ns')):
+        return True
+    if source.st_size != metadata.get('source_size'):
+        return False
+
+    digest = _source_hasher()
+    with open(json_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    if digest.hexdigest() != metadata.get('source_version'):
+        return False
+    if restamp is not None:
+        try:
+            restamp({'source_size': source.st_size, 'source_mtime_ns': source.st_mtime_ns})
+        except (OSError, sqlite3.Error):
+            pass  # Read-only deployment: the export is hashed again next time
+    return True
+
+
+def load_contacts_snapshot(json_path=None, snapshot_path=None, progress=None):
+    """Open the snapshot, rebuilding it first if the JSON export changed"""
+    if not snapshot_is_fresh(json_path, snapshot_path):
+        build_contacts_snapshot(json_path, snapshot_path, progress=progress)
+    return SnapshotContactsStore(snapshot_path or CONTACTS_SNAPSHOT_PATH)
+
+
+class ShardedContactsStore(Mapping):
+    """ContactsStore over one JSON shard per company plus a manifest
+
+    Only the manifest (company keys, shard files, aggregates) is read up
+    front. A company's shard is parsed on first access and kept in an LRU
+    bounded by cache_bytes of shard file size, so memory follows the
+    companies visitors actually come from rather than the whole catalog.
+    """
+
+    def __init__(self, path, cache_bytes=None):
+        self.path = str(path)
+        self.cache_bytes = CONTACTS_SHARD_CACHE_MB * 1024 * 1024 if cache_bytes is None else cache_bytes
+        with open(os.path.join(self.path, SHARD_MANIFEST), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        self.version = manifest['source_version']
+        self._shard_dir = os.path.join(self.path, manifest['directory'])
+        self._companies = {entry['key']: entry for entry in manifest['companies']}
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()  # company key -> (contacts, size)
+        self._cached_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _load_shard(self, company_key):
+        entry = self._companies[company_key]
+        with self._lock:
+            cached = self._cache.get(company_key)
+            if cached is not None:
+                self._cache.move_to_end(company_key)
+                self.hits += 1
+                return cached[0]
+
+        # Parse outside the lock; two threads may race to load the same shard, which is harmless
+        with open(os.path.join(self._shard_dir, entry['file']), 'r', encoding='utf-8') as f:
+            contacts = tuple(MappingProxyType(contact) for contact in json.load(f))
+
+        with self._lock:
+            self.misses += 1
+            if company_key not in self._cache:
+                self._cache[company_key] = (contacts, entry['bytes'])
+                self._cached_bytes += entry['bytes']
+            # Always keep the shard just loaded, even if it alone exceeds the budget
+            while self._cached_bytes > self.cache_bytes and len(self._cache) > 1:
+                _, (_, size) = self._cache.popitem(last=False)
+                self._cached_bytes -= size
+        return contacts
+
+    def __getitem__(self, company_key):
+        return self._load_shard(company_key)
+
+    def __contains__(self, company_key):
+        return company_key in self._companies
+
+    def __iter__(self):
+        return iter(self._companies)
+
+    def __len__(self):
+        return len(self._companies)
+
+    def contact_count(self, company_key):
+        return self._companies[company_key]['count']
+
+    def get_contacts(self, company_key, contact_ids):
+        """Records at the given indexes of a company's contact list"""
+        contacts = self._load_shard(company_key)
+        return tuple(contacts[contact_id] for contact_id in contact_ids)
+
+    def total_contacts(self):
+        return sum(entry['count'] for entry in self._companies.values())
+
+    def company_hashes(self):
+        """Content hash of each company's contacts (None for manifests written without them)"""
+        if not all('hash' in entry for entry in self._companies.values()):
+            return None
+        return {key: entry['hash'] for key, entry in self._companies.items()}
+
+    def company_stats(self):
+        """Per-company totals, seniority counts and coverage (from the manifest)"""
+        entries = list(self._companies.values())
+        stats = pd.DataFrame({
+            'Company': [entry['key'].title() for entry in entries],
+            'Total Contacts': [entry['count'] for entry in entries]
+        })
+        for column, _ in SENIORITY_COLUMNS:
+            stats[column] = [entry['seniority'][column] for entry in entries]
+        stats['Coverage'] = np.where(stats['Total Contacts'] > COMPLETE_COVERAGE_CONTACTS, '🟢 Complete', '🟡 Partial')
+        return stats
+
+    def cache_info(self):
+        with self._lock:
+            return {'shards': len(self._cache), 'bytes': self._cached_bytes, 'hits': self.hits, 'misses': self.misses}
+
+
+def build_contacts_shards(json_path=None, shards_path=None, progress=None, generations=CONTACTS_GENERATIONS):
+    """Split the JSON export into one shard file per company; returns the contact count
+
+    Shards are written to a fresh subdirectory and the manifest pointing at
+    it is replaced atomically, so open stores keep reading the old shards;
+    the directories of the last generations builds are kept. The export is
+    streamed; progress works as in import_json_to_sqlite.
+    """
+    json_path = json_path or CONTACTS_DATABASE_PATH
+    shards_path = str(shards_path or CONTACTS_SHARDS_PATH)
+    os.makedirs(shards_path, exist_ok=True)
+    source = os.stat(json_path)
+    digest = _source_hasher()
+    bytes_read = 0
+    count = 0
+
+    def on_chunk(raw):
+        nonlocal bytes_read
+        digest.update(raw)
+        bytes_read += len(raw)
+
+    shard_dir = tempfile.mkdtemp(prefix='shards-', dir=shards_path)
+    companies = []
+    shard = None
+    shard_hash = None
+
+    def finish_shard():
+        if shard is not None:
+            shard.write(']')
+            shard.close()
+            entry = companies[-1]
+            entry['bytes'] = os.path.getsize(os.path.join(shard_dir, entry['file']))
+            entry['hash'] = shard_hash.hexdigest()
+
+    def start_shard(key):
+        nonlocal shard, shard_hash
+        finish_shard()
+        shard_hash = _company_hasher()
+        entry = {'key': key, 'file': f'{len(companies):06d}.json', 'count': 0,
+                 'seniority': {column: 0 for column, _ in SENIORITY_COLUMNS}}
+        companies.append(entry)
+        shard = open(os.path.join(shard_dir, entry['file']), 'w', encoding='utf-8')
+        shard.write('[')
+
+    try:
+        with open(json_path, 'rb') as f:
+            for key, index, contact in json_stream.iter_grouped_records(f, on_chunk=on_chunk, on_key=start_shard):
+                entry = companies[-1]
+                shard.write((',' if index else '') + json.dumps(contact, ensure_ascii=False))
+                shard_hash.update(_contact_bytes(contact))
+                entry['count'] += 1
+                for column, seniority in SENIORITY_COLUMNS:
+                    if contact.get('seniority') == seniority:
+                        entry['seniority'][column] += 1
+                count += 1
+                if progress is not None and count % IMPORT_BATCH_SIZE == 0:
+                    progress(bytes_read, source.st_size, count)
+        finish_shard()
+        shard = None
+    except BaseException:
+        if shard is not None:
+            shard.close()
+        shutil.rmtree(shard_dir, ignore_errors=True)
+        raise
+
+    try:
+        manifest = _read_manifest(shards_path)
+        previous = [manifest['directory']] + manifest.get('previous', [])
+    except (OSError, ValueError, KeyError):
+        previous = []
+    previous = previous[:max(generations - 1, 0)]
+
+    _write_manifest(shards_path, {
+        'source_version': digest.hexdigest(),
+        'source_size': source.st_size,
+        'source_mtime_ns': source.st_mtime_ns,
+        'directory': os.path.basename(shard_dir),
+        'previous': previous,
+        'companies': companies
+    })
+
+    # Stores opened on earlier manifests may still be reading their shards (see ContactsWatcher.store_for)
+    for name in os.listdir(shards_path):
+        if name.startswith('shards-') and name != os.path.basename(shard_dir) and name not in previous:
+            shutil.rmtree(os.path.join(shards_path, name), ignore_errors=True)
+
+    if progress is not None:
+        progress(source.st_size, source.st_size, count)
+    return count
+
+
+def _read_manifest(shards_path):
+    with open(os.path.join(shards_path, SHARD_MANIFEST), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _write_manifest(shards_path, manifest):
+    """Replace the shard manifest atomically"""
+    fd, tmp_path = tempfile.mkstemp(prefix=SHARD_MANIFEST + '.', suffix='.tmp', dir=shards_path)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(tmp_path, os.path.join(shards_path, SHARD_MANIFEST))
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def load_contacts_shards(json_path=None, shards_path=None, progress=None):
+    """Open the sharded store, re-splitting the export first if it changed"""
+    shards_path = shards_path or CONTACTS_SHARDS_PATH
+
+    def restamp(stamp):
+        # Re-read, so a manifest replaced by another worker's rebuild meanwhile is left alone
+        current = _read_manifest(shards_path)
+        if (current['source_version'], current['directory']) == (manifest['source_version'], manifest['directory']):
+            _write_manifest(shards_path, {**current, **stamp})
+
+    try:
+        manifest = _read_manifest(shards_path)
+        fresh = _built_from(json_path or CONTACTS_DATABASE_PATH, manifest, restamp)
+    except (OSError, ValueError, KeyError):
+        fresh = False
+    if not fresh:
+        build_contacts_shards(json_path, shards_path, progress=progress)
+    return ShardedContactsStore(shards_path)
+
+
+def import_json_to_sqlite(json_path=None, db_path=None, batch_size=IMPORT_BATCH_SIZE, progress=None):
+    """Build the indexed SQLite contacts database from the JSON export; returns the contact count
+
+    The export is parsed as a stream and written in batches of batch_size
+    contacts, so memory stays flat however large the file is. progress, if
+    given, is called after each batch as progress(bytes_read, total_bytes,
+    contacts). The database is written to a temporary file and moved into
+    place, so readers never see a half-built file.
+    """
+    json_path = json_path or CONTACTS_DATABASE_PATH
+    db_path = str(db_path or CONTACTS_DB_PATH)
+    source = os.stat(json_path)
+    total_bytes = source.st_size
+    digest = _source_hasher()
+    bytes_read = 0
+    count = 0
+
+    def on_chunk(raw):
+        nonlocal bytes_read
+        digest.update(raw)
+        bytes_read += len(raw)
+
+    # A unique file per import, so concurrent workers importing at once don't write into each other's
+    fd, tmp_path = tempfile.mkstemp(
+        prefix=os.path.basename(db_path) + '.', suffix='.tmp', dir=os.path.dirname(os.path.abspath(db_path))
+    )
+    os.close(fd)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.executescript('''
+            PRAGMA journal_mode = OFF;
+            PRAGMA synchronous = OFF;
+            CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+            CREATE TABLE companies (position INTEGER PRIMARY KEY, key TEXT NOT NULL UNIQUE, hash TEXT);
+            CREATE TABLE contacts (
+                company TEXT NOT NULL,
+                contact_index INTEGER NOT NULL,
+                name TEXT, title TEXT, email TEXT, phone TEXT, linkedin TEXT,
+                department TEXT, seniority TEXT,
+                extra TEXT,
+                PRIMARY KEY (company, contact_index)
+            ) WITHOUT ROWID;
+        ''')
+        insert_contacts = f'INSERT INTO contacts VALUES (?, ?, {", ".join("?" * len(CONTACT_FIELDS))}, ?)'
+        company_keys = []
+        company_hashes = []
+        batch = []
+
+        def start_company(key):
+            company_keys.append(key)
+            company_hashes.append(_company_hasher())
+
+        with open(json_path, 'rb') as f:
+            for key, index, contact in json_stream.iter_grouped_records(f, on_chunk=on_chunk, on_key=start_company):
+                batch.append((key, index, *(contact.get(field) for field in CONTACT_FIELDS), _extra_fields(contact)))
+                company_hashes[-1].update(_contact_bytes(contact))
+                if len(batch) >= batch_size:
+                    conn.executemany(insert_contacts, batch)
+                    count += len(batch)
+                    batch = []
+                    if progress is not None:
+                        progress(bytes_read, total_bytes, count)
+        conn.executemany(insert_contacts, batch)
+        count += len(batch)
+
+        conn.executemany('INSERT INTO companies VALUES (?, ?, ?)', [
+            (position, key, company_hash.hexdigest())
+            for position, (key, company_hash) in enumerate(zip(company_keys, company_hashes))
+        ])
+        conn.executemany('INSERT INTO meta VALUES (?, ?)', [
+            ('source_version', digest.hexdigest()),
+            ('source_size', str(source.st_size)),
+            ('source_mtime_ns', str(source.st_mtime_ns))
+        ])
+        # The primary key already serves lookups by company
+        conn.executescript('''
+            CREATE INDEX contacts_seniority ON contacts (seniority, company);
+            CREATE INDEX contacts_department ON contacts (department, company);
+            CREATE INDEX contacts_email ON contacts (email);
+        ''')
+        conn.commit()
+        conn.close()
+        os.replace(tmp_path, db_path)
+    except BaseException:
+        conn.close()
+        os.remove(tmp_path)
+        raise
+    if progress is not None:
+        progress(total_bytes, total_bytes, count)
+    return count
+
+
+def sqlite_is_fresh(json_path=None, db_path=None):
+    """True when the SQLite database was imported from the current JSON export (see snapshot_is_fresh)"""
+    db_path = str(db_path or CONTACTS_DB_PATH)
+    try:
+        conn = sqlite3.connect(Path(db_path).resolve().as_uri() + '?mode=ro', uri=True)
+        try:
+            meta = dict(conn.execute('SELECT key, value FROM meta').fetchall())
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return False
+    metadata = {key: int(meta[key]) for key in ('source_size', 'source_mtime_ns') if key in meta}
+    metadata['source_version'] = meta.get('source_version')
+
+    def restamp(stamp):
+        conn = sqlite3.connect(db_path, timeout=30)
+        try:
+            with conn:
+                conn.executemany('''
+                    UPDATE meta SET value = ?
+                    WHERE key = ? AND (SELECT value FROM meta WHERE key = 'source_version') = ?
+                ''', [(str(value), key, metadata['source_version']) for key, value in stamp.items()])
+        finally:
+            conn.close()
+
+    return _built_from(json_path or CONTACTS_DATABASE_PATH, metadata, restamp)
+
+
+def load_contacts_sqlite(json_path=None, db_path=None, progress=None):
+    """Open the SQLite store, re-importing the JSON export first if it changed"""
+    if not sqlite_is_fresh(json_path, db_path):
+        import_json_to_sqlite(json_path, db_path, progress=progress)
+    return SQLiteContactsStore(db_path or CONTACTS_DB_PATH)
+
+
+def _extra_fields(contact):
+    extra = {field: value for field, value in contact.items() if field not in CONTACT_FIELDS}
+    return json.dumps(extra) if extra else None
+
+
+def _source_hasher():
+    return hashlib.blake2b(digest_size=16)
+
+
+def source_version(raw):
+    """Fingerprint of the JSON export, used to invalidate cached search results"""
+    digest = _source_hasher()
+    digest.update(raw)
+    return digest.hexdigest()
+
+
+def load_contacts_store(path=None, backend=None, progress=None):
+    """Open the contacts database: 'sqlite', 'snapshot', 'shards', 'json', or 'auto'
+
+    'auto' uses the SQLite file when it exists, and otherwise a snapshot of
+    the JSON export. Derived files (SQLite, snapshot, shards) are re-imported
+    or rebuilt first when the export changed, reporting to progress as in
+    import_json_to_sqlite. If the SQLite file or snapshot can't be written,
+    'auto' falls back to the next option and finally to loading the JSON
+    into memory. path overrides the selected backend's file (and is opened
+    as is).
+    """
+    backend = backend or CONTACTS_BACKEND
+    if backend == 'sqlite':
+        return SQLiteContactsStore(path) if path else load_contacts_sqlite(progress=progress)
+    if backend == 'auto' and path is None and os.path.exists(CONTACTS_DB_PATH):
+        try:
+            return load_contacts_sqlite(progress=progress)
+        except (OSError, sqlite3.Error):
+            pass  # Stale import that can't be rewritten (read-only or full disk): use the export itself
+    if backend == 'snapshot':
+        return load_contacts_snapshot(snapshot_path=path, progress=progress)
+    if backend == 'shards':
+        return load_contacts_shards(shards_path=path, progress=progress)
+    if backend == 'auto' and path is None:
+        try:
+            return load_contacts_snapshot(progress=progress)
+        except OSError:
+            pass  # Snapshot can't be written (read-only filesystem, disk full): parse the JSON directly
+    elif backend not in ('json', 'auto'):
+        raise ValueError(f"Unknown contacts backend '{backend}'")
+
+    with open(path or CONTACTS_DATABASE_PATH, 'rb') as f:
+        raw = f.read()
+    return ContactsStore(json.loads(raw), version=source_version(raw))
+
+
+def make_overlay(contact_ids, records):
+    """Per-lead annotations as parallel columns keyed by contact index
+
+    records yields one dict of fields per contact id, e.g. from
+    contact_metadata.metadata_records(). The overlay is plain JSON so it can
+    go into the result cache and session state as is.
+    """
+    contact_ids = [int(contact_id) for contact_id in contact_ids]
+    columns = {}
+    for position, fields in enumerate(records):
+        for field, value in fields.items():
+            columns.setdefault(field, [None] * len(contact_ids))[position] = value
+    return {'contact_ids': contact_ids, 'fields': columns}
+
+
+def lead_contacts(store, company_key, overlay):
+    """Contacts for a lead as read-only views: the overlay's fields over the base records"""
+    base = store.get_contacts(company_key, overlay['contact_ids'])
+    columns = overlay['fields']
+    return [
+        ChainMap({field: values[position] for field, values in columns.items()}, record)
+        for position, record in enumerate(base)
+    ]
+
+
+if __name__ == '__main__':
+    # python contacts_store.py [contacts.json] [contacts.sqlite3]
+    def report(done, total, contacts):
+        print(f'\r{done / max(total, 1):6.1%}  {contacts:,} contacts', end='', file=sys.stderr)
+
+    count = import_json_to_sqlite(*sys.argv[1:3], progress=report)
+    print(file=sys.stderr)
+    print(f'Imported {count:,} contacts into {sys.argv[2] if len(sys.argv) > 2 else CONTACTS_DB_PATH}')
@@ -0,0 +1,118 @@
+# contacts_watcher.py - Hot Reload of the Contacts Database
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import contacts_store
+
+CONTACTS_RELOAD_INTERVAL = float(os.environ.get('CONTACTS_RELOAD_INTERVAL', 5))  # seconds, 0 disables
+
+
+class ContactsWatcher:
+    """Poll the contacts export's size and mtime and swap in an updated store
+
+    The in-memory JSON store is updated incrementally (ContactsStore.updated);
+    other backends are reopened through loader, which re-imports or rebuilds
+    their derived files from the changed export, and the diff is computed by
+    comparing the old and new stores (contacts_store.diff_stores). Readers
+    that already hold .current keep using that store, since the new one is
+    published with a single attribute assignment. The last generations
+    stores stay reachable by version so results produced against them
+    (whose contact indexes refer to them) keep resolving.
+    """
+
+    def __init__(self, loader, store=None, path=None, interval=CONTACTS_RELOAD_INTERVAL,
+                 generations=contacts_store.CONTACTS_GENERATIONS):
+        self.loader = loader
+        self.path = str(path or contacts_store.CONTACTS_DATABASE_PATH)
+        self.interval = interval
+        self.generations = generations
+        self.current = store if store is not None else loader()
+        self._signature = self._stat()
+        self._stores = OrderedDict([(self.current.version, self.current)])
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._thread = None
+        self.last_diff = None
+        self.last_error = None
+        self.reloaded_at = None
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    def subscribe(self, listener):
+        """Call listener(old_store, new_store, diff) before each swap; returns the current store
+
+        Registering and reading the store happen under the reload lock, so an
+        index built from the returned store can't miss a reload.
+        """
+        with self._lock:
+            self._listeners.append(listener)
+            return self.current
+
+    def store_for(self, version):
+        """The store a result was produced from, or None once it has been dropped
+
+        A result whose store is gone must be searched again: its contact
+        indexes mean nothing in any other version.
+        """
+        return self._stores.get(version)
+
+    def poll(self):
+        """Reload if the export changed since the last check; returns the diff or None"""
+        signature = self._stat()
+        if signature is None or signature == self._signature:
+            return None
+
+        with self._lock:
+            if signature == self._signature:
+                return None
+            old = self.current
+            try:
+                if isinstance(old, contacts_store.ContactsStore):
+                    with open(self.path, 'rb') as f:
+                        raw = f.read()
+                    new, diff = old.updated(json.loads(raw), contacts_store.source_version(raw))
+                else:
+                    new = self.loader()
+                    diff = contacts_store.diff_stores(old, new) if new.version != old.version else None
+            except (OSError, ValueError) as e:
+                # Most likely caught mid-write; the signature stays stale so the next poll retries
+                self.last_error = str(e)
+                return None
+
+            self._signature = signature
+            if new.version == old.version:
+                return None  # Touched but not changed
+
+            for listener in self._listeners:
+                listener(old, new, diff)
+            self.current = new
+            self._stores[new.version] = new
+            while len(self._stores) > self.generations:
+                self._stores.popitem(last=False)
+            self.last_diff = diff
+            self.last_error = None
+            self.reloaded_at = time.time()
+            return diff
+
+    def start(self):
+        """Poll every interval seconds on a daemon thread (no-op when interval is 0)"""
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name='contacts-watcher', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.poll()
+            except Exception as e:  # Keep watching; the error is shown in the dashboard
+                self.last_error = str(e)
@@ -0,0 +1,98 @@
+# disk_cache.py - Persistent TTL Cache Shared Between Dashboard Processes
+import json
+import sqlite3
+import threading
+import time
+
+
+class DiskCache:
+    """SQLite-backed key/value cache with TTL expiry and LRU eviction
+
+    The database runs in WAL mode so several Streamlit workers (or both apps)
+    can read and write the same file concurrently. Negative entries (lookups
+    that found nothing) are stored with their own, usually shorter, TTL.
+    Expired entries are kept for stale_grace more seconds (still subject to
+    the LRU size bound) so get(allow_stale=True) can serve them as a last
+    known answer.
+    """
+
+    def __init__(self, path, table='cache', ttl=86400, negative_ttl=3600, max_entries=100000, stale_grace=0):
+        self.path = str(path)
+        self.table = table
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.stale_grace = stale_grace
+        self._lock = threading.Lock()
+        self._writes = 0
+        # Size is checked every few writes, so the table may briefly exceed max_entries by ~10%
+        self._evict_every = max(1, min(100, max_entries // 10))
+
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(f'''
+            CREATE TABLE IF NOT EXISTS {table} (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                negative INTEGER NOT NULL DEFAULT 0,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        ''')
+        self._conn.execute(f'CREATE INDEX IF NOT EXISTS {table}_accessed ON {table} (accessed_at)')
+
+    def get(self, key, allow_stale=False):
+        """Return (value, negative) for key, or None on a miss or expired entry"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                f'SELECT value, negative, expires_at FROM {self.table} WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None or (row[2] < now and not allow_stale):
+                return None
+            self._conn.execute(f'UPDATE {self.table} SET accessed_at = ? WHERE key = ?', (now, key))
+        return json.loads(row[0]), bool(row[1])
+
+    def set(self, key, value, negative=False, ttl=None):
+        """Store a JSON-serializable value, evicting least recently used entries if full"""
+        now = time.time()
+        if ttl is None:
+            ttl = self.negative_ttl if negative else self.ttl
+
+        with self._lock:
+            self._conn.execute(
+                f'INSERT OR REPLACE INTO {self.table} (key, value, negative, expires_at, accessed_at) '
+                f'VALUES (?, ?, ?, ?, ?)',
+                (key, json.dumps(value), int(negative), now + ttl, now)
+            )
+            self._writes += 1
+            if self._writes % self._evict_every == 0:
+                self._evict(now)
+
+    def _evict(self, now):
+        """Drop entries expired for longer than the grace window, then the least recently used beyond max_entries"""
+        self._conn.execute(f'DELETE FROM {self.table} WHERE expires_at < ?', (now - self.stale_grace,))
+        excess = self._conn.execute(f'SELECT COUNT(*) FROM {self.table}').fetchone()[0] - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                f'DELETE FROM {self.table} WHERE key IN '
+                f'(SELECT key FROM {self.table} ORDER BY accessed_at LIMIT ?)',
+                (excess,)
+            )
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute(f'DELETE FROM {self.table} WHERE key = ?', (key,))
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute(f'DELETE FROM {self.table}')
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute(f'SELECT COUNT(*) FROM {self.table}').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
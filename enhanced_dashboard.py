@@ -1,8 +1,6 @@
 # enhanced_dashboard_fixed.py - Mobile-Optimized IP-to-ZoomInfo Dashboard
 import streamlit as st
 import pandas as pd
-import requests
-import json
 from datetime import datetime
 import time
 import plotly.express as px
@@ -10,33 +8,61 @@ import plotly.graph_objects as go
 import numpy as np
 import random
 import os
+import asyncio
+import functools
 from pathlib import Path
 
+import access_log
+import alias_matcher
+import company_tiers
+import contact_metadata
+import contacts_store
+import contacts_watcher
+import enrichment
+import ip_resolver
+import name_matcher
+import provider_resources
+import stable_random
+import visitor_export
+import visitor_sessions
+import visitor_state
+
 st.set_page_config(
     page_title="IP-to-ZoomInfo Lead Generator",
     page_icon="🎯",
     layout="wide"
 )
 
-# Load external contacts database
-@st.cache_data
+# Load external contacts database once per process; records are read-only and shared by all sessions
+@st.cache_resource
 def load_contacts_database():
     """Load contacts from external JSON file"""
+    progress_bar = st.empty()
+    
+    def report_import(done, total, contacts):
+        progress_bar.progress(done / max(total, 1), text=f"Importing contacts database: {contacts:,} contacts")
+    
     try:
-        current_dir = Path(__file__).parent
-        json_path = current_dir / 'zoominfo_contacts_database.json'
-        
-        with open(json_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return contacts_store.load_contacts_store(progress=report_import)
     except FileNotFoundError:
         st.error("❌ Contacts database file not found!")
-        return {}
+        return contacts_store.ContactsStore({})
     except Exception as e:
         st.error(f"❌ Error loading contacts database: {e}")
-        return {}
+        return contacts_store.ContactsStore({})
+    finally:
+        progress_bar.empty()
+
+# Watch the contacts export and swap in updates without a restart
+@st.cache_resource
+def get_contacts_watcher():
+    """Start the background reload watcher over the loaded contacts database"""
+    watcher = contacts_watcher.ContactsWatcher(contacts_store.load_contacts_store, store=load_contacts_database())
+    watcher.start()
+    return watcher
 
-# Load the contacts database
-CONTACTS_DATABASE = load_contacts_database()
+# Load the contacts database; this run keeps reading the same store even if a reload lands mid-run
+CONTACTS_DATABASE = get_contacts_watcher().current
 
 # Mobile-First Responsive CSS
 st.markdown("""
@@ -155,128 +181,164 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Resolver, cache, HTTP client, coalescer, breaker and limiter are process-wide (provider_resources)
 def get_company_from_ip(ip_address):
     """Convert IP to Company"""
+    return ip_resolver.resolve_ip(
+        ip_address,
+        resolver=provider_resources.load_ip_resolver(),
+        cache=provider_resources.load_ip_cache(),
+        client=provider_resources.get_http_client(),
+        coalescer=provider_resources.get_ip_coalescer(),
+        breaker=provider_resources.get_ip_breaker(),
+        limiter=provider_resources.get_ip_limiter(),
+        timeout=10
+    )
+
+# Company alias automaton, built once per process from company_aliases.json
+@st.cache_resource
+def get_alias_matcher():
+    """Build the Aho-Corasick company alias matcher over canonical organization names"""
+    return alias_matcher.load_alias_matcher(normalize=name_matcher.canonicalize_org, whole_words=True)
+
+@st.cache_resource
+def get_company_index():
+    """Build the trigram index over contacts DB companies and their aliases, kept in step with reloads"""
+    aliases = get_alias_matcher().aliases
+    
+    def apply_reload(old, new, diff):
+        for key in diff['removed']:
+            index.remove(key)
+        for key in diff['added']:
+            # DB keys like 'american' are ids, not names: only companies without aliases are indexed by key
+            index.add_company(key, aliases.get(key))
+    
+    index = name_matcher.TrigramIndex()
+    store = get_contacts_watcher().subscribe(apply_reload)
+    apply_reload(None, store, {'removed': [], 'added': list(store.keys())})
+    return index
+
+# Scoring, revenue, conversion and cost parameters per company tier, reloaded when the file changes
+def get_tiers_signature():
+    """(size, mtime) of the tier table file, or None if it can't be read"""
     try:
-        response = requests.get(f"http://ip-api.com/json/{ip_address}", timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        
-        if data.get('org'):
-            return {
-                'success': True,
-                'ip': ip_address,
-                'organization': data['org'],
-                'city': data.get('city', 'Unknown'),
-                'region': data.get('regionName', 'Unknown'),
-                'country': data.get('country', 'Unknown'),
-                'isp': data.get('isp', 'Unknown'),
-                'timezone': data.get('timezone', 'Unknown')
-            }
-        return {'success': False, 'error': 'No company found for this IP'}
+        stat = os.stat(company_tiers.COMPANY_TIERS_PATH)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+@st.cache_resource(max_entries=1)
+def load_tier_table(signature):
+    """Load the company tier table (signature keys the cache to the file's contents)"""
+    return company_tiers.load_tier_table()
+
+def get_tier_table():
+    return load_tier_table(get_tiers_signature())
+
+@st.cache_resource
+def load_result_cache():
+    """Open the on-disk ZoomInfo result cache (shared with the other workers)"""
+    try:
+        return enrichment.load_result_cache()
     except Exception as e:
-        return {'success': False, 'error': f'Error: {str(e)}'}
+        st.warning(f"⚠️ Result cache unavailable: {e}")
+        return None
+
+@st.cache_resource(max_entries=4)
+def load_data_version(contacts_version, tiers_signature):
+    """Fingerprint of the contacts DB and tier table contents"""
+    try:
+        tiers = Path(company_tiers.COMPANY_TIERS_PATH).read_text(encoding='utf-8')
+    except OSError:
+        tiers = ''
+    return stable_random.stable_key(contacts_version, tiers)
+
+def get_data_version(contacts_version):
+    """Data version for cached results; editing the contacts DB or the tier table changes it"""
+    return load_data_version(contacts_version, get_tiers_signature())
+
+def match_company_key(company_name):
+    """Resolve an organization string to a contacts DB key: alias match first, then fuzzy"""
+    for key in get_alias_matcher().matches(company_name):
+        if key in CONTACTS_DATABASE:
+            return key
+    
+    # The shared index may already hold companies from a reload this run hasn't picked up
+    candidates = get_company_index().search(company_name, k=1)
+    if candidates and candidates[0][2] >= name_matcher.FUZZY_MATCH_THRESHOLD and candidates[0][0] in CONTACTS_DATABASE:
+        return candidates[0][0]
+    return None
+
+def get_cached_search():
+    """search_zoominfo through the shared result cache, keyed to this run's contacts DB and tier table"""
+    return enrichment.cached_search(search_zoominfo, load_result_cache(), get_data_version(CONTACTS_DATABASE.version))
+
+def get_lead_contacts(result):
+    """Contacts of a result's lead: DB records seen through the lead's overlay, or generated contacts
+
+    Overlay indexes refer to the store the lead was found in, which may
+    predate a reload. Once that store has been dropped, the lead is searched
+    again against this run's store and the result updated in place.
+    """
+    zoominfo_data = result['zoominfo_data']
+    if 'contact_overlay' not in zoominfo_data:
+        return zoominfo_data['contacts']
+
+    store = get_contacts_watcher().store_for(zoominfo_data.get('contacts_version'))
+    if store is None:
+        search = get_cached_search()
+        zoominfo_data = result['zoominfo_data'] = search(result['company_data']['organization'], result['ip'])
+        if 'contact_overlay' not in zoominfo_data:
+            return zoominfo_data['contacts']
+        store = CONTACTS_DATABASE
+    return contacts_store.lead_contacts(store, zoominfo_data['company_key'], zoominfo_data['contact_overlay'])
 
 def search_zoominfo(company_name, ip_address):
     """Search ZoomInfo database with randomization"""
-    company_lower = company_name.lower()
-    
-    # Aviation companies mapping
-    aviation_companies = {
-        'boeing': ['boeing', 'the boeing company'],
-        'delta': ['delta', 'delta air lines', 'delta airlines'],
-        'american': ['american airlines', 'american', 'aa.com'],
-        'lufthansa': ['lufthansa', 'lufthansa technik', 'lht'],
-        'united': ['united airlines', 'united', 'ual'],
-        'rolls-royce': ['rolls-royce', 'rolls royce', 'rr.com']
-    }
-    
     # Search for aviation companies
-    for key, search_terms in aviation_companies.items():
-        if any(term in company_lower for term in search_terms):
-            if key in CONTACTS_DATABASE:
-                contacts_list = CONTACTS_DATABASE[key]
-                
-                # Randomize contacts selection based on IP - ensure different results per IP
-                random.seed(hash(ip_address + company_name))  # Use both IP and company for more variety
-                num_contacts = random.randint(8, min(len(contacts_list), 15))  # Minimum 8 contacts
-                selected_contacts = random.sample(contacts_list, num_contacts)
-                
-                # Add randomized metadata and realistic matching status
-                for idx, contact in enumerate(selected_contacts):
-                    # Use contact name + IP for unique randomization per contact
-                    random.seed(hash(ip_address + contact['name'] + str(idx)))
-                    
-                    contact['confidence_score'] = f"{random.randint(85, 98)}%"
-                    contact['last_updated'] = f"2025-01-{random.randint(10, 30):02d}"
-                    contact['verified'] = '✅ Verified' if random.random() > 0.05 else '⚠️ Pending'
-                    
-                    # Company-specific matching rates (aviation companies have better coverage)
-                    match_chance = random.random()
-                    
-                    if 'boeing' in company_name.lower():
-                        # Boeing - premium coverage
-                        if match_chance > 0.40:  # 60% full matches
-                            contact['zoominfo_match'] = '🟢 Found in ZoomInfo DB'
-                            contact['match_confidence'] = f"{random.randint(92, 99)}%"
-                        elif match_chance > 0.15:  # 25% partial
-                            contact['zoominfo_match'] = '🟡 Partial Match'
-                            contact['match_confidence'] = f"{random.randint(75, 90)}%"
-                        else:  # 15% not found
-                            contact['zoominfo_match'] = '🔴 Not Found in ZoomInfo'
-                            contact['match_confidence'] = f"{random.randint(45, 65)}%"
-                    elif any(airline in company_name.lower() for airline in ['delta', 'american', 'united']):
-                        # Major airlines - good coverage
-                        if match_chance > 0.50:  # 50% full matches
-                            contact['zoominfo_match'] = '🟢 Found in ZoomInfo DB'
-                            contact['match_confidence'] = f"{random.randint(88, 96)}%"
-                        elif match_chance > 0.20:  # 30% partial
-                            contact['zoominfo_match'] = '🟡 Partial Match'
-                            contact['match_confidence'] = f"{random.randint(70, 85)}%"
-                        else:  # 20% not found
-                            contact['zoominfo_match'] = '🔴 Not Found in ZoomInfo'
-                            contact['match_confidence'] = f"{random.randint(40, 65)}%"
-                    elif 'rolls-royce' in company_name.lower():
-                        # Rolls-Royce - good coverage
-                        if match_chance > 0.45:  # 55% full matches
-                            contact['zoominfo_match'] = '🟢 Found in ZoomInfo DB'
-                            contact['match_confidence'] = f"{random.randint(90, 97)}%"
-                        elif match_chance > 0.20:  # 25% partial
-                            contact['zoominfo_match'] = '🟡 Partial Match'
-                            contact['match_confidence'] = f"{random.randint(72, 87)}%"
-                        else:  # 20% not found
-                            contact['zoominfo_match'] = '🔴 Not Found in ZoomInfo'
-                            contact['match_confidence'] = f"{random.randint(42, 68)}%"
-                    else:
-                        # Other aviation companies - moderate coverage
-                        if match_chance > 0.65:  # 35% full matches
-                            contact['zoominfo_match'] = '🟢 Found in ZoomInfo DB'
-                            contact['match_confidence'] = f"{random.randint(85, 93)}%"
-                        elif match_chance > 0.35:  # 30% partial
-                            contact['zoominfo_match'] = '🟡 Partial Match'
-                            contact['match_confidence'] = f"{random.randint(65, 82)}%"
-                        else:  # 35% not found
-                            contact['zoominfo_match'] = '🔴 Not Found in ZoomInfo'
-                            contact['match_confidence'] = f"{random.randint(38, 65)}%"
-                
-                # Company info
-                company_info = {
-                    'name': company_name,
-                    'employees': f"{random.randint(1000, 50000):,}+",
-                    'revenue': f"${random.randint(100, 2000)}M+",
-                    'industry': 'Aviation & Aerospace',
-                    'headquarters': 'Global Operations',
-                    'website': f"www.{key}.com"
-                }
-                
-                return {
-                    'success': True,
-                    'company': company_info,
-                    'contacts': selected_contacts
-                }
+    key = match_company_key(company_name)
+    tier_name = get_tier_table().tier_name(key)
+    tier = get_tier_table().get(tier_name)
+    
+    if key is not None:
+        # Only the company's contact count is needed to pick contacts; records are read on display
+        contact_count = CONTACTS_DATABASE.contact_count(key)
+        
+        # Randomize contacts selection based on IP - ensure different results per IP
+        rng = stable_random.rng('contacts', ip_address, company_name)  # Use both IP and company for more variety
+        num_contacts = rng.randint(min(8, contact_count), min(contact_count, 15))  # Minimum 8 contacts when the company has them
+        selected_ids = rng.sample(range(contact_count), num_contacts)
+        
+        # Add randomized metadata and realistic matching status, keyed by IP and DB position,
+        # for all selected contacts in one vectorized draw (tier sets the coverage rates).
+        # The DB records stay untouched: the lead only keeps contact indexes plus its annotations
+        metadata = contact_metadata.generate_contact_metadata(
+            stable_random.stable_seed('contact', ip_address, key), selected_ids, [tier]
+        )
+        overlay = contacts_store.make_overlay(selected_ids, contact_metadata.metadata_records(metadata))
+        
+        # Company info
+        company_rng = stable_random.rng('company', ip_address, company_name)
+        company_info = {
+            'name': company_name,
+            'employees': f"{company_rng.randint(1000, 50000):,}+",
+            'revenue': f"${company_rng.randint(100, 2000)}M+",
+            'industry': 'Aviation & Aerospace',
+            'headquarters': 'Global Operations',
+            'website': f"www.{key}.com"
+        }
+        
+        return {
+            'success': True,
+            'company': company_info,
+            'company_key': key,
+            'tier': tier_name,
+            'contacts_version': CONTACTS_DATABASE.version,
+            'contact_overlay': overlay
+        }
     
     # Generic fallback with randomized contacts
-    random.seed(hash(ip_address + company_name + "fallback"))
+    rng = stable_random.rng('fallback', ip_address, company_name)
     
     # Pool of realistic business names
     first_names = ['Michael', 'Sarah', 'David', 'Jennifer', 'Robert', 'Lisa', 'James', 'Maria', 'John', 'Amanda', 
@@ -307,52 +369,41 @@ def search_zoominfo(company_name, ip_address):
     ]
     
     # Generate 3-6 random contacts
-    num_contacts = random.randint(3, 6)
-    selected_names = random.sample([(f, l) for f in first_names for l in last_names], num_contacts)
-    selected_titles = random.sample(titles, num_contacts)
+    num_contacts = rng.randint(3, 6)
+    selected_names = rng.sample([(f, l) for f in first_names for l in last_names], num_contacts)
+    selected_titles = rng.sample(titles, num_contacts)
     
     contacts = []
     company_domain = company_name.lower().replace(' ', '').replace('inc', '').replace('corp', '').replace('ltd', '')[:10]
     
-    for i, ((first, last), title_info) in enumerate(zip(selected_names, selected_titles)):
-        # Use unique randomization per contact
-        random.seed(hash(ip_address + f"{first}{last}" + str(i)))
-        
+    # More varied matching for unknown companies
+    metadata = contact_metadata.generate_contact_metadata(
+        stable_random.stable_seed('fallback-contact', ip_address, company_name), range(num_contacts), [tier]
+    )
+    
+    for (first, last), title_info, fields in zip(selected_names, selected_titles, contact_metadata.metadata_records(metadata)):
         contact = {
             'name': f"{first} {last}",
             'title': title_info['title'],
             'email': f"{first.lower()}.{last.lower()}@{company_domain}.com",
-            'phone': f"+1-{random.randint(200, 999)}-{random.randint(200, 999)}-{random.randint(1000, 9999)}",
+            'phone': f"+1-{rng.randint(200, 999)}-{rng.randint(200, 999)}-{rng.randint(1000, 9999)}",
             'seniority': title_info['seniority'],
-            'confidence_score': f"{random.randint(70, 88)}%",
-            'last_updated': f"2025-01-{random.randint(5, 25):02d}",
-            'verified': '✅ Verified' if random.random() > 0.25 else '⚠️ Pending'
+            **fields
         }
-        
-        # More varied matching for unknown companies
-        match_chance = random.random()
-        if match_chance > 0.85:  # 15% chance for full match
-            contact['zoominfo_match'] = '🟢 Found in ZoomInfo DB'
-            contact['match_confidence'] = f"{random.randint(85, 95)}%"
-        elif match_chance > 0.50:  # 35% chance for partial match
-            contact['zoominfo_match'] = '🟡 Partial Match'
-            contact['match_confidence'] = f"{random.randint(60, 80)}%"
-        else:  # 50% chance for not found
-            contact['zoominfo_match'] = '🔴 Not Found in ZoomInfo'
-            contact['match_confidence'] = f"{random.randint(35, 65)}%"
-            
         contacts.append(contact)
     
     return {
         'success': True,
         'company': {
             'name': company_name,
-            'employees': f"{random.randint(500, 10000):,}+",
-            'revenue': f"${random.randint(50, 500)}M+",
+            'employees': f"{rng.randint(500, 10000):,}+",
+            'revenue': f"${rng.randint(50, 500)}M+",
             'industry': 'Business Services',
             'headquarters': 'Various Locations',
             'website': f"www.{company_domain}.com"
         },
+        'company_key': None,
+        'tier': tier_name,
         'contacts': contacts
     }
 
@@ -430,56 +481,46 @@ def generate_visitor_data():
     
     return visitors
 
-visitor_data = generate_visitor_data()
+# Real traffic comes from the web server's access log when one is configured, else a visitor CSV export.
+# Either way one follower per process reads only what was appended since the last run, and visits are
+# rebuilt once per version and shared read-only by all sessions
+@st.cache_resource(show_spinner="Reading access log...", max_entries=1)
+def load_visitor_log(path, size, mtime):
+    """Sessionize the most recent hits of a compressed log (size/mtime key the cache to the file's contents)"""
+    return visitor_sessions.sessionize(visitor_sessions.hits_frame(access_log.recent_hits(path)))
 
-# Website Analytics Overview
-st.markdown("#### 🌐 Recent bhworldwide.com Visitors")
+@st.cache_resource
+def get_live_visitor_log(path):
+    """Start following the access log into a fixed-capacity ring buffer"""
+    return access_log.LiveVisitorLog(path)
 
-# Key metrics
-col1, col2, col3, col4 = st.columns(4)
+@st.cache_resource(show_spinner=False, max_entries=2)
+def live_visits(path, version):
+    """Sessionize the buffered hits (version changes whenever new hits arrive)"""
+    return visitor_sessions.sessionize(visitor_sessions.hits_frame(get_live_visitor_log(path).hits()))
 
-with col1:
-    st.markdown(f"""
-    <div class="compact-metric">
-        <h4>Today's Visitors</h4>
-        <h2>{len(visitor_data)}</h2>
-    </div>
-    """, unsafe_allow_html=True)
+@st.cache_resource
+def get_visitor_export(path):
+    """Start following the visitor CSV export"""
+    return visitor_export.ExportFollower(path)
 
-with col2:
-    high_potential = len([v for v in visitor_data if v['lead_potential'] == 'High'])
-    st.markdown(f"""
-    <div class="compact-metric">
-        <h4>High-Value Leads</h4>
-        <h2>{high_potential}</h2>
-    </div>
-    """, unsafe_allow_html=True)
+@st.cache_resource(show_spinner=False, max_entries=2)
+def export_visits(path, version):
+    """Sessionize the export's rows (version changes whenever rows are added)"""
+    return visitor_sessions.sessionize(get_visitor_export(path).frame)
 
-with col3:
-    new_visitors = len([v for v in visitor_data if v['status'] == 'New'])
-    st.markdown(f"""
-    <div class="compact-metric">
-        <h4>Unprocessed</h4>
-        <h2>{new_visitors}</h2>
-    </div>
-    """, unsafe_allow_html=True)
-
-with col4:
-    avg_pages = sum(v['pages_viewed'] for v in visitor_data) / len(visitor_data)
-    st.markdown(f"""
-    <div class="compact-metric">
-        <h4>Avg Pages/Visit</h4>
-        <h2>{avg_pages:.1f}</h2>
-    </div>
-    """, unsafe_allow_html=True)
-
-# Visitor tracking table
-st.markdown("##### 📋 Website Visitor Log")
+# Which visitors were ingested and enriched, persisted so each run only handles what's new
+@st.cache_resource
+def load_visitor_state():
+    """Open the visitor state table (shared with the other workers)"""
+    try:
+        return visitor_state.load_visitor_state()
+    except Exception as e:
+        st.warning(f"⚠️ Visitor state unavailable, statuses won't persist: {e}")
+        return None
 
-# Convert to dataframe for display
-visitor_df = pd.DataFrame(visitor_data)
-visitor_df = visitor_df[['timestamp', 'organization', 'ip', 'page_visited', 'country', 'session_duration', 'lead_potential', 'status']]
-visitor_df.columns = ['Visit Time', 'Organization', 'IP Address', 'Page Visited', 'Country', 'Duration', 'Lead Potential', 'Status']
+# Website Analytics Overview
+st.markdown("#### 🌐 Recent bhworldwide.com Visitors")
 
 # Color code by status
 def highlight_status(row):
@@ -490,15 +531,189 @@ def highlight_status(row):
     else:
         return ['background-color: #f8f9fa'] * len(row)  # Gray for processed
 
-st.dataframe(
-    visitor_df.style.apply(highlight_status, axis=1),
-    use_container_width=True, 
-    hide_index=True
-)
+def load_visits():
+    """Sessionized visits from the configured source, or None"""
+    visits = None
+    if access_log.VISITOR_LOG_PATH:
+        try:
+            live_log = get_live_visitor_log(access_log.VISITOR_LOG_PATH)
+            live_log.refresh()
+            visits = live_visits(access_log.VISITOR_LOG_PATH, live_log.version)
+        except ValueError:  # Compressed logs can't be followed; read them whole instead
+            try:
+                log_stat = os.stat(access_log.VISITOR_LOG_PATH)
+                visits = load_visitor_log(access_log.VISITOR_LOG_PATH, log_stat.st_size, log_stat.st_mtime_ns)
+            except OSError as e:
+                st.warning(f"⚠️ Could not read access log: {e}")
+        except OSError as e:
+            st.warning(f"⚠️ Could not follow access log: {e}")
+        if visits is None or not len(visits):
+            st.info("No page hits in the access log yet, showing sample visitor data.")
+            visits = None
+    elif visitor_export.VISITOR_CSV_PATH:
+        try:
+            export = get_visitor_export(visitor_export.VISITOR_CSV_PATH)
+            export.refresh()
+            visits = export_visits(visitor_export.VISITOR_CSV_PATH, export.version)
+        except (OSError, ValueError) as e:
+            st.warning(f"⚠️ Could not read visitor export: {e}")
+    return visits
+
+def ingest_visits(state):
+    """Record what the configured source gained since its watermark (parsed from the stored position)"""
+    try:
+        if access_log.VISITOR_LOG_PATH:
+            visitor_state.ingest_log(state, access_log.VISITOR_LOG_PATH)
+        else:
+            visitor_state.ingest_export(state, visitor_export.VISITOR_CSV_PATH)
+    except (OSError, ValueError) as e:
+        st.warning(f"⚠️ Could not record new visitors: {e}")
+
+def show_visitor_overview():
+    """Render the visitor metrics and log table; returns the rows shown, their frame and the state table"""
+    visits = load_visits()
+
+    # Only what was appended past the source's watermark is read and written to the state table
+    tracked_state = load_visitor_state() if visits is not None else None
+    if tracked_state is not None:
+        ingest_visits(tracked_state)
+
+    visitor_data = None
+    if visits is not None:
+        visitor_query = st.text_input(
+            "Filter visitors", placeholder="Organization, IP or network (e.g. 52.16.0.0/14)"
+        )
+        matching_visits = visitor_export.filter_visitors(visits, visitor_query)
+        resolver = provider_resources.load_ip_resolver()
+        visitor_data = visitor_sessions.visitor_rows(matching_visits, lookup=resolver.lookup if resolver else None)
+        st.caption(f"Showing the {len(visitor_data):,} most recent of {len(matching_visits):,} matching visits")
+        if tracked_state is not None:
+            statuses = tracked_state.statuses(row['ip'] for row in visitor_data)
+            for row in visitor_data:
+                row['status'] = statuses.get(row['ip'], 'New')
+    if visitor_data is None:
+        visitor_data = generate_visitor_data()
+
+    # Key metrics
+    col1, col2, col3, col4 = st.columns(4)
+
+    with col1:
+        st.markdown(f"""
+        <div class="compact-metric">
+            <h4>Today's Visitors</h4>
+            <h2>{len(visitor_data)}</h2>
+        </div>
+        """, unsafe_allow_html=True)
+
+    with col2:
+        high_potential = len([v for v in visitor_data if v['lead_potential'] == 'High'])
+        st.markdown(f"""
+        <div class="compact-metric">
+            <h4>High-Value Leads</h4>
+            <h2>{high_potential}</h2>
+        </div>
+        """, unsafe_allow_html=True)
+
+    with col3:
+        if tracked_state is not None:
+            new_visitors = tracked_state.pending_count()
+        else:
+            new_visitors = len([v for v in visitor_data if v['status'] == 'New'])
+        st.markdown(f"""
+        <div class="compact-metric">
+            <h4>Unprocessed</h4>
+            <h2>{new_visitors}</h2>
+        </div>
+        """, unsafe_allow_html=True)
+
+    with col4:
+        avg_pages = sum(v['pages_viewed'] for v in visitor_data) / max(len(visitor_data), 1)
+        st.markdown(f"""
+        <div class="compact-metric">
+            <h4>Avg Pages/Visit</h4>
+            <h2>{avg_pages:.1f}</h2>
+        </div>
+        """, unsafe_allow_html=True)
+
+    # Visitor tracking table
+    st.markdown("##### 📋 Website Visitor Log")
+
+    # Convert to dataframe for display
+    visitor_df = pd.DataFrame(visitor_data, columns=visitor_sessions.VISITOR_COLUMNS)
+    visitor_df = visitor_df[['timestamp', 'organization', 'ip', 'page_visited', 'country', 'session_duration', 'lead_potential', 'status']]
+    visitor_df.columns = ['Visit Time', 'Organization', 'IP Address', 'Page Visited', 'Country', 'Duration', 'Lead Potential', 'Status']
+
+    st.dataframe(
+        visitor_df.style.apply(highlight_status, axis=1),
+        use_container_width=True, 
+        hide_index=True
+    )
+
+    return visitor_data, visitor_df, tracked_state
+
+# Live mode re-renders just this section on a timer from the ring buffer; the rest of the page keeps its data
+if access_log.VISITOR_LOG_PATH and access_log.VISITOR_LOG_TAIL:
+    show_visitor_overview = st.fragment(run_every=access_log.VISITOR_TAIL_REFRESH)(show_visitor_overview)
+
+visitor_data, visitor_df, tracked_state = show_visitor_overview()
+
+def record_enrichment(ip, error=None):
+    """Update the visitor state table; transient failures leave the visitor pending"""
+    if tracked_state is None:
+        return
+    if error is None or error == ip_resolver.NO_COMPANY_ERROR:
+        tracked_state.mark_enriched(ip, error)
+    else:
+        tracked_state.mark_failed(ip, error)
+
+def store_result(new_result):
+    """Update or add a result in the session's processed results"""
+    for idx, existing in enumerate(st.session_state.processed_results):
+        if existing['ip'] == new_result['ip']:
+            st.session_state.processed_results[idx] = new_result
+            return
+    st.session_state.processed_results.append(new_result)
+
+async def analyze_visitors(visitors, progress):
+    """Enrich visitors concurrently, advancing the progress bar as each one finishes"""
+    # Bind the cached resources here, lookups run in worker threads. All IPs are resolved up front through
+    # the batch endpoint (100 per request); single lookups only retry the ones that failed transiently
+    resources = dict(
+        resolver=provider_resources.load_ip_resolver(),
+        cache=provider_resources.load_ip_cache(),
+        client=provider_resources.get_http_client(),
+        coalescer=provider_resources.get_ip_coalescer(),
+        breaker=provider_resources.get_ip_breaker(),
+        timeout=10
+    )
+    prefetch = functools.partial(ip_resolver.resolve_many, limiter=provider_resources.get_ip_batch_limiter(), **resources)
+    lookup = functools.partial(ip_resolver.resolve_ip, limiter=provider_resources.get_ip_limiter(), **resources)
+    failures = []
+    done = 0
+
+    search = get_cached_search()
+
+    async for visitor, result in enrichment.enrich_visitors(visitors, lookup, search, prefetch=prefetch):
+        done += 1
+        record_enrichment(visitor['ip'], result.get('error'))
+        if 'error' in result:
+            failures.append((visitor, result['error']))
+        else:
+            store_result(result)
+        progress.progress(done / len(visitors), text=f"Analyzed {done}/{len(visitors)}: {visitor['organization']}")
+
+    return failures
 
 # Action section
 st.markdown("#### 🚀 Lead Generation Actions")
 
+ip_breaker = provider_resources.get_ip_breaker()
+if ip_breaker.state != 'closed':
+    st.warning(
+        f"⚠️ Geolocation provider degraded ({ip_breaker.last_trip_reason}). "
+        "Lookups are answered from local data and cached results until it recovers."
+    )
+
 action_col1, action_col2 = st.columns(2)
 
 with action_col1:
@@ -515,7 +730,19 @@ with action_col1:
 with action_col2:
     st.markdown("**⚡ Quick Actions:**")
     if st.button("📊 Analyze All New Visitors", use_container_width=True):
-        st.info("Processing all new visitors... This may take a few moments.")
+        if tracked_state is not None:
+            # New and expired visitors from the state table, not just the ones on screen
+            new_visitor_list = tracked_state.pending()
+        else:
+            new_visitor_list = [v for v in visitor_data if v['status'] == 'New']
+        if new_visitor_list:
+            progress = st.progress(0.0, text="Processing all new visitors... This may take a few moments.")
+            failures = asyncio.run(analyze_visitors(new_visitor_list, progress))
+            st.success(f"✅ Analyzed {len(new_visitor_list) - len(failures)} of {len(new_visitor_list)} new visitors")
+            for visitor, error in failures:
+                st.error(f"❌ {visitor['organization']} ({visitor['ip']}): {error}")
+        else:
+            st.info("No new visitors to analyze.")
     if st.button("📥 Export Visitor Data", use_container_width=True):
         csv = visitor_df.to_csv(index=False)
         st.download_button("⬇️ Download CSV", csv, "bhworldwide_visitors.csv", "text/csv")
@@ -545,7 +772,8 @@ if process_single and single_ip:
         company_result = get_company_from_ip(single_ip)
         
         if company_result['success']:
-            zoominfo_result = search_zoominfo(company_result['organization'], single_ip)
+            search = get_cached_search()
+            zoominfo_result = search(company_result['organization'], single_ip)
             
             # Add to results
             new_result = {
@@ -554,18 +782,10 @@ if process_single and single_ip:
                 'zoominfo_data': zoominfo_result
             }
             
-            # Update or add result
-            existing_index = None
-            for idx, existing in enumerate(st.session_state.processed_results):
-                if existing['ip'] == single_ip:
-                    existing_index = idx
-                    break
-            
-            if existing_index is not None:
-                st.session_state.processed_results[existing_index] = new_result
-            else:
-                st.session_state.processed_results.append(new_result)
+            store_result(new_result)
+            record_enrichment(single_ip)
         else:
+            record_enrichment(single_ip, company_result['error'])
             st.error(f"❌ {company_result['error']}")
 
 # Display Results
@@ -580,6 +800,7 @@ if st.session_state.processed_results:
     for i, result in enumerate(st.session_state.processed_results):
         ip = result['ip']
         company_data = result['company_data']
+        lead_contacts = get_lead_contacts(result)  # May re-run the search, so read zoominfo_data after it
         zoominfo_data = result['zoominfo_data']
         company_info = zoominfo_data['company']
         
@@ -601,6 +822,8 @@ if st.session_state.processed_results:
                 st.write(f"**IP:** {company_data['ip']}")
                 st.write(f"**Organization:** {company_data['organization']}")
                 st.write(f"**Location:** {company_data['city']}, {company_data['country']}")
+                if company_data.get('degraded'):
+                    st.warning("⚠️ Degraded path: cached answer used while the geolocation provider is unavailable")
                 
             with col2:
                 st.markdown("#### 🏢 Company Profile")
@@ -614,7 +837,7 @@ if st.session_state.processed_results:
             
             # Create contacts dataframe with matching status
             contacts_data = []
-            for contact in zoominfo_data['contacts']:
+            for contact in lead_contacts:
                 contacts_data.append({
                     'Name': contact['name'],
                     'Title': contact['title'],
@@ -652,7 +875,7 @@ if st.session_state.processed_results:
                 <h5 style="margin: 0 0 0.5rem 0; color: #667eea;">🔍 Database Query Process</h5>
                 <p style="margin: 0; font-size: 0.9rem;"><strong>1. IP Analysis:</strong> {company_data['ip']} → {company_data['organization']}</p>
                 <p style="margin: 0; font-size: 0.9rem;"><strong>2. Company Matching:</strong> Searching for "{company_info['name']}" in ZoomInfo database</p>
-                <p style="margin: 0; font-size: 0.9rem;"><strong>3. Contact Extraction:</strong> Found {len(zoominfo_data['contacts'])} verified contacts</p>
+                <p style="margin: 0; font-size: 0.9rem;"><strong>3. Contact Extraction:</strong> Found {len(lead_contacts)} verified contacts</p>
             </div>
             """, unsafe_allow_html=True)
             
@@ -660,10 +883,10 @@ if st.session_state.processed_results:
             st.markdown("##### 🎯 Contact Matching Results")
             
             # Calculate matching statistics
-            total_contacts = len(zoominfo_data['contacts'])
-            full_matches = len([c for c in zoominfo_data['contacts'] if '🟢' in c.get('zoominfo_match', '')])
-            partial_matches = len([c for c in zoominfo_data['contacts'] if '🟡' in c.get('zoominfo_match', '')])
-            no_matches = len([c for c in zoominfo_data['contacts'] if '🔴' in c.get('zoominfo_match', '')])
+            total_contacts = len(lead_contacts)
+            full_matches = len([c for c in lead_contacts if '🟢' in c.get('zoominfo_match', '')])
+            partial_matches = len([c for c in lead_contacts if '🟡' in c.get('zoominfo_match', '')])
+            no_matches = len([c for c in lead_contacts if '🔴' in c.get('zoominfo_match', '')])
             
             # Matching results display
             match_col1, match_col2, match_col3, match_col4 = st.columns(4)
@@ -706,7 +929,7 @@ if st.session_state.processed_results:
                 st.markdown("**📋 Contact Matching Breakdown:**")
                 
                 matching_data = []
-                for contact in zoominfo_data['contacts']:
+                for contact in lead_contacts:
                     matching_data.append({
                         'Contact Name': contact['name'],
                         'Title': contact['title'],
@@ -737,22 +960,22 @@ if st.session_state.processed_results:
             if CONTACTS_DATABASE:
                 st.markdown("**Available Companies in ZoomInfo Database:**")
                 
-                db_stats = []
-                for company_key, contacts_list in CONTACTS_DATABASE.items():
-                    db_stats.append({
-                        'Company': company_key.title(),
-                        'Total Contacts': len(contacts_list),
-                        'C-Level': len([c for c in contacts_list if c.get('seniority') == 'C-Level']),
-                        'VP-Level': len([c for c in contacts_list if c.get('seniority') == 'VP-Level']),
-                        'Directors': len([c for c in contacts_list if c.get('seniority') == 'Director']),
-                        'Coverage': '🟢 Complete' if len(contacts_list) > 15 else '🟡 Partial'
-                    })
+                watcher = get_contacts_watcher()
+                if watcher.reloaded_at:
+                    diff = watcher.last_diff
+                    st.caption(
+                        f"🔄 Reloaded {datetime.fromtimestamp(watcher.reloaded_at):%Y-%m-%d %H:%M:%S}: "
+                        f"{len(diff['added'])} companies added, {len(diff['removed'])} removed, {len(diff['changed'])} updated"
+                    )
+                if watcher.last_error:
+                    st.warning(f"⚠️ Contacts reload failed, still serving the previous data: {watcher.last_error}")
                 
-                db_df = pd.DataFrame(db_stats)
+                # Aggregates are computed when the database is loaded and patched on reload
+                db_df = CONTACTS_DATABASE.company_stats()
                 st.dataframe(db_df, use_container_width=True, hide_index=True)
                 
                 # Database summary metrics
-                total_contacts = sum(len(contacts) for contacts in CONTACTS_DATABASE.values())
+                total_contacts = CONTACTS_DATABASE.total_contacts()
                 total_companies = len(CONTACTS_DATABASE)
                 
                 col1, col2, col3, col4 = st.columns(4)
@@ -810,8 +1033,8 @@ if st.session_state.processed_results:
             st.markdown("##### 🔄 Data Freshness & Verification")
             
             verification_stats = {
-                'Verified': len([c for c in zoominfo_data['contacts'] if '✅' in c.get('verified', '')]),
-                'Pending': len([c for c in zoominfo_data['contacts'] if '⚠️' in c.get('verified', '')])
+                'Verified': len([c for c in lead_contacts if '✅' in c.get('verified', '')]),
+                'Pending': len([c for c in lead_contacts if '⚠️' in c.get('verified', '')])
             }
             
             fig_verification = go.Figure(data=[go.Pie(
@@ -841,22 +1064,12 @@ if st.session_state.processed_results:
             # Mobile-optimized summary
             company_name = company_info['name'].lower()
             
-            # Company-specific scoring
-            if 'boeing' in company_name:
-                lead_score = "🔥 AEROSPACE GIANT"
-                revenue_potential = "$500K - $2M+"
-                priority = "PLATINUM"
-                score_value = 95
-            elif any(airline in company_name for airline in ['delta', 'american', 'united']):
-                lead_score = "✈️ MAJOR AIRLINE"
-                revenue_potential = "$200K - $800K"
-                priority = "GOLD"
-                score_value = 85
-            else:
-                lead_score = "✅ QUALIFIED LEAD"
-                revenue_potential = "$50K - $300K"
-                priority = "SILVER"
-                score_value = 70
+            # Company-specific scoring, resolved once per result from the tier table
+            tier = get_tier_table().get(zoominfo_data.get('tier'))
+            lead_score = tier['lead_score']
+            revenue_potential = tier['revenue_potential']
+            priority = tier['priority']
+            score_value = tier['score']
             
             # Metrics row
             col1, col2, col3, col4 = st.columns(4)
@@ -881,7 +1094,7 @@ if st.session_state.processed_results:
                 st.markdown(f"""
                 <div class="compact-metric">
                     <h4>Contacts Found</h4>
-                    <h2>{len(zoominfo_data['contacts'])}</h2>
+                    <h2>{len(lead_contacts)}</h2>
                 </div>
                 """, unsafe_allow_html=True)
                 
@@ -900,8 +1113,8 @@ if st.session_state.processed_results:
             
             with viz_col1:
                 # Lead Score Gauge Chart with IP-specific variation
-                random.seed(hash(ip + company_name))
-                actual_score = score_value + random.randint(-8, 8)  # Add variation based on IP
+                score_rng = stable_random.rng('score', ip, company_name)
+                actual_score = score_value + score_rng.randint(-8, 8)  # Add variation based on IP
                 actual_score = max(50, min(100, actual_score))  # Keep in range
                 
                 fig_gauge = go.Figure(go.Indicator(
@@ -930,28 +1143,19 @@ if st.session_state.processed_results:
                 
             with viz_col2:
                 # Revenue Potential Distribution Curve - IP-specific
-                random.seed(hash(ip + company_name + "revenue"))
-                if 'boeing' in company_name:
-                    revenue_min, revenue_max = 500000, 2000000
-                elif any(airline in company_name for airline in ['delta', 'american', 'united']):
-                    revenue_min, revenue_max = 200000, 800000
-                elif 'lufthansa' in company_name:
-                    revenue_min, revenue_max = 100000, 500000
-                elif 'rolls-royce' in company_name:
-                    revenue_min, revenue_max = 300000, 1000000
-                else:
-                    revenue_min, revenue_max = 50000, 300000
+                revenue_rng = stable_random.rng('revenue', ip, company_name)
+                revenue_min, revenue_max = tier['revenue_range']
                 
                 # Add IP-specific variation to revenue ranges
-                actual_rev_min = revenue_min + random.randint(-50000, 50000)
-                actual_rev_max = revenue_max + random.randint(-100000, 100000)
+                actual_rev_min = revenue_min + revenue_rng.randint(-50000, 50000)
+                actual_rev_max = revenue_max + revenue_rng.randint(-100000, 100000)
                 actual_rev_min = max(10000, actual_rev_min)
                 actual_rev_max = max(actual_rev_min + 50000, actual_rev_max)
                 
                 # Create revenue probability distribution
                 revenue_range = np.linspace(actual_rev_min, actual_rev_max, 100)
                 center = (actual_rev_min + actual_rev_max) / 2
-                width_factor = 4 + random.randint(1, 4)  # Vary curve width
+                width_factor = 4 + revenue_rng.randint(1, 4)  # Vary curve width
                 probability = np.exp(-((revenue_range - center)**2) / (2 * ((actual_rev_max - actual_rev_min)/width_factor)**2))
                 
                 fig_revenue = go.Figure()
@@ -981,7 +1185,7 @@ if st.session_state.processed_results:
             
             with chart_col1:
                 # Industry Comparison Bar Chart - Realistic data based on IP/Company
-                random.seed(hash(ip + "industry"))
+                industry_rng = stable_random.rng('industry', ip)
                 
                 # Base industry scores with realistic variations
                 base_industry_data = {
@@ -994,7 +1198,7 @@ if st.session_state.processed_results:
                 
                 industry_data = {}
                 for industry, (min_score, max_score) in base_industry_data.items():
-                    industry_data[industry] = random.randint(min_score, max_score)
+                    industry_data[industry] = industry_rng.randint(min_score, max_score)
                 
                 current_industry = company_info['industry']
                 if current_industry in industry_data:
@@ -1025,7 +1229,7 @@ if st.session_state.processed_results:
             with chart_col2:
                 # Contact Roles Distribution Pie Chart - Based on actual contacts
                 contact_roles = {}
-                for contact in zoominfo_data['contacts']:
+                for contact in lead_contacts:
                     seniority = contact.get('seniority', 'Director')
                     if seniority == 'C-Level':
                         category = 'C-Level Executives'
@@ -1057,17 +1261,7 @@ if st.session_state.processed_results:
             
             with roi_col1:
                 # Realistic conversion rates based on company type
-                random.seed(hash(ip + "conversion"))
-                if 'boeing' in company_name:
-                    conversion_rate = random.uniform(0.18, 0.25)
-                elif any(airline in company_name for airline in ['delta', 'american', 'united']):
-                    conversion_rate = random.uniform(0.12, 0.18)
-                elif 'lufthansa' in company_name:
-                    conversion_rate = random.uniform(0.08, 0.14)
-                elif 'rolls-royce' in company_name:
-                    conversion_rate = random.uniform(0.15, 0.22)
-                else:
-                    conversion_rate = random.uniform(0.05, 0.12)
+                conversion_rate = stable_random.rng('conversion', ip).uniform(*tier['conversion_range'])
                     
                 st.markdown(f"""
                 <div class="compact-metric">
@@ -1087,17 +1281,7 @@ if st.session_state.processed_results:
                 
             with roi_col3:
                 # Realistic cost per lead based on company complexity
-                random.seed(hash(ip + "cost"))
-                if 'boeing' in company_name:
-                    cost_per_lead = random.randint(12000, 18000)
-                elif any(airline in company_name for airline in ['delta', 'american', 'united']):
-                    cost_per_lead = random.randint(7000, 12000)
-                elif 'lufthansa' in company_name:
-                    cost_per_lead = random.randint(8000, 14000)
-                elif 'rolls-royce' in company_name:
-                    cost_per_lead = random.randint(10000, 15000)
-                else:
-                    cost_per_lead = random.randint(4000, 8000)
+                cost_per_lead = stable_random.rng('cost', ip).randint(*tier['cost_range'])
                 
                 roi_percentage = (expected_value / cost_per_lead) * 100 if cost_per_lead > 0 else 0
                 st.markdown(f"""
@@ -1111,8 +1295,7 @@ if st.session_state.processed_results:
             st.markdown("#### 📈 Revenue Distribution Analysis")
             
             # Create histogram of potential revenue outcomes
-            random.seed(hash(ip + "histogram"))
-            revenue_samples = np.random.normal(
+            revenue_samples = stable_random.np_rng('histogram', ip).normal(
                 (actual_rev_min + actual_rev_max) / 2, 
                 (actual_rev_max - actual_rev_min) / 6, 
                 1000
@@ -1146,7 +1329,7 @@ if st.session_state.processed_results:
             st.markdown(f"- **Expected Value:** ${expected_value:,.0f}")
             st.markdown(f"- **Cost per Lead:** ${cost_per_lead:,}")
             st.markdown(f"- **ROI:** {roi_percentage:.0f}%")
-            st.markdown(f"- **Contacts Found:** {len(zoominfo_data['contacts'])}")
+            st.markdown(f"- **Contacts Found:** {len(lead_contacts)}")
 
 else:
     st.info("👆 Enter an IP address or click a demo button to get started!")
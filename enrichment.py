@@ -0,0 +1,124 @@
+# enrichment.py - Asyncio Visitor Enrichment Engine
+import asyncio
+import os
+import random
+
+from disk_cache import DiskCache
+from ip_resolver import IP_CACHE_PATH, is_definitive
+from stable_random import stable_key
+
+# ZoomInfo search results, stored next to the IP lookups in the same SQLite file
+RESULT_CACHE_PATH = os.environ.get('RESULT_CACHE_PATH', IP_CACHE_PATH)
+RESULT_CACHE_TTL = int(os.environ.get('RESULT_CACHE_TTL', 7 * 24 * 3600))
+RESULT_CACHE_MAX_ENTRIES = int(os.environ.get('RESULT_CACHE_MAX_ENTRIES', 50000))
+
+
+def load_result_cache(path=None):
+    """Open the on-disk ZoomInfo search result cache shared by all workers"""
+    return DiskCache(
+        path or RESULT_CACHE_PATH,
+        table='enrichment_results',
+        ttl=RESULT_CACHE_TTL,
+        max_entries=RESULT_CACHE_MAX_ENTRIES
+    )
+
+
+def result_cache_key(organization, ip_address, data_version=''):
+    """Stable cache key for a search; data_version changes when the contacts or tiers do"""
+    return stable_key('zoominfo', data_version, organization, ip_address)
+
+
+def cached_search(search, cache, data_version=''):
+    """Wrap search(organization, ip) so repeated searches are answered from cache
+
+    search must be deterministic for its arguments (seeded with stable_random),
+    otherwise a cached answer would differ from a fresh one.
+    """
+    if cache is None:
+        return search
+
+    def search_with_cache(organization, ip_address):
+        key = result_cache_key(organization, ip_address, data_version)
+        hit = cache.get(key)
+        if hit is not None:
+            return hit[0]
+        result = search(organization, ip_address)
+        cache.set(key, result)
+        return result
+
+    return search_with_cache
+
+
+def is_final_result(result):
+    """Definitive answers and degraded-path answers (provider circuit open) are not retried"""
+    return is_definitive(result) or result.get('degraded', False)
+
+
+async def _lookup_with_retries(lookup, ip_address, timeout, retries, backoff, jitter):
+    """Run a blocking lookup in a worker thread with a timeout and retries"""
+    result = None
+
+    for attempt in range(retries + 1):
+        if attempt:
+            # Full jitter: spread retries so concurrent failures don't retry in lockstep
+            await asyncio.sleep(jitter.uniform(0, backoff * 2 ** (attempt - 1)))
+
+        try:
+            result = await asyncio.wait_for(asyncio.to_thread(lookup, ip_address), timeout)
+        except asyncio.TimeoutError:
+            result = {'success': False, 'error': f'Error: lookup timed out after {timeout}s'}
+        except Exception as e:
+            result = {'success': False, 'error': f'Error: {str(e)}'}
+
+        if is_final_result(result):
+            break
+
+    return result
+
+
+async def enrich_visitors(visitors, lookup, search, concurrency=8, timeout=15, retries=2, backoff=1.0,
+                          prefetch=None):
+    """Enrich visitors concurrently, yielding (visitor, result) as each one finishes
+
+    lookup(ip) is the blocking IP-to-company call (e.g. get_company_from_ip) and
+    search(organization, ip) the ZoomInfo search. The result dict has the same
+    shape as the dashboard's processed results, or carries an 'error' key.
+    Provider rate limiting belongs in lookup (resolve_ip's limiter), so
+    lookups answered locally or from cache don't wait for a token.
+
+    prefetch(ips), e.g. resolve_many over the provider's batch endpoint,
+    resolves every IP up front in one blocking call; lookup is then only
+    used for the IPs whose prefetched answer was a transient failure.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    jitter = random.Random()  # Separate generator so the global random state is untouched
+    prefetched = {}
+    if prefetch is not None and visitors:
+        ips = [visitor['ip'] for visitor in visitors]
+        prefetched = dict(zip(ips, await asyncio.to_thread(prefetch, ips)))
+
+    async def enrich_one(visitor):
+        company = prefetched.get(visitor['ip'])
+        if company is None or not is_final_result(company):
+            async with semaphore:
+                company = await _lookup_with_retries(
+                    lookup, visitor['ip'], timeout, retries, backoff, jitter
+                )
+
+        if not company['success']:
+            return visitor, {'ip': visitor['ip'], 'error': company['error']}
+
+        # The search is CPU-only and quick, so it runs on the event loop thread
+        return visitor, {
+            'ip': visitor['ip'],
+            'company_data': company,
+            'zoominfo_data': search(company['organization'], visitor['ip'])
+        }
+
+    tasks = [asyncio.ensure_future(enrich_one(visitor)) for visitor in visitors]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
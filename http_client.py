@@ -0,0 +1,107 @@
+# http_client.py - Pooled HTTP Client for Outbound Provider Calls
+import os
+import threading
+import time
+from http.cookiejar import DefaultCookiePolicy
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Configuration (override with environment variables)
+HTTP_POOL_SIZE = int(os.environ.get('HTTP_POOL_SIZE', 20))
+HTTP_RETRIES = int(os.environ.get('HTTP_RETRIES', 2))
+HTTP_BACKOFF = float(os.environ.get('HTTP_BACKOFF', 0.5))
+HTTP_CONNECT_TIMEOUT = float(os.environ.get('HTTP_CONNECT_TIMEOUT', 3.05))
+HTTP_READ_TIMEOUT = float(os.environ.get('HTTP_READ_TIMEOUT', 10))
+HTTP_TOTAL_TIMEOUT = float(os.environ.get('HTTP_TOTAL_TIMEOUT', 15))  # no retry starts after this, 0 disables
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Deadline of the request running on this thread, read by the retry policy
+_call = threading.local()
+
+
+class BoundedRetry(Retry):
+    """Retry policy that also gives up once the call's total time budget is spent
+
+    A retry (or a Retry-After wait) that would start past the deadline is
+    refused as if the retries had run out, so callers such as the circuit
+    breaker see a slow or failed call promptly instead of after every
+    backoff.
+    """
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        deadline = getattr(_call, 'deadline', None)
+        if deadline is not None:
+            wait = self.get_retry_after(response) if response is not None and self.respect_retry_after_header else None
+            if time.monotonic() + (wait or 0) >= deadline:
+                return Retry.increment(self.new(total=0), method, url, response, error, _pool, _stacktrace)
+        return super().increment(method, url, response, error, _pool, _stacktrace)
+
+
+class HttpClient:
+    """Keep-alive connection pool with a retry/backoff policy
+
+    One instance is meant to be shared by every session and thread of a
+    process. urllib3's pool is thread-safe and cookies are disabled, so the
+    client holds no per-request mutable state.
+    """
+
+    def __init__(self, pool_size=HTTP_POOL_SIZE, retries=HTTP_RETRIES, backoff=HTTP_BACKOFF,
+                 connect_timeout=HTTP_CONNECT_TIMEOUT, read_timeout=HTTP_READ_TIMEOUT,
+                 total_timeout=HTTP_TOTAL_TIMEOUT):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.total_timeout = total_timeout
+
+        retry = BoundedRetry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset({'GET', 'POST'}),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+
+    def _timeout(self, read_timeout):
+        return (self.connect_timeout, read_timeout or self.read_timeout)
+
+    def request(self, method, url, read_timeout=None, **kwargs):
+        """Send a request; retries stop once total_timeout has elapsed since it started"""
+        _call.deadline = time.monotonic() + self.total_timeout if self.total_timeout else None
+        try:
+            return self.session.request(method, url, timeout=self._timeout(read_timeout), **kwargs)
+        finally:
+            _call.deadline = None
+
+    def get(self, url, read_timeout=None, **kwargs):
+        return self.request('GET', url, read_timeout=read_timeout, **kwargs)
+
+    def post(self, url, read_timeout=None, **kwargs):
+        return self.request('POST', url, read_timeout=read_timeout, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+_default_client = None
+_default_lock = threading.Lock()
+
+
+def get_default_client():
+    """Process-wide client for callers that don't pass their own"""
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = HttpClient()
+        return _default_client
@@ -0,0 +1,195 @@
+# ip_coalesce.py - Subnet-Level Lookup Coalescing for Visitor IPs
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from ip_resolver import is_definitive, parse_ip
+
+# Configuration (override with environment variables)
+IP_COALESCE = os.environ.get('IP_COALESCE', '1') != '0'
+IP_COALESCE_V4_PREFIX = int(os.environ.get('IP_COALESCE_V4_PREFIX', 24))
+IP_COALESCE_V6_PREFIX = int(os.environ.get('IP_COALESCE_V6_PREFIX', 48))
+
+
+def prefix_key(ip_address, v4_prefix=IP_COALESCE_V4_PREFIX, v6_prefix=IP_COALESCE_V6_PREFIX):
+    """Group key for an IP: (version, network bits, prefix length), e.g. 52.16.7.9 -> 52.16.7.0/24"""
+    parsed = parse_ip(ip_address.strip())
+    if parsed is None:
+        return ('raw', ip_address)
+    version, address = parsed
+    width, prefix = (32, v4_prefix) if version == 4 else (128, v6_prefix)
+    return (version, address >> (width - prefix), prefix)
+
+
+class _Call:
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Collapse concurrent calls for the same key into one execution"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def claim(self, keys):
+        """Take the lead for every key not already in flight
+
+        Returns (led, joined), both dicts of key -> call. The caller must
+        finish() each led call, and should do so before waiting on the
+        joined ones so that two batches can't wait on each other.
+        """
+        led, joined = {}, {}
+        with self._lock:
+            for key in keys:
+                call = self._calls.get(key)
+                if call is None:
+                    led[key] = self._calls[key] = _Call()
+                else:
+                    joined[key] = call
+        return led, joined
+
+    def finish(self, key, call, result=None, error=None):
+        """Publish a led call's result (or error) to its waiters"""
+        call.result, call.error = result, error
+        with self._lock:
+            del self._calls[key]
+        call.event.set()
+
+    @staticmethod
+    def wait(call):
+        """Result of a joined call once its leader finishes; re-raises the leader's error"""
+        call.event.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def do(self, key, fn, *args):
+        """Run fn(*args) unless a call for key is already in flight, then wait for its result"""
+        led, joined = self.claim([key])
+        if joined:
+            return self.wait(joined[key])
+
+        try:
+            result = fn(*args)
+        except Exception as e:
+            self.finish(key, led[key], error=e)
+            raise
+        self.finish(key, led[key], result)
+        return result
+
+
+def _share(result, ip_address, representative):
+    """Copy a representative's result for another IP of the same prefix"""
+    shared = dict(result)
+    if shared.get('success'):
+        shared['ip'] = ip_address
+    if ip_address != representative:
+        shared['coalesced_from'] = representative
+    return shared
+
+
+class CoalescingResolver:
+    """Resolve one representative IP per prefix and reuse its answer for the rest
+
+    Answers are kept in a small in-memory LRU per prefix; concurrent requests
+    for a prefix that is still being resolved, single or batched, wait for
+    the in-flight lookup.
+    """
+
+    def __init__(self, v4_prefix=IP_COALESCE_V4_PREFIX, v6_prefix=IP_COALESCE_V6_PREFIX,
+                 ttl=3600, max_prefixes=10000):
+        self.v4_prefix = v4_prefix
+        self.v6_prefix = v6_prefix
+        self.ttl = ttl
+        self.max_prefixes = max_prefixes
+        self._flight = SingleFlight()
+        self._lock = threading.Lock()
+        self._answers = OrderedDict()  # prefix key -> (expires_at, representative, result)
+
+    def key(self, ip_address):
+        return prefix_key(ip_address, self.v4_prefix, self.v6_prefix)
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._answers.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                del self._answers[key]
+                return None
+            self._answers.move_to_end(key)
+            return entry
+
+    def _put(self, key, representative, result):
+        # Transient errors are not shared beyond the requests already waiting on them
+        if not is_definitive(result) or result.get('degraded'):
+            return
+        with self._lock:
+            self._answers[key] = (time.time() + self.ttl, representative, result)
+            self._answers.move_to_end(key)
+            while len(self._answers) > self.max_prefixes:
+                self._answers.popitem(last=False)
+
+    def resolve(self, ip_address, lookup):
+        """Resolve ip_address with lookup(ip), sharing the answer across its prefix"""
+        key = self.key(ip_address)
+        entry = self._get(key)
+        if entry is not None:
+            return _share(entry[2], ip_address, entry[1])
+
+        def lead():
+            result = lookup(ip_address)
+            self._put(key, ip_address, result)
+            return ip_address, result
+
+        representative, result = self._flight.do(key, lead)
+        return _share(result, ip_address, representative)
+
+    def resolve_many(self, ip_addresses, lookup_many):
+        """Resolve a list of IPs with lookup_many(representatives) -> {ip: result}
+
+        Returns a dict mapping every input IP to its (possibly shared) result.
+        Prefixes already in flight (from resolve or another batch) are not
+        sent again; their members wait for that lookup instead.
+        """
+        results = {}
+        groups = OrderedDict()
+
+        for ip_address in dict.fromkeys(ip_addresses):
+            key = self.key(ip_address)
+            entry = self._get(key)
+            if entry is not None:
+                results[ip_address] = _share(entry[2], ip_address, entry[1])
+            else:
+                groups.setdefault(key, []).append(ip_address)
+
+        led, joined = self._flight.claim(groups)
+        try:
+            representatives = [groups[key][0] for key in led]
+            answers = lookup_many(representatives) if representatives else {}
+        except Exception as e:
+            for key, call in led.items():
+                self._flight.finish(key, call, error=e)
+            raise
+
+        for key, call in led.items():
+            representative = groups[key][0]
+            self._put(key, representative, answers[representative])
+            self._flight.finish(key, call, (representative, answers[representative]))
+        for key, members in groups.items():
+            representative, result = led[key].result if key in led else self._flight.wait(joined[key])
+            for ip_address in members:
+                results[ip_address] = _share(result, ip_address, representative)
+
+        return results
+
+    def clear(self):
+        with self._lock:
+            self._answers.clear()
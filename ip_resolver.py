@@ -0,0 +1,466 @@
+# ip_resolver.py - Offline IP-to-Organization Resolver
+import csv
+import ipaddress
+import os
+import socket
+import time
+from pathlib import Path
+
+from circuit_breaker import CircuitBreaker
+from disk_cache import DiskCache
+from http_client import get_default_client
+from mmdb_reader import MMDBReader
+from rate_limiter import PROVIDER_BATCH_BURST, PROVIDER_BATCH_RATE, PROVIDER_PERIOD, TokenBucket
+
+# Configuration (override with environment variables)
+IP_API_URL = os.environ.get('IP_API_URL', 'http://ip-api.com')
+IP_RESOLVER_BACKEND = os.environ.get('IP_RESOLVER_BACKEND', 'cidr')  # 'cidr' or 'mmdb'
+IP_RANGES_PATH = os.environ.get('IP_RANGES_PATH', str(Path(__file__).parent / 'ip_ranges.csv'))
+IP_MMDB_PATHS = os.environ.get('IP_MMDB_PATHS', str(Path(__file__).parent / 'GeoLite2-ASN.mmdb'))
+IP_API_BATCH_SIZE = 100  # Maximum IPs per POST /batch request on ip-api.com
+IP_API_FALLBACK = os.environ.get('IP_API_FALLBACK', '1') != '0'
+IP_CACHE_PATH = os.environ.get('IP_CACHE_PATH', str(Path(__file__).parent / '.ip_cache.sqlite3'))
+IP_CACHE_TTL = int(os.environ.get('IP_CACHE_TTL', 24 * 3600))
+IP_CACHE_NEGATIVE_TTL = int(os.environ.get('IP_CACHE_NEGATIVE_TTL', 3600))
+IP_CACHE_MAX_ENTRIES = int(os.environ.get('IP_CACHE_MAX_ENTRIES', 100000))
+IP_CACHE_STALE_GRACE = int(os.environ.get('IP_CACHE_STALE_GRACE', 7 * 24 * 3600))  # expired answers kept for degraded mode
+IP_API_BREAKER_FAILURES = int(os.environ.get('IP_API_BREAKER_FAILURES', 5))
+IP_API_BREAKER_P95 = float(os.environ.get('IP_API_BREAKER_P95', 2.0))
+IP_API_BREAKER_RESET = float(os.environ.get('IP_API_BREAKER_RESET', 30))
+
+NO_COMPANY_ERROR = 'No company found for this IP'
+DEGRADED_ERROR = 'Geolocation provider unavailable and no cached answer for this IP'
+
+# Fields returned for every resolved IP (same shape as the ip-api.com response mapping)
+RECORD_FIELDS = ['organization', 'city', 'region', 'country', 'isp', 'timezone']
+
+
+def parse_ip(ip_address):
+    """Parse an IP string into (version, integer), returns None if invalid"""
+    try:
+        return 4, int.from_bytes(socket.inet_pton(socket.AF_INET, ip_address), 'big')
+    except (OSError, TypeError):
+        pass
+    try:
+        return 6, int(ipaddress.IPv6Address(ip_address))
+    except ValueError:
+        return None
+
+
+class _Node:
+    __slots__ = ('key', 'length', 'children', 'value')
+
+    def __init__(self, key, length, value=None):
+        self.key = key
+        self.length = length
+        self.children = [None, None]
+        self.value = value
+
+
+class PrefixTrie:
+    """Path-compressed binary (Patricia) trie for longest-prefix-match lookups"""
+
+    def __init__(self, width):
+        self.width = width
+        self.root = _Node(0, 0)
+        self.size = 0
+
+    def insert(self, network, prefix_len, value):
+        """Store value for network/prefix_len (network given as an int)"""
+        width = self.width
+        network &= ~((1 << (width - prefix_len)) - 1)
+        node = self.root
+
+        while True:
+            if node.length == prefix_len:
+                if node.value is None:
+                    self.size += 1
+                node.value = value
+                return
+
+            bit = (network >> (width - node.length - 1)) & 1
+            child = node.children[bit]
+
+            if child is None:
+                node.children[bit] = _Node(network, prefix_len, value)
+                self.size += 1
+                return
+
+            # Length of the prefix shared by the new network and the child
+            common = min(prefix_len, child.length, width - (network ^ child.key).bit_length())
+            if common == child.length:
+                node = child
+                continue
+
+            # Split the edge with an intermediate node at the shared prefix
+            middle = _Node(network & ~((1 << (width - common)) - 1), common)
+            middle.children[(child.key >> (width - common - 1)) & 1] = child
+            node.children[bit] = middle
+
+            if common == prefix_len:
+                middle.value = value
+            else:
+                middle.children[(network >> (width - common - 1)) & 1] = _Node(network, prefix_len, value)
+            self.size += 1
+            return
+
+    def lookup(self, address):
+        """Return the value of the longest prefix containing address, or None"""
+        width = self.width
+        node = self.root
+        best = node.value
+
+        while node.length < width:
+            child = node.children[(address >> (width - node.length - 1)) & 1]
+            if child is None or (address ^ child.key) >> (width - child.length):
+                break
+            node = child
+            if node.value is not None:
+                best = node.value
+
+        return best
+
+    def __len__(self):
+        return self.size
+
+
+class LocalResolver:
+    """In-memory CIDR table with separate IPv4 and IPv6 tries"""
+
+    def __init__(self):
+        self.tries = {4: PrefixTrie(32), 6: PrefixTrie(128)}
+
+    def add(self, network, record):
+        """Add a CIDR string (e.g. '52.16.0.0/14') with its organization record"""
+        net = ipaddress.ip_network(network.strip(), strict=False)
+        self.tries[net.version].insert(int(net.network_address), net.prefixlen, record)
+
+    def lookup(self, ip_address):
+        """Longest-prefix-match lookup, returns the record dict or None"""
+        parsed = parse_ip(ip_address.strip())
+        if parsed is None:
+            return None
+        return self.tries[parsed[0]].lookup(parsed[1])
+
+    def __len__(self):
+        return sum(len(trie) for trie in self.tries.values())
+
+
+def load_cidr_table(path):
+    """Load a CIDR -> organization CSV table into a LocalResolver
+
+    Expected columns: network, organization, asn, isp, city, region, country, timezone
+    (only network and organization are required).
+    """
+    resolver = LocalResolver()
+
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        for row in csv.DictReader(f):
+            if not row.get('network') or not row.get('organization'):
+                continue
+
+            record = {field: row.get(field) or 'Unknown' for field in RECORD_FIELDS}
+            if row.get('asn'):
+                record['asn'] = row['asn']
+
+            try:
+                resolver.add(row['network'], record)
+            except ValueError:
+                continue  # Skip malformed networks
+
+    return resolver
+
+
+def _english_name(entry):
+    return (entry or {}).get('names', {}).get('en')
+
+
+def _mmdb_fields(data):
+    """Extract the dashboard's fields from a GeoLite2/GeoIP2 ASN, ISP or City record"""
+    fields = {
+        'organization': data.get('organization') or data.get('autonomous_system_organization'),
+        'isp': data.get('isp') or data.get('autonomous_system_organization'),
+        'city': _english_name(data.get('city')),
+        'region': _english_name((data.get('subdivisions') or [None])[0]),
+        'country': _english_name(data.get('country')),
+        'timezone': (data.get('location') or {}).get('time_zone')
+    }
+    asn = data.get('autonomous_system_number')
+    if asn:
+        fields['asn'] = f'AS{asn}'
+    return {key: value for key, value in fields.items() if value}
+
+
+class MMDBResolver:
+    """Resolver backend over MaxMind DB files, e.g. GeoLite2-ASN merged with GeoLite2-City"""
+
+    def __init__(self, paths):
+        self.readers = [MMDBReader(path) for path in paths]
+
+    def lookup(self, ip_address):
+        """Return the merged record for ip_address, or None without an organization"""
+        merged = {}
+        for reader in self.readers:
+            try:
+                data = reader.get(ip_address.strip())
+            except ValueError:
+                return None
+            if isinstance(data, dict):
+                for key, value in _mmdb_fields(data).items():
+                    merged.setdefault(key, value)
+
+        if 'organization' not in merged:
+            return None
+
+        record = {field: merged.get(field, 'Unknown') for field in RECORD_FIELDS}
+        if 'asn' in merged:
+            record['asn'] = merged['asn']
+        return record
+
+    def __len__(self):
+        return sum(reader.node_count for reader in self.readers)
+
+
+def load_local_resolver(path=None, backend=None):
+    """Load the configured resolver backend, returns None when no table is available
+
+    backend 'cidr' reads a CSV table into memory, 'mmdb' memory-maps one or
+    more comma-separated MaxMind DB files.
+    """
+    backend = backend or IP_RESOLVER_BACKEND
+
+    if backend == 'mmdb':
+        paths = [Path(p.strip()) for p in (path or IP_MMDB_PATHS).split(',') if p.strip()]
+        paths = [p for p in paths if p.exists()]
+        return MMDBResolver(paths) if paths else None
+
+    if backend == 'cidr':
+        path = Path(path or IP_RANGES_PATH)
+        if not path.exists():
+            return None
+        return load_cidr_table(path)
+
+    raise ValueError(f'Unknown IP resolver backend: {backend}')
+
+
+def load_ip_cache(path=None):
+    """Open the on-disk IP lookup cache shared by both dashboard apps"""
+    return DiskCache(
+        path or IP_CACHE_PATH,
+        table='ip_lookups',
+        ttl=IP_CACHE_TTL,
+        negative_ttl=IP_CACHE_NEGATIVE_TTL,
+        max_entries=IP_CACHE_MAX_ENTRIES,
+        stale_grace=IP_CACHE_STALE_GRACE
+    )
+
+
+def load_ip_api_breaker():
+    """Create the circuit breaker guarding ip-api.com calls"""
+    return CircuitBreaker(
+        failure_threshold=IP_API_BREAKER_FAILURES,
+        latency_threshold=IP_API_BREAKER_P95,
+        reset_timeout=IP_API_BREAKER_RESET
+    )
+
+
+def load_ip_api_limiter():
+    """Create the token bucket that keeps ip-api.com calls within the free tier quota"""
+    return TokenBucket()
+
+
+def load_ip_api_batch_limiter():
+    """Create the token bucket for ip-api.com's batch endpoint, which has its own, lower quota"""
+    return TokenBucket(rate=PROVIDER_BATCH_RATE, period=PROVIDER_PERIOD, capacity=PROVIDER_BATCH_BURST)
+
+
+def is_definitive(result):
+    """Successful lookups and 'No company found' answers; anything else is transient"""
+    return result['success'] or result.get('error') == NO_COMPANY_ERROR
+
+
+def _build_result(ip_address, record, source):
+    """Map a resolver record to the dashboard's company result shape"""
+    result = {'success': True, 'ip': ip_address, 'source': source}
+    result.update({field: record.get(field, 'Unknown') for field in RECORD_FIELDS})
+    if record.get('asn'):
+        result['asn'] = record['asn']
+    return result
+
+
+def _parse_ip_api_response(ip_address, data):
+    """Map one ip-api.com JSON object to a company result"""
+    if data.get('org'):
+        return _build_result(ip_address, {
+            'organization': data['org'],
+            'city': data.get('city', 'Unknown'),
+            'region': data.get('regionName', 'Unknown'),
+            'country': data.get('country', 'Unknown'),
+            'isp': data.get('isp', 'Unknown'),
+            'timezone': data.get('timezone', 'Unknown'),
+            'asn': data.get('as')
+        }, 'ip-api')
+    return {'success': False, 'error': NO_COMPANY_ERROR}
+
+
+def query_ip_api(ip_address, timeout=None, client=None):
+    """Convert IP to Company using the ip-api.com JSON endpoint (timeout is the read timeout)"""
+    client = client or get_default_client()
+    try:
+        response = client.get(f"{IP_API_URL}/json/{ip_address}", read_timeout=timeout)
+        response.raise_for_status()
+        return _parse_ip_api_response(ip_address, response.json())
+    except Exception as e:
+        return {'success': False, 'error': f'Error: {str(e)}'}
+
+
+def query_ip_api_batch(ip_addresses, timeout=None, client=None):
+    """Resolve up to IP_API_BATCH_SIZE IPs with one POST to the ip-api.com batch endpoint
+
+    Returns a dict mapping each IP to its company result.
+    """
+    client = client or get_default_client()
+    try:
+        response = client.post(f"{IP_API_URL}/batch", json=list(ip_addresses), read_timeout=timeout)
+        response.raise_for_status()
+        data = response.json()
+        if len(data) != len(ip_addresses):
+            raise ValueError(f'expected {len(ip_addresses)} results, got {len(data)}')
+        # The batch endpoint answers in request order
+        return {ip: _parse_ip_api_response(ip, item) for ip, item in zip(ip_addresses, data)}
+    except Exception as e:
+        return {ip: {'success': False, 'error': f'Error: {str(e)}'} for ip in ip_addresses}
+
+
+def _cache_result(cache, ip_address, result):
+    """Cache definitive answers, never transient network errors"""
+    if cache is None or not is_definitive(result) or result.get('degraded'):
+        return
+    cache.set(ip_address, result, negative=not result['success'])
+
+
+def _degraded_result(ip_address, cache):
+    """Answer from stale cache entries while the provider circuit is open"""
+    cached = cache.get(ip_address, allow_stale=True) if cache is not None else None
+    if cached is not None:
+        result = cached[0]
+        result['cached'] = True
+    else:
+        result = {'success': False, 'error': DEGRADED_ERROR}
+    result['degraded'] = True
+    return result
+
+
+def _query_guarded(ip_address, cache, client, breaker, timeout, limiter=None):
+    """Query ip-api.com through the circuit breaker, recording outcome and latency
+
+    A limiter token is only taken here, right before the request, so local,
+    cached and coalesced answers never wait on the provider quota.
+    """
+    if breaker is not None and not breaker.allow():
+        return _degraded_result(ip_address, cache)
+    if limiter is not None:
+        limiter.acquire()
+    if breaker is None:
+        return query_ip_api(ip_address, timeout=timeout, client=client)
+
+    started = time.monotonic()
+    result = query_ip_api(ip_address, timeout=timeout, client=client)
+    if is_definitive(result):
+        breaker.record_success(time.monotonic() - started)
+    else:
+        breaker.record_failure()
+    return result
+
+
+def resolve_ip(ip_address, resolver=None, cache=None, client=None, coalescer=None, breaker=None,
+               limiter=None, fallback=IP_API_FALLBACK, timeout=None):
+    """Resolve an IP from the local table, then the disk cache, then ip-api.com
+
+    With a coalescer, provider misses are resolved once per subnet prefix and
+    the answer is reused for the other IPs of that prefix. With a breaker,
+    provider calls stop while it is open and results are marked 'degraded'.
+    With a limiter (TokenBucket), each provider request waits for a token.
+    """
+    if resolver is not None:
+        record = resolver.lookup(ip_address)
+        if record is not None:
+            return _build_result(ip_address, record, 'local')
+
+    if cache is not None:
+        cached = cache.get(ip_address)
+        if cached is not None:
+            result = cached[0]
+            result['cached'] = True
+            return result
+
+    if not fallback:
+        return {'success': False, 'error': NO_COMPANY_ERROR}
+
+    def query(ip):
+        result = _query_guarded(ip, cache, client, breaker, timeout, limiter)
+        _cache_result(cache, ip, result)
+        return result
+
+    if coalescer is None:
+        return query(ip_address)
+
+    result = coalescer.resolve(ip_address, query)
+    if 'coalesced_from' in result:
+        _cache_result(cache, ip_address, result)
+    return result
+
+
+def resolve_many(ip_addresses, resolver=None, cache=None, client=None, coalescer=None, breaker=None,
+                 limiter=None, fallback=IP_API_FALLBACK, timeout=None, batch_size=IP_API_BATCH_SIZE):
+    """Resolve many IPs at once, returning results in input order
+
+    IPs are deduplicated first; local table and cache hits are answered
+    directly and the remaining misses go to ip-api.com in batch_size chunks
+    (one representative per subnet prefix when a coalescer is given). With a
+    limiter, each batch request waits for a token; it must be a batch bucket
+    (load_ip_api_batch_limiter), not the one for single lookups.
+    """
+    results = {}
+    pending = []
+
+    for ip_address in dict.fromkeys(ip_addresses):
+        record = resolver.lookup(ip_address) if resolver is not None else None
+        if record is not None:
+            results[ip_address] = _build_result(ip_address, record, 'local')
+            continue
+
+        cached = cache.get(ip_address) if cache is not None else None
+        if cached is not None:
+            results[ip_address] = cached[0]
+            results[ip_address]['cached'] = True
+        elif fallback:
+            pending.append(ip_address)
+        else:
+            results[ip_address] = {'success': False, 'error': NO_COMPANY_ERROR}
+
+    def query_many(ips):
+        answers = {}
+        for start in range(0, len(ips), batch_size):
+            chunk = ips[start:start + batch_size]
+            if breaker is not None and not breaker.allow():
+                answers.update({ip: _degraded_result(ip, cache) for ip in chunk})
+                continue
+            if limiter is not None:
+                limiter.acquire()
+
+            chunk_answers = query_ip_api_batch(chunk, timeout=timeout, client=client)
+            if breaker is not None:
+                if any(is_definitive(result) for result in chunk_answers.values()):
+                    breaker.record_success()  # Batch latency isn't comparable to single lookups
+                else:
+                    breaker.record_failure()
+            answers.update(chunk_answers)
+        return answers
+
+    answers = coalescer.resolve_many(pending, query_many) if coalescer is not None else query_many(pending)
+    for ip_address, result in answers.items():
+        _cache_result(cache, ip_address, result)
+        results[ip_address] = result
+
+    return [dict(results[ip_address]) for ip_address in ip_addresses]
@@ -0,0 +1,113 @@
+# json_stream.py - Streaming Parser for {key: [records]} JSON Exports
+import codecs
+import json
+
+WHITESPACE = ' \t\r\n'
+MAX_VALUE_SIZE = 16 << 20  # characters one record may span before the input is treated as malformed
+
+
+class _StreamReader:
+    """Character buffer over a binary file that keeps only the unparsed tail in memory"""
+
+    def __init__(self, f, chunk_size, on_chunk=None, max_value_size=MAX_VALUE_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.on_chunk = on_chunk
+        self.max_value_size = max_value_size
+        self.decoder = codecs.getincrementaldecoder('utf-8-sig')()
+        self.json_decoder = json.JSONDecoder()
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        """Append the next chunk to the buffer, dropping what was already consumed"""
+        if self.eof:
+            return False
+        raw = self.f.read(self.chunk_size)
+        if self.on_chunk is not None:
+            self.on_chunk(raw)
+        self.eof = not raw
+        self.buf = self.buf[self.pos:] + self.decoder.decode(raw, final=self.eof)
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Next non-whitespace character without consuming it, or '' at end of file"""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ''
+
+    def expect(self, chars):
+        char = self.peek()
+        if char == '' or char not in chars:
+            raise ValueError(f"Expected one of {chars!r} but found {char or 'end of file'!r}")
+        self.pos += 1
+        return char
+
+    def value(self):
+        """Decode one complete JSON value, reading more of the file as needed
+
+        Raises ValueError once the undecoded value passes max_value_size
+        characters, so malformed input (e.g. an unterminated string) can't
+        buffer the rest of the file.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self.json_decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError as e:
+                if len(self.buf) - self.pos > self.max_value_size:
+                    raise ValueError(
+                        f'No complete JSON value within {self.max_value_size:,} characters: {e.msg}'
+                    ) from e
+                if not self.fill():
+                    raise
+                continue
+            # A value ending exactly at the buffer edge (e.g. a number) may continue in the next chunk
+            if end == len(self.buf) and self.fill():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_grouped_records(f, chunk_size=1 << 20, on_chunk=None, on_key=None, max_value_size=MAX_VALUE_SIZE):
+    """Yield (key, index, record) from a binary file holding {key: [record, ...], ...}
+
+    Only the current record and one chunk are held in memory, so peak memory
+    doesn't grow with the file. on_chunk(raw_bytes) sees every chunk read,
+    e.g. to hash the file or report progress; it gets b'' at end of file.
+    on_key(key) is called as each key starts, including keys with no records.
+    A record longer than max_value_size characters raises ValueError.
+    """
+    reader = _StreamReader(f, chunk_size, on_chunk, max_value_size)
+    reader.expect('{')
+    if reader.peek() == '}':
+        reader.pos += 1
+        return
+
+    while True:
+        key = reader.value()
+        if not isinstance(key, str):
+            raise ValueError(f'Expected a company key string, found {key!r}')
+        if on_key is not None:
+            on_key(key)
+        reader.expect(':')
+        reader.expect('[')
+
+        index = 0
+        if reader.peek() == ']':
+            reader.pos += 1
+        else:
+            while True:
+                yield key, index, reader.value()
+                index += 1
+                if reader.expect(',]') == ']':
+                    break
+
+        if reader.expect(',}') == '}':
+            return
@@ -0,0 +1,197 @@
+# mmdb_reader.py - Memory-Mapped MaxMind DB (GeoLite2-style) Reader
+import ipaddress
+import mmap
+import struct
+from functools import lru_cache
+
+METADATA_MARKER = b'\xab\xcd\xefMaxMind.com'
+DATA_SECTION_SEPARATOR = 16
+
+# Data field types from the MaxMind DB format spec
+TYPE_EXTENDED = 0
+TYPE_POINTER = 1
+TYPE_STRING = 2
+TYPE_DOUBLE = 3
+TYPE_BYTES = 4
+TYPE_UINT16 = 5
+TYPE_UINT32 = 6
+TYPE_MAP = 7
+TYPE_INT32 = 8
+TYPE_UINT64 = 9
+TYPE_UINT128 = 10
+TYPE_ARRAY = 11
+TYPE_BOOLEAN = 14
+TYPE_FLOAT = 15
+
+
+class InvalidDatabaseError(Exception):
+    pass
+
+
+class _Decoder:
+    """Decode MaxMind DB data section values directly from the mapped buffer"""
+
+    def __init__(self, buffer, pointer_base):
+        self.buffer = buffer
+        self.pointer_base = pointer_base
+
+    def decode(self, offset):
+        """Return (value, next_offset) for the field starting at offset"""
+        buffer = self.buffer
+        ctrl = buffer[offset]
+        offset += 1
+        field_type = ctrl >> 5
+
+        if field_type == TYPE_POINTER:
+            pointer, offset = self._pointer(ctrl, offset)
+            value, _ = self.decode(pointer)
+            return value, offset
+
+        if field_type == TYPE_EXTENDED:
+            field_type = 7 + buffer[offset]
+            offset += 1
+
+        size = ctrl & 0x1f
+        if size >= 29:
+            extra = size - 28
+            value = int.from_bytes(buffer[offset:offset + extra], 'big')
+            offset += extra
+            size = (29, 285, 65821)[extra - 1] + value
+
+        if field_type == TYPE_MAP:
+            result = {}
+            for _ in range(size):
+                key, offset = self.decode(offset)
+                result[key], offset = self.decode(offset)
+            return result, offset
+        if field_type == TYPE_ARRAY:
+            result = []
+            for _ in range(size):
+                item, offset = self.decode(offset)
+                result.append(item)
+            return result, offset
+        if field_type == TYPE_BOOLEAN:
+            return bool(size), offset
+
+        end = offset + size
+        if field_type == TYPE_STRING:
+            return buffer[offset:end].decode('utf-8'), end
+        if field_type in (TYPE_UINT16, TYPE_UINT32, TYPE_UINT64, TYPE_UINT128):
+            return int.from_bytes(buffer[offset:end], 'big'), end
+        if field_type == TYPE_INT32:
+            return int.from_bytes(buffer[offset:end].rjust(4, b'\x00'), 'big', signed=True), end
+        if field_type == TYPE_DOUBLE:
+            return struct.unpack('>d', buffer[offset:end])[0], end
+        if field_type == TYPE_FLOAT:
+            return struct.unpack('>f', buffer[offset:end])[0], end
+        if field_type == TYPE_BYTES:
+            return bytes(buffer[offset:end]), end
+
+        raise InvalidDatabaseError(f'Unexpected data type {field_type} at offset {offset - 1}')
+
+    def _pointer(self, ctrl, offset):
+        size = (ctrl >> 3) & 0x3
+        value_bits = ctrl & 0x7
+        data = self.buffer[offset:offset + size + 1]
+
+        if size == 0:
+            pointer = (value_bits << 8) | data[0]
+        elif size == 1:
+            pointer = ((value_bits << 16) | int.from_bytes(data, 'big')) + 2048
+        elif size == 2:
+            pointer = ((value_bits << 24) | int.from_bytes(data, 'big')) + 526336
+        else:
+            pointer = int.from_bytes(data, 'big')
+
+        return self.pointer_base + pointer, offset + size + 1
+
+
+class MMDBReader:
+    """Read a MaxMind DB file through mmap, walking the search tree in place
+
+    Nothing but the metadata is parsed up front, so opening is close to free
+    regardless of file size, and worker processes share the OS page cache.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        with open(self.path, 'rb') as f:
+            self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        marker = self._buffer.rfind(METADATA_MARKER, max(0, len(self._buffer) - 128 * 1024))
+        if marker == -1:
+            self._buffer.close()
+            raise InvalidDatabaseError(f'{self.path} is not a MaxMind DB file')
+
+        metadata_start = marker + len(METADATA_MARKER)
+        self.metadata, _ = _Decoder(self._buffer, metadata_start).decode(metadata_start)
+
+        self.node_count = self.metadata['node_count']
+        self.record_size = self.metadata['record_size']
+        self.ip_version = self.metadata['ip_version']
+        self.database_type = self.metadata.get('database_type', '')
+        if self.record_size not in (24, 28, 32):
+            raise InvalidDatabaseError(f'Unsupported record size {self.record_size}')
+
+        self._node_bytes = self.record_size // 4
+        self._search_tree_size = self.node_count * self._node_bytes
+        self._decoder = _Decoder(self._buffer, self._search_tree_size + DATA_SECTION_SEPARATOR)
+        self._ipv4_start = self._find_ipv4_start()
+        self._record_at = lru_cache(maxsize=4096)(self._decode_record)
+
+    def _read_node(self, node, bit):
+        buffer = self._buffer
+        base = node * self._node_bytes
+
+        if self.record_size == 24:
+            offset = base + bit * 3
+            return int.from_bytes(buffer[offset:offset + 3], 'big')
+        if self.record_size == 28:
+            middle = buffer[base + 3]
+            if bit:
+                return ((middle & 0x0f) << 24) | int.from_bytes(buffer[base + 4:base + 7], 'big')
+            return ((middle & 0xf0) << 20) | int.from_bytes(buffer[base:base + 3], 'big')
+        offset = base + bit * 4
+        return int.from_bytes(buffer[offset:offset + 4], 'big')
+
+    def _find_ipv4_start(self):
+        """IPv4 addresses live under ::/96 in an IPv6 tree"""
+        if self.ip_version == 4:
+            return 0
+        node = 0
+        for _ in range(96):
+            if node >= self.node_count:
+                break
+            node = self._read_node(node, 0)
+        return node
+
+    def _decode_record(self, record):
+        # Records past node_count point into the data section, which follows the 16-byte separator
+        offset = (record - self.node_count - DATA_SECTION_SEPARATOR) + self._decoder.pointer_base
+        return self._decoder.decode(offset)[0]
+
+    def get(self, ip_address):
+        """Return the decoded data record for ip_address, or None if it is not in the tree"""
+        address = ipaddress.ip_address(ip_address)
+
+        if address.version == 6 and self.ip_version == 4:
+            return None
+        if address.version == 4:
+            node, bit_count = self._ipv4_start, 32
+        else:
+            node, bit_count = 0, 128
+
+        packed = int(address)
+        node_count = self.node_count
+        for depth in range(bit_count):
+            if node >= node_count:
+                break
+            node = self._read_node(node, (packed >> (bit_count - depth - 1)) & 1)
+
+        if node <= node_count:
+            return None  # node == node_count means "no data"
+        return self._record_at(node)
+
+    def close(self):
+        self._record_at.cache_clear()
+        self._buffer.close()
@@ -0,0 +1,156 @@
+# name_matcher.py - Organization Name Canonicalizer and Trigram Fuzzy Index
+import re
+import threading
+from collections import defaultdict
+from functools import lru_cache
+
+import numpy as np
+
+# Minimum trigram similarity for a fuzzy company match to be accepted
+FUZZY_MATCH_THRESHOLD = 0.45
+
+LEGAL_SUFFIXES = frozenset([
+    'the', 'inc', 'incorporated', 'corp', 'corporation', 'co', 'company', 'cos', 'llc', 'llp', 'lp',
+    'ltd', 'limited', 'plc', 'ag', 'gmbh', 'kg', 'sa', 'sas', 'se', 'nv', 'bv', 'spa', 'srl',
+    'pty', 'pte', 'oy', 'ab', 'as', 'group', 'holding', 'holdings'
+])
+
+_ASN_PREFIX = re.compile(r'^\s*as\d+\b')
+_NON_WORD = re.compile(r'[\W_]+')
+
+
+@lru_cache(maxsize=65536)
+def canonicalize_org(name):
+    """Normalize an organization string, e.g. 'AS7018 The Boeing Co.' -> 'boeing'
+
+    Lowercases, drops a leading ASN, turns punctuation into spaces and removes
+    legal suffixes. Falls back to the punctuation-stripped name when nothing
+    else is left (e.g. 'The Company').
+    """
+    text = _NON_WORD.sub(' ', _ASN_PREFIX.sub('', name.lower())).strip()
+    tokens = [token for token in text.split() if token not in LEGAL_SUFFIXES]
+    return ' '.join(tokens) or text
+
+
+def trigrams(text):
+    """Set of character trigrams of text, padded so word starts and ends count"""
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """Inverted trigram index over canonical company names
+
+    search() scores candidates by Jaccard similarity of trigram sets using one
+    vectorized bincount over the posting lists, and memoizes answers per
+    canonical query name. remove() takes a company's names out of the
+    posting lists; once most entries are removed ones, the index is
+    renumbered so reloads don't grow it without bound.
+    """
+
+    def __init__(self, cache_size=16384):
+        self.names = []
+        self.keys = []
+        self._sizes = []
+        self._lists = defaultdict(list)
+        self._docs = defaultdict(list)  # key -> its doc ids
+        self._dead = 0
+        self._lock = threading.Lock()  # add/remove may run while other threads search
+        self._postings = None
+        self._search_cached = lru_cache(maxsize=cache_size)(self._search)
+
+    def _index(self, canonical, key):
+        grams = trigrams(canonical)
+        doc_id = len(self.names)
+        self.names.append(canonical)
+        self.keys.append(key)
+        self._sizes.append(len(grams))
+        self._docs[key].append(doc_id)
+        for gram in grams:
+            self._lists[gram].append(doc_id)
+
+    def add(self, name, key):
+        """Index name (canonicalized here) as an alias of key"""
+        canonical = canonicalize_org(name)
+        with self._lock:
+            self._index(canonical, key)
+            self._postings = None
+        self._search_cached.cache_clear()
+
+    def add_company(self, key, aliases=None):
+        """Index a company under its aliases, or under its key when it has none"""
+        for name in aliases or [key]:
+            self.add(name, key)
+
+    def remove(self, key):
+        """Stop returning key, dropping its names from the posting lists"""
+        with self._lock:
+            doc_ids = set(self._docs.pop(key, ()))
+            for gram in set().union(*(trigrams(self.names[doc_id]) for doc_id in doc_ids)):
+                remaining = [doc_id for doc_id in self._lists[gram] if doc_id not in doc_ids]
+                if remaining:
+                    self._lists[gram] = remaining
+                else:
+                    del self._lists[gram]
+            self._dead += len(doc_ids)
+            if self._dead > len(self.names) // 2:
+                self._compact()
+            self._postings = None
+        self._search_cached.cache_clear()
+
+    def _compact(self):
+        live = sorted((doc_id, key) for key, doc_ids in self._docs.items() for doc_id in doc_ids)
+        names = self.names
+        self.names, self.keys, self._sizes = [], [], []
+        self._lists, self._docs, self._dead = defaultdict(list), defaultdict(list), 0
+        for doc_id, key in live:
+            self._index(names[doc_id], key)
+
+    def _freeze(self):
+        # Built and published as one tuple, so a concurrent add() can't leave a search half-frozen
+        with self._lock:
+            self._postings = (
+                {gram: np.array(ids, dtype=np.int32) for gram, ids in self._lists.items()},
+                np.array(self._sizes, dtype=np.int32),
+                list(self.names),
+                list(self.keys)
+            )
+            return self._postings
+
+    def search(self, name, k=5):
+        """Return up to k (key, canonical name, score) candidates, best first"""
+        return self._search_cached(canonicalize_org(name), k)
+
+    def _search(self, canonical, k):
+        frozen = self._postings
+        postings, sizes, names, keys = frozen if frozen is not None else self._freeze()
+
+        grams = trigrams(canonical)
+        lists = [postings[gram] for gram in grams if gram in postings]
+        if not lists:
+            return []
+
+        shared = np.bincount(np.concatenate(lists), minlength=len(names))
+        candidates = np.flatnonzero(shared)
+        scores = shared[candidates] / (len(grams) + sizes[candidates] - shared[candidates])
+
+        # Partial sort: only the best few candidates need ordering
+        limit = min(len(candidates), k * 8)
+        best = np.argpartition(-scores, limit - 1)[:limit] if limit < len(candidates) else np.arange(limit)
+        best = best[np.argsort(-scores[best], kind='stable')]
+
+        results = []
+        seen = set()
+        for position in best:
+            doc_id = candidates[position]
+            key = keys[doc_id]
+            if key in seen:
+                continue  # Report each company once, under its best matching alias
+            seen.add(key)
+            results.append((key, names[doc_id], float(scores[position])))
+            if len(results) == k:
+                break
+        return results
+
+    def __len__(self):
+        return len(self.names) - self._dead
@@ -0,0 +1,61 @@
+# provider_resources.py - Process-Wide IP Lookup Resources Shared by Both Apps
+import streamlit as st
+
+import http_client
+import ip_coalesce
+import ip_resolver
+
+
+# Local CIDR -> organization table (ip-api.com is only used for misses)
+@st.cache_resource
+def load_ip_resolver():
+    """Load the offline IP-to-organization resolver once per process"""
+    try:
+        return ip_resolver.load_local_resolver()
+    except Exception as e:
+        st.warning(f"⚠️ Could not load local IP ranges table: {e}")
+        return None
+
+
+# One pooled keep-alive HTTP client shared by every session of this process
+@st.cache_resource
+def get_http_client():
+    """Create the process-wide HTTP client used for all provider calls"""
+    return http_client.HttpClient()
+
+
+@st.cache_resource
+def load_ip_cache():
+    """Open the on-disk IP lookup cache (shared with the other app and workers)"""
+    try:
+        return ip_resolver.load_ip_cache()
+    except Exception as e:
+        st.warning(f"⚠️ IP lookup cache unavailable: {e}")
+        return None
+
+
+# Shared across sessions so simultaneous lookups from one subnet cost a single call
+@st.cache_resource
+def get_ip_coalescer():
+    """Create the process-wide subnet coalescer (None when disabled)"""
+    return ip_coalesce.CoalescingResolver() if ip_coalesce.IP_COALESCE else None
+
+
+@st.cache_resource
+def get_ip_breaker():
+    """Create the process-wide circuit breaker for the geolocation provider"""
+    return ip_resolver.load_ip_api_breaker()
+
+
+# One provider quota per process, shared by single lookups and every Analyze All run
+@st.cache_resource
+def get_ip_limiter():
+    """Create the process-wide token bucket for geolocation provider requests"""
+    return ip_resolver.load_ip_api_limiter()
+
+
+# The batch endpoint has its own, lower quota, so bulk runs get their own bucket
+@st.cache_resource
+def get_ip_batch_limiter():
+    """Create the process-wide token bucket for batch geolocation requests"""
+    return ip_resolver.load_ip_api_batch_limiter()
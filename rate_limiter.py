@@ -0,0 +1,43 @@
+# rate_limiter.py - Token Bucket Rate Limiter for Provider Requests
+import threading
+import time
+
+# ip-api.com free tier allows 45 requests per minute. A burst of 5 plus a
+# refill of 40/min keeps any 60 second window within that quota.
+PROVIDER_RATE = 40
+PROVIDER_PERIOD = 60.0
+PROVIDER_BURST = 5
+
+# The batch endpoint (POST /batch, up to 100 IPs each) has its own quota of
+# 15 requests per minute; 2 + 12/min stays within it the same way.
+PROVIDER_BATCH_RATE = 12
+PROVIDER_BATCH_BURST = 2
+
+
+class TokenBucket:
+    """Thread-safe token bucket allowing `rate` acquisitions per `period` seconds
+
+    One instance is meant to be shared by every session and thread of a
+    process, so the quota holds however many lookups run at once. Waiters
+    reserve their token up front and sleep outside the lock, so they are
+    served in arrival order.
+    """
+
+    def __init__(self, rate=PROVIDER_RATE, period=PROVIDER_PERIOD, capacity=PROVIDER_BURST):
+        self.fill_rate = rate / period
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available and take it; returns the seconds waited"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.fill_rate)
+            self.updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.fill_rate if self.tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+        return wait
@@ -0,0 +1,92 @@
+import gzip
+import os
+
+import pytest
+
+from access_log import LogTailer, iter_hits, open_log
+
+
+def line(ip, page='/services', when='10/Oct/2025:10:00:00 +0000'):
+    return f'{ip} - - [{when}] "GET {page} HTTP/1.1" 200 512 "-" "Mozilla/5.0"\n'.encode()
+
+
+def test_iter_hits_drops_static_and_malformed(tmp_path):
+    path = tmp_path / 'access.log.gz'
+    with gzip.open(path, 'wb') as f:
+        f.write(line('1.1.1.1') + line('1.1.1.1', '/static/app.js') + b'garbage\n' + line('2.2.2.2', '/about?x=1'))
+    stats = {}
+    with open_log(path) as f:
+        hits = list(iter_hits(f, stats=stats))
+    assert [(ip, time, page) for ip, time, page, _, _ in hits] == [
+        ('1.1.1.1', '2025-10-10 10:00:00', '/services'), ('2.2.2.2', '2025-10-10 10:00:00', '/about')
+    ]
+    assert (stats['static'], stats['malformed']) == (1, 1)
+
+
+def test_tailer_returns_only_complete_new_lines(tmp_path):
+    path = tmp_path / 'access.log'
+    path.write_bytes(line('1.1.1.1') + b'2.2.2.2 - - [10/Oct')
+    tailer = LogTailer(path)
+    assert tailer.read() == line('1.1.1.1')
+    assert tailer.consumed == len(line('1.1.1.1'))
+    assert tailer.read() == b''
+
+    with open(path, 'ab') as f:
+        f.write(line('2.2.2.2')[len(b'2.2.2.2 - - [10/Oct'):] + line('3.3.3.3'))
+    assert tailer.read() == line('2.2.2.2') + line('3.3.3.3')
+    assert tailer.consumed == path.stat().st_size
+    tailer.close()
+
+
+def test_tailer_follows_rotation(tmp_path):
+    path = tmp_path / 'access.log'
+    path.write_bytes(line('1.1.1.1'))
+    tailer = LogTailer(path)
+    assert tailer.read() == line('1.1.1.1')
+
+    # Lines written to the old file after the last read are drained before switching
+    with open(path, 'ab') as f:
+        f.write(line('2.2.2.2') + b'3.3.3.3 partial')
+    os.rename(path, tmp_path / 'access.log.1')
+    assert tailer.read() == line('2.2.2.2')  # Not recreated yet
+
+    # The old file's unterminated last line is flushed on the switch
+    path.write_bytes(line('4.4.4.4'))
+    assert tailer.read() == b'3.3.3.3 partial\n' + line('4.4.4.4')
+    assert tailer.identity == path.stat().st_ino
+    tailer.close()
+
+
+def test_tailer_restarts_after_truncation(tmp_path):
+    path = tmp_path / 'access.log'
+    path.write_bytes(line('1.1.1.1') + line('2.2.2.2'))
+    tailer = LogTailer(path)
+    tailer.read()
+    with open(path, 'wb') as f:  # copytruncate, then new lines
+        f.write(line('3.3.3.3'))
+    assert tailer.read() == line('3.3.3.3')
+    tailer.close()
+
+
+def test_tailer_resumes_from_a_stored_position(tmp_path):
+    path = tmp_path / 'access.log'
+    path.write_bytes(line('1.1.1.1') + line('2.2.2.2'))
+    identity, position = path.stat().st_ino, len(line('1.1.1.1'))
+
+    tailer = LogTailer(path, position=position, identity=identity)
+    assert tailer.read() == line('2.2.2.2')
+    tailer.close()
+
+    # A position from another file, or past the end, starts over
+    for stale in [(position, identity + 1), (10 ** 6, identity)]:
+        tailer = LogTailer(path, position=stale[0], identity=stale[1])
+        assert tailer.read() == line('1.1.1.1') + line('2.2.2.2')
+        tailer.close()
+
+
+def test_tailer_refuses_gzip(tmp_path):
+    path = tmp_path / 'access.log'
+    with gzip.open(path, 'wb') as f:
+        f.write(line('1.1.1.1'))
+    with pytest.raises(ValueError):
+        LogTailer(path).read()
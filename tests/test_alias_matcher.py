@@ -0,0 +1,54 @@
+import pytest
+
+import name_matcher
+from alias_matcher import AliasMatcher, load_alias_matcher
+
+ALIASES = {
+    'boeing': ['boeing', 'the boeing company'],
+    'united': ['united airlines', 'ual'],
+    'delta': ['delta air lines', 'delta airlines'],
+    'lufthansa': ['lufthansa', 'lufthansa technik']
+}
+
+
+def test_finds_every_alias_in_one_pass():
+    matcher = AliasMatcher(ALIASES)
+    found = matcher.find_all('Lufthansa Technik and Boeing')
+    assert (0, 9, 'lufthansa') in found
+    assert (0, 17, 'lufthansa') in found
+    assert (22, 28, 'boeing') in found
+
+
+def test_earlier_keys_win():
+    matcher = AliasMatcher(ALIASES)
+    assert matcher.matches('Delta Air Lines / United Airlines codeshare') == ['united', 'delta']
+    assert matcher.match('Delta Air Lines / United Airlines codeshare') == 'united'
+    assert matcher.match('Acme Widgets') is None
+
+
+def test_overlapping_aliases_found_through_failure_links():
+    matcher = AliasMatcher({'a': ['abcd'], 'b': ['bc'], 'c': ['c']})
+    assert sorted(matcher.find_all('xabcdx')) == [(1, 5, 'a'), (2, 4, 'b'), (3, 4, 'c')]
+
+
+def test_whole_words_rejects_matches_inside_words():
+    assert AliasMatcher({'ual': ['ual']}).match('Gradual Systems') == 'ual'
+    matcher = AliasMatcher({'ual': ['ual']}, whole_words=True)
+    assert matcher.match('Gradual Systems') is None
+    assert matcher.match('UAL Corp') == 'ual'
+
+
+def test_normalize_applies_to_aliases_and_text():
+    matcher = AliasMatcher(ALIASES, normalize=name_matcher.canonicalize_org, whole_words=True)
+    assert matcher.match('AS7018 The Boeing Co.') == 'boeing'
+    assert matcher.match('DELTA-AIR-LINES, INC.') == 'delta'
+
+
+@pytest.mark.parametrize('organization, key', [
+    ('Boeing Commercial Airplanes', 'boeing'),
+    ('Lufthansa Technik AG', 'lufthansa'),
+    ('Rolls-Royce plc', 'rolls-royce')
+])
+def test_shipped_alias_file(organization, key):
+    matcher = load_alias_matcher(normalize=name_matcher.canonicalize_org, whole_words=True)
+    assert matcher.match(organization) == key
@@ -0,0 +1,78 @@
+import pytest
+
+import circuit_breaker
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(circuit_breaker.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success(0.1)  # A success resets the count
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CLOSED and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.last_trip_reason == '3 consecutive failures'
+    assert not breaker.allow()
+
+
+def test_half_open_lets_one_probe_through(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock[0] += 29.9
+    assert not breaker.allow()
+    clock[0] += 0.1
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()  # Only one probe at a time
+
+    breaker.record_success(0.1)
+    assert breaker.state == CLOSED and breaker.allow()
+
+
+def test_failed_or_slow_probe_reopens(clock):
+    breaker = CircuitBreaker(failure_threshold=1, latency_threshold=2.0, reset_timeout=30)
+    breaker.record_failure()
+    clock[0] += 30
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN and breaker.last_trip_reason == 'probe failed'
+    assert not breaker.allow()
+
+    clock[0] += 30
+    assert breaker.allow()
+    breaker.record_success(2.5)
+    assert breaker.state == OPEN and breaker.last_trip_reason == 'probe took 2.5s'
+
+    clock[0] += 30
+    assert breaker.allow()
+    breaker.record_success()  # A batch call carries no latency and closes it
+    assert breaker.state == CLOSED
+
+
+def test_opens_on_p95_latency(clock):
+    breaker = CircuitBreaker(latency_threshold=1.0, latency_window=20)
+    for _ in range(9):
+        breaker.record_success(5.0)
+    assert breaker.state == CLOSED  # Fewer than latency_window // 2 samples
+    breaker.record_success(5.0)
+    assert breaker.state == OPEN
+    assert breaker.last_trip_reason == 'p95 latency 5.0s over 1.0s'
+
+
+def test_fast_calls_keep_it_closed(clock):
+    breaker = CircuitBreaker(latency_threshold=1.0, latency_window=40)
+    for _ in range(39):
+        breaker.record_success(0.2)
+    breaker.record_success(3.0)  # One outlier in 40 stays above the p95
+    assert breaker.state == CLOSED
+    assert breaker.p95_latency() == 0.2
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+import company_tiers
+import contact_metadata
+from contact_metadata import MATCH_FOUND, MATCH_NOT_FOUND, MATCH_PARTIAL, counter_uniforms, generate_contact_metadata
+
+
+@pytest.fixture(scope='module')
+def tiers():
+    table = company_tiers.load_tier_table()
+    return [table.get(name) for name in ('aerospace_giant', 'mro', 'generic')]
+
+
+def test_uniforms_depend_only_on_key_and_contact():
+    keys = np.array([7, 7, 7, 99], dtype=np.uint64)
+    u = counter_uniforms(keys, [0, 1, 2, 0])
+    assert u.shape == (4, contact_metadata.DRAWS)
+    assert ((u >= 0) & (u < 1)).all()
+    assert np.array_equal(counter_uniforms([7], [2]), u[2:3])  # Same values alone or in a batch
+    assert np.array_equal(counter_uniforms(keys, [0, 1, 2, 0]), u)
+    assert not np.array_equal(u[0], u[3])  # Other keys draw other values
+
+
+def test_uniforms_look_uniform():
+    u = counter_uniforms(np.full(20000, 12345, dtype=np.uint64), np.arange(20000))
+    assert abs(u.mean() - 0.5) < 0.01
+    assert np.histogram(u, bins=10, range=(0, 1))[0].min() > 0.09 * u.size
+
+
+def test_values_stay_within_tier_bounds(tiers):
+    count = 5000
+    tier_index = np.arange(count) % len(tiers)
+    metadata = generate_contact_metadata(np.uint64(42), np.arange(count), tiers, tier_index)
+    for index, tier in enumerate(tiers):
+        rows = tier_index == index
+        low, high = tier['contact_confidence']
+        assert low <= metadata['confidence_score'][rows].min() and metadata['confidence_score'][rows].max() <= high
+        low, high = tier['updated_days']
+        assert low <= metadata['last_updated_day'][rows].min() and metadata['last_updated_day'][rows].max() <= high
+
+        rates = tier['match_rates']
+        for status, field in ((MATCH_FOUND, 'full_confidence'), (MATCH_PARTIAL, 'partial_confidence'),
+                              (MATCH_NOT_FOUND, 'not_found_confidence')):
+            confidence = metadata['match_confidence'][rows & (metadata['match_status'] == status)]
+            assert len(confidence) and rates[field][0] <= confidence.min() and confidence.max() <= rates[field][1]
+        found = (metadata['match_status'][rows] == MATCH_FOUND).mean()
+        assert abs(found - (1 - rates['full_above'])) < 0.05
+
+
+def test_batch_spanning_tiers_matches_per_tier_batches(tiers):
+    keys = np.array([1, 2, 3, 4, 5, 6], dtype=np.uint64)
+    contact_ids = np.array([0, 5, 9, 0, 5, 9])
+    tier_index = np.array([0, 0, 1, 1, 2, 2])
+    batch = generate_contact_metadata(keys, contact_ids, tiers, tier_index)
+    for index, tier in enumerate(tiers):
+        rows = tier_index == index
+        alone = generate_contact_metadata(keys[rows], contact_ids[rows], [tier])
+        for field, values in alone.items():
+            assert np.array_equal(batch[field][rows], values)
+
+
+def test_records_format_display_fields(tiers):
+    metadata = generate_contact_metadata(np.uint64(3), [0, 1], tiers[:1])
+    records = list(contact_metadata.metadata_records(metadata))
+    assert len(records) == 2
+    assert set(records[0]) == {'confidence_score', 'last_updated', 'verified', 'zoominfo_match', 'match_confidence'}
+    assert records[0]['confidence_score'] == f"{metadata['confidence_score'][0]}%"
+    assert records[1]['last_updated'] == f"2025-01-{metadata['last_updated_day'][1]:02d}"
+    assert records[0]['zoominfo_match'] == contact_metadata.MATCH_LABELS[metadata['match_status'][0]]
@@ -0,0 +1,302 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+import contacts_store
+import contacts_watcher
+from contacts_store import ContactsStore
+
+
+def make_contacts(company, count, seniorities=('C-Level', 'VP-Level', 'Director', 'Manager')):
+    return [
+        {
+            'name': f'Zoë {company.title()} {i}', 'title': f'Title {i}', 'email': f'person{i}@{company}.com',
+            'phone': f'+1-555-{i:04d}', 'linkedin': f'linkedin.com/in/{company}{i}',
+            'department': ('Engineering', 'Operations', 'Finance')[i % 3], 'seniority': seniorities[i % len(seniorities)]
+        }
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def export():
+    """A small export: a company with complete coverage, a partial one, an empty one, and odd records"""
+    data = {'boeing': make_contacts('boeing', 20), 'delta': make_contacts('delta', 5), 'acme': []}
+    data['delta'][1]['twitter'] = '@delta1'  # A field outside CONTACT_FIELDS
+    del data['delta'][2]['seniority']
+    data['delta'][3]['phone'] = None
+    return data
+
+
+def write_export(path, data):
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding='utf-8')
+    return str(path)
+
+
+def test_records_are_read_only(export):
+    store = ContactsStore(export)
+    with pytest.raises(TypeError):
+        store['boeing'][0]['name'] = 'changed'
+    assert store.get_contacts('delta', [1, 0]) == (store['delta'][1], store['delta'][0])
+
+
+def test_company_stats(export):
+    stats = ContactsStore(export).company_stats().set_index('Company')
+    assert list(stats.index) == ['Boeing', 'Delta', 'Acme']
+    assert stats.loc['Boeing', ['Total Contacts', 'C-Level', 'VP-Level', 'Directors']].tolist() == [20, 5, 5, 5]
+    assert stats.loc['Delta', ['Total Contacts', 'C-Level', 'VP-Level', 'Directors']].tolist() == [5, 2, 1, 0]
+    assert stats.loc['Acme', 'Total Contacts'] == 0
+    assert stats['Coverage'].tolist() == ['🟢 Complete', '🟡 Partial', '🟡 Partial']
+
+
+def test_frame_keeps_only_index_and_categorical_columns(export):
+    store = ContactsStore(export)
+    assert list(store.frame.columns) == ['company', 'contact_index', 'seniority', 'department']
+    assert store.total_contacts() == 25
+    assert list(store.frame['company'].cat.categories) == ['boeing', 'delta', 'acme']
+
+
+def test_updated_matches_a_fresh_build(export):
+    store = ContactsStore(export, version='v1')
+    changed = json.loads(json.dumps(export))
+    changed['delta'][0]['title'] = 'Chief Pilot'
+    changed['delta'].append(make_contacts('delta', 7)[6])
+    del changed['acme']
+    changed['lufthansa'] = make_contacts('lufthansa', 3)
+
+    new, diff = store.updated(changed, version='v2')
+    assert diff == {
+        'added': ['lufthansa'], 'removed': ['acme'],
+        'changed': {'delta': {'inserted': 1, 'updated': 1, 'deleted': 0}}
+    }
+    assert new['boeing'] is store['boeing']  # Unchanged companies keep their records
+    assert new['delta'][1] is store['delta'][1]
+    fresh = ContactsStore(changed)
+    pd.testing.assert_frame_equal(new.company_stats(), fresh.company_stats())
+    assert dict(new) == dict(fresh)
+    assert store.version == 'v1' and 'acme' in store  # The old store is untouched
+
+
+def test_overlay_over_records(export):
+    store = ContactsStore(export)
+    overlay = contacts_store.make_overlay([3, 0], [{'match_status': 'Verified'}, {'match_status': 'Pending'}])
+    contacts = contacts_store.lead_contacts(store, 'boeing', overlay)
+    assert [contact['match_status'] for contact in contacts] == ['Verified', 'Pending']
+    assert [contact['email'] for contact in contacts] == ['person3@boeing.com', 'person0@boeing.com']
+    assert 'match_status' not in store['boeing'][3]
+
+
+def test_json_backend_versions_by_content(tmp_path, export):
+    path = write_export(tmp_path / 'contacts.json', export)
+    store = contacts_store.load_contacts_store(path, backend='json')
+    assert dict(store) == dict(ContactsStore(export))
+    assert store.version == contacts_store.source_version((tmp_path / 'contacts.json').read_bytes())
+
+
+def records(contacts):
+    # Derived backends drop explicit nulls, which readers see the same way through .get()
+    return [{field: value for field, value in contact.items() if value is not None} for contact in contacts]
+
+
+def assert_same_store(store, reference):
+    """store answers every read the dashboard makes exactly like the in-memory reference"""
+    assert list(store) == list(reference)
+    assert len(store) == len(reference) and 'missing' not in store
+    for key in reference:
+        assert key in store
+        assert store.contact_count(key) == reference.contact_count(key)
+        assert records(store[key]) == records(reference[key])
+        ids = list(range(reference.contact_count(key)))[::-2]
+        assert records(store.get_contacts(key, ids)) == records(reference.get_contacts(key, ids))
+    assert store.total_contacts() == reference.total_contacts()
+    pd.testing.assert_frame_equal(store.company_stats(), reference.company_stats(), check_dtype=False)
+
+
+def test_sqlite_backend_matches_json(tmp_path, export):
+    path = write_export(tmp_path / 'contacts.json', export)
+    db_path = str(tmp_path / 'contacts.sqlite3')
+    assert contacts_store.import_json_to_sqlite(path, db_path, batch_size=7) == 25
+    store = contacts_store.SQLiteContactsStore(db_path)
+    try:
+        assert_same_store(store, ContactsStore(export))
+        assert store['delta'][1]['twitter'] == '@delta1'
+        assert store.version == contacts_store.source_version((tmp_path / 'contacts.json').read_bytes())
+    finally:
+        store.close()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['contacts.json', 'contacts.sqlite3']
+
+
+def test_sqlite_reimported_when_export_changes(tmp_path, export):
+    path = write_export(tmp_path / 'contacts.json', export)
+    db_path = str(tmp_path / 'contacts.sqlite3')
+    assert not contacts_store.sqlite_is_fresh(path, db_path)
+    contacts_store.load_contacts_sqlite(path, db_path).close()
+    assert contacts_store.sqlite_is_fresh(path, db_path)
+
+    export['acme'] = make_contacts('acme', 2)
+    write_export(tmp_path / 'contacts.json', export)
+    assert not contacts_store.sqlite_is_fresh(path, db_path)
+    store = contacts_store.load_contacts_sqlite(path, db_path)
+    try:
+        assert_same_store(store, ContactsStore(export))
+    finally:
+        store.close()
+
+
+def test_failed_sqlite_import_leaves_no_files(tmp_path):
+    path = tmp_path / 'contacts.json'
+    path.write_text('{"boeing": [{"name": "a"}, ', encoding='utf-8')
+    with pytest.raises(ValueError):
+        contacts_store.import_json_to_sqlite(str(path), str(tmp_path / 'contacts.sqlite3'))
+    assert [p.name for p in tmp_path.iterdir()] == ['contacts.json']
+
+
+def test_snapshot_backend_matches_json(tmp_path, export):
+    path = write_export(tmp_path / 'contacts.json', export)
+    snapshot_path = str(tmp_path / 'contacts.snap')
+    assert contacts_store.build_contacts_snapshot(path, snapshot_path) == 25
+    store = contacts_store.SnapshotContactsStore(snapshot_path)
+    assert_same_store(store, ContactsStore(export))
+    assert store['delta'][1]['twitter'] == '@delta1'
+    with pytest.raises(IndexError):
+        store.get_contacts('delta', [5])
+
+
+def test_snapshot_rebuilt_only_when_content_changes(tmp_path, export):
+    path = write_export(tmp_path / 'contacts.json', export)
+    snapshot_path = str(tmp_path / 'contacts.snap')
+    assert not contacts_store.snapshot_is_fresh(path, snapshot_path)
+    contacts_store.load_contacts_snapshot(path, snapshot_path)
+    assert contacts_store.snapshot_is_fresh(path, snapshot_path)
+
+    export['delta'][0]['name'] = 'Zoë Delta X'  # Same size, different content
+    write_export(tmp_path / 'contacts.json', export)
+    assert not contacts_store.snapshot_is_fresh(path, snapshot_path)
+    assert_same_store(contacts_store.load_contacts_snapshot(path, snapshot_path), ContactsStore(export))
+
+
+LOADERS = {
+    'sqlite': lambda path, derived: contacts_store.load_contacts_sqlite(path, derived),
+    'snapshot': lambda path, derived: contacts_store.load_contacts_snapshot(path, derived),
+    'shards': lambda path, derived: contacts_store.load_contacts_shards(path, derived)
+}
+FRESHNESS = {
+    'sqlite': contacts_store.sqlite_is_fresh,
+    'snapshot': contacts_store.snapshot_is_fresh,
+    'shards': lambda path, derived: contacts_store.load_contacts_shards(path, derived) is not None
+}
+
+
+@pytest.mark.parametrize('backend', ['sqlite', 'snapshot', 'shards'])
+def test_touched_export_is_hashed_once(tmp_path, export, monkeypatch, backend):
+    path = write_export(tmp_path / 'contacts.json', export)
+    derived = str(tmp_path / 'derived')
+    store = LOADERS[backend](path, derived)
+    version = store.version
+    stat = (tmp_path / 'contacts.json').stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    hashes = []
+    hasher = contacts_store._source_hasher
+    monkeypatch.setattr(contacts_store, '_source_hasher', lambda: hashes.append(1) or hasher())
+    assert FRESHNESS[backend](path, derived)
+    assert FRESHNESS[backend](path, derived)
+    assert hashes == [1]  # The new mtime was recorded after the first hash
+
+    reopened = LOADERS[backend](path, derived)
+    assert reopened.version == version
+    assert_same_store(reopened, ContactsStore(export))
+    assert_same_store(store, ContactsStore(export))  # Stores opened before the restamp keep working
+
+
+def test_shards_backend_matches_json(tmp_path, export):
+    path = write_export(tmp_path / 'contacts.json', export)
+    shards_path = str(tmp_path / 'shards')
+    assert contacts_store.build_contacts_shards(path, shards_path) == 25
+    store = contacts_store.ShardedContactsStore(shards_path)
+    assert store.cache_info()['shards'] == 0  # Only the manifest is read on open
+    assert_same_store(store, ContactsStore(export))
+    assert store['delta'][1]['twitter'] == '@delta1'
+
+
+def test_shard_cache_stays_within_budget(tmp_path, export):
+    path = write_export(tmp_path / 'contacts.json', export)
+    shards_path = str(tmp_path / 'shards')
+    contacts_store.build_contacts_shards(path, shards_path)
+    store = contacts_store.ShardedContactsStore(shards_path, cache_bytes=1)
+    store['boeing']
+    store['delta']
+    store['delta']
+    assert store.cache_info() == {
+        'shards': 1, 'bytes': store._companies['delta']['bytes'], 'hits': 1, 'misses': 2
+    }
+
+
+def test_open_shard_store_survives_a_rebuild(tmp_path, export):
+    path = write_export(tmp_path / 'contacts.json', export)
+    shards_path = str(tmp_path / 'shards')
+    old = contacts_store.load_contacts_shards(path, shards_path)
+    reference = ContactsStore(export)
+
+    export['acme'] = make_contacts('acme', 2)
+    write_export(tmp_path / 'contacts.json', export)
+    new = contacts_store.load_contacts_shards(path, shards_path)
+    assert new.version != old.version
+    assert_same_store(new, ContactsStore(export))
+    assert_same_store(old, reference)  # Its shards are kept until the next rebuild
+
+
+def changed_export(export):
+    changed = json.loads(json.dumps(export))
+    changed['delta'][0]['title'] = 'Chief Pilot'
+    changed['delta'].append(make_contacts('delta', 7)[6])
+    del changed['acme']
+    changed['lufthansa'] = make_contacts('lufthansa', 3)
+    return changed
+
+
+@pytest.mark.parametrize('backend', ['sqlite', 'snapshot', 'shards'])
+def test_diff_stores_matches_incremental_update(tmp_path, export, monkeypatch, backend):
+    path = write_export(tmp_path / 'contacts.json', export)
+    derived = str(tmp_path / 'derived')
+    old = LOADERS[backend](path, derived)
+    changed = changed_export(export)
+    write_export(tmp_path / 'contacts.json', changed)
+    new = LOADERS[backend](path, derived)
+
+    _, expected = ContactsStore(export).updated(changed)
+    read = []
+    get = type(new).__getitem__
+    monkeypatch.setattr(type(new), '__getitem__', lambda self, key: read.append(key) or get(self, key))
+    assert contacts_store.diff_stores(old, new) == expected
+    assert read == ['delta', 'delta']  # Unchanged companies are skipped by their content hash
+
+    read.clear()
+    monkeypatch.setattr(type(old), 'company_hashes', lambda self: None)  # Built before hashes were recorded
+    assert contacts_store.diff_stores(old, new) == expected
+    assert read.count('boeing') == 2
+
+
+def test_watcher_keeps_shard_generations_readable(tmp_path, export):
+    path = write_export(tmp_path / 'contacts.json', export)
+    shards_path = str(tmp_path / 'shards')
+    watcher = contacts_watcher.ContactsWatcher(
+        lambda: contacts_store.load_contacts_shards(path, shards_path), path=path, interval=0
+    )
+    versions = [(watcher.current.version, ContactsStore(export))]
+    for generation in range(contacts_store.CONTACTS_GENERATIONS + 1):
+        export['acme'].append(make_contacts('acme', generation + 1)[generation])
+        write_export(tmp_path / 'contacts.json', export)
+        assert watcher.poll() == {
+            'added': [], 'removed': [], 'changed': {'acme': {'inserted': 1, 'updated': 0, 'deleted': 0}}
+        }
+        versions.append((watcher.current.version, ContactsStore(export)))
+
+    dropped, kept = versions[:-watcher.generations], versions[-watcher.generations:]
+    assert all(watcher.store_for(version) is None for version, _ in dropped)
+    assert watcher.store_for('unknown') is None
+    for version, reference in kept:
+        # Uncached shards of every store still reachable are still on disk
+        assert_same_store(watcher.store_for(version), reference)
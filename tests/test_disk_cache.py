@@ -0,0 +1,68 @@
+import pytest
+
+import disk_cache
+from disk_cache import DiskCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(disk_cache.time, 'time', lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    cache = DiskCache(tmp_path / 'cache.sqlite3', ttl=100, negative_ttl=10, max_entries=10, stale_grace=50)
+    yield cache
+    cache.close()
+
+
+def test_round_trip_and_negative_entries(cache):
+    cache.set('8.8.8.8', {'organization': 'Google', 'asn': 15169})
+    cache.set('10.0.0.1', {'error': 'private range'}, negative=True)
+    assert cache.get('8.8.8.8') == ({'organization': 'Google', 'asn': 15169}, False)
+    assert cache.get('10.0.0.1') == ({'error': 'private range'}, True)
+    assert cache.get('1.1.1.1') is None
+    cache.delete('8.8.8.8')
+    assert cache.get('8.8.8.8') is None and len(cache) == 1
+
+
+def test_expiry_and_stale_answers(cache, clock):
+    cache.set('positive', 1)
+    cache.set('negative', 2, negative=True)
+    clock[0] += 11
+    assert cache.get('negative') is None  # Negative entries use their own, shorter TTL
+    assert cache.get('positive') == (1, False)
+    clock[0] += 100
+    assert cache.get('positive') is None
+    assert cache.get('positive', allow_stale=True) == (1, False)
+
+
+def test_eviction_drops_expired_then_least_recently_used(cache, clock):
+    cache.set('old', 0, ttl=1)
+    clock[0] += 60  # Past its expiry and the stale grace window
+    for i in range(10):
+        clock[0] += 1
+        cache.set(f'key{i}', i)
+    assert cache.get('old', allow_stale=True) is None
+
+    clock[0] += 1
+    cache.get('key0')  # Reading an entry makes it recently used
+    for i in range(10, 15):
+        clock[0] += 1
+        cache.set(f'key{i}', i)
+    assert len(cache) == 10
+    assert cache.get('key0') == (0, False)
+    assert [cache.get(f'key{i}') for i in range(1, 6)] == [None] * 5
+
+
+def test_workers_share_the_file(tmp_path, clock):
+    first = DiskCache(tmp_path / 'cache.sqlite3', table='ip_cache')
+    second = DiskCache(tmp_path / 'cache.sqlite3', table='ip_cache')
+    first.set('8.8.8.8', 'Google')
+    assert second.get('8.8.8.8') == ('Google', False)
+    second.clear()
+    assert first.get('8.8.8.8') is None
+    first.close()
+    second.close()
@@ -0,0 +1,81 @@
+import asyncio
+import time
+
+import enrichment
+
+SUCCESS = {'success': True, 'organization': 'Org'}
+NO_COMPANY = {'success': False, 'error': 'No company found for this IP'}
+TRANSIENT = {'success': False, 'error': 'Error: 503'}
+
+
+def run(visitors, lookup, **kwargs):
+    async def collect():
+        return [pair async for pair in enrichment.enrich_visitors(visitors, lookup, search, **kwargs)]
+    return dict((visitor['ip'], result) for visitor, result in asyncio.run(collect()))
+
+
+def search(organization, ip_address):
+    return {'company': organization, 'ip': ip_address}
+
+
+def visitors(*ips):
+    return [{'ip': ip, 'organization': 'Unknown'} for ip in ips]
+
+
+def test_retries_only_transient_failures():
+    calls = {}
+
+    def lookup(ip):
+        calls[ip] = calls.get(ip, 0) + 1
+        if ip == 'flaky' and calls[ip] < 3:
+            return TRANSIENT
+        return {'down': TRANSIENT, 'none': NO_COMPANY}.get(ip, SUCCESS)
+
+    results = run(visitors('ok', 'flaky', 'none', 'down'), lookup, retries=2, backoff=0.001)
+    assert calls == {'ok': 1, 'flaky': 3, 'none': 1, 'down': 3}
+    assert results['ok']['zoominfo_data'] == {'company': 'Org', 'ip': 'ok'}
+    assert results['flaky']['company_data'] == SUCCESS
+    assert results['none'] == {'ip': 'none', 'error': NO_COMPANY['error']}
+    assert results['down'] == {'ip': 'down', 'error': TRANSIENT['error']}
+
+
+def test_times_out_slow_lookups():
+    def lookup(ip):
+        time.sleep(0.5 if ip == 'slow' else 0)
+        return SUCCESS
+
+    results = run(visitors('slow', 'fast'), lookup, timeout=0.05, retries=0)
+    assert results['slow']['error'] == 'Error: lookup timed out after 0.05s'
+    assert 'company_data' in results['fast']
+
+
+def test_limits_concurrency():
+    active, peak = [0], [0]
+
+    def lookup(ip):
+        active[0] += 1
+        peak[0] = max(peak[0], active[0])
+        time.sleep(0.02)
+        active[0] -= 1
+        return SUCCESS
+
+    run(visitors(*map(str, range(12))), lookup, concurrency=3)
+    assert peak[0] <= 3
+
+
+def test_prefetched_answers_skip_single_lookups():
+    looked_up, prefetched = [], []
+
+    def prefetch(ips):
+        prefetched.append(list(ips))
+        return [TRANSIENT if ip == 'failed' else NO_COMPANY if ip == 'none' else SUCCESS for ip in ips]
+
+    def lookup(ip):
+        looked_up.append(ip)
+        return SUCCESS
+
+    results = run(visitors('a', 'none', 'failed'), lookup, prefetch=prefetch)
+    assert prefetched == [['a', 'none', 'failed']]
+    assert looked_up == ['failed']
+    assert 'company_data' in results['a'] and 'company_data' in results['failed']
+    assert results['none']['error'] == NO_COMPANY['error']
@@ -0,0 +1,73 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from http_client import HttpClient
+
+
+class FlakyProvider(BaseHTTPRequestHandler):
+    """Answers the first `failures` requests with `status` (and Retry-After), then 200"""
+
+    protocol_version = 'HTTP/1.1'
+    status, retry_after, failures, requests = 503, None, 0, 0
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        cls = type(self)
+        cls.requests += 1
+        failed = cls.requests <= cls.failures
+        self.send_response(cls.status if failed else 200)
+        if failed and cls.retry_after is not None:
+            self.send_header('Retry-After', str(cls.retry_after))
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+
+@pytest.fixture
+def provider():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FlakyProvider)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    FlakyProvider.status, FlakyProvider.retry_after, FlakyProvider.failures, FlakyProvider.requests = 503, None, 0, 0
+    yield f'http://127.0.0.1:{server.server_address[1]}/'
+    server.shutdown()
+    server.server_close()
+
+
+def test_retries_transient_statuses(provider):
+    FlakyProvider.failures = 2
+    client = HttpClient(retries=2, backoff=0.01)
+    assert client.get(provider).status_code == 200
+    assert FlakyProvider.requests == 3
+    client.close()
+
+
+def test_gives_up_after_the_retries(provider):
+    FlakyProvider.failures = 10
+    client = HttpClient(retries=2, backoff=0.01)
+    assert client.get(provider).status_code == 503
+    assert FlakyProvider.requests == 3
+    client.close()
+
+
+def test_retry_after_past_the_deadline_is_not_waited_for(provider):
+    FlakyProvider.status, FlakyProvider.retry_after, FlakyProvider.failures = 429, 30, 10
+    client = HttpClient(retries=2, backoff=0.01, total_timeout=2)
+    started = time.monotonic()
+    assert client.get(provider).status_code == 429
+    assert time.monotonic() - started < 2
+    assert FlakyProvider.requests == 1
+    client.close()
+
+
+def test_short_retry_after_within_the_deadline_is_honored(provider):
+    FlakyProvider.status, FlakyProvider.retry_after, FlakyProvider.failures = 429, 1, 1
+    client = HttpClient(retries=2, backoff=0.01, total_timeout=5)
+    started = time.monotonic()
+    assert client.get(provider).status_code == 200
+    assert time.monotonic() - started >= 1
+    client.close()
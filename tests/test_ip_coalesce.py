@@ -0,0 +1,109 @@
+import threading
+import time
+
+import pytest
+
+from ip_coalesce import CoalescingResolver, SingleFlight, prefix_key
+
+NO_COMPANY = {'success': False, 'error': 'No company found for this IP'}
+
+
+def answer(ip):
+    return {'success': True, 'ip': ip, 'organization': f'Org {ip.rsplit(".", 1)[0]}'}
+
+
+def test_prefix_key():
+    assert prefix_key('52.16.7.9') == prefix_key('52.16.7.200') != prefix_key('52.16.8.1')
+    assert prefix_key('2001:db8:1:2::1') == prefix_key('2001:db8:1:ffff::1') != prefix_key('2001:db8:2::1')
+    assert prefix_key('bogus') == ('raw', 'bogus')
+
+
+def test_resolve_shares_definitive_answers_only():
+    coalescer = CoalescingResolver()
+    calls = []
+
+    def lookup(ip):
+        calls.append(ip)
+        return answer(ip) if ip.startswith('1.') else {'success': False, 'error': 'Error: 503'}
+
+    first, second = coalescer.resolve('1.2.3.4', lookup), coalescer.resolve('1.2.3.5', lookup)
+    assert calls == ['1.2.3.4']
+    assert second == dict(first, ip='1.2.3.5', coalesced_from='1.2.3.4')
+
+    coalescer.resolve('9.9.9.1', lookup)
+    coalescer.resolve('9.9.9.2', lookup)  # Transient errors aren't reused
+    assert calls == ['1.2.3.4', '9.9.9.1', '9.9.9.2']
+
+
+def test_resolve_many_sends_one_representative_per_prefix():
+    coalescer = CoalescingResolver()
+    coalescer.resolve('7.7.7.1', answer)
+    batches = []
+
+    def lookup_many(ips):
+        batches.append(list(ips))
+        return {ip: NO_COMPANY if ip.startswith('8.') else answer(ip) for ip in ips}
+
+    results = coalescer.resolve_many(['1.1.1.1', '1.1.1.2', '7.7.7.9', '8.8.8.8', '8.8.8.9', '1.1.1.1'], lookup_many)
+    assert batches == [['1.1.1.1', '8.8.8.8']]
+    assert results['1.1.1.2']['coalesced_from'] == '1.1.1.1'
+    assert results['7.7.7.9']['coalesced_from'] == '7.7.7.1'
+    assert results['8.8.8.9'] == dict(NO_COMPANY, coalesced_from='8.8.8.8')
+
+
+def slow(fn, delay=0.2):
+    def wrapped(*args):
+        time.sleep(delay)
+        return fn(*args)
+    return wrapped
+
+
+def test_concurrent_batches_share_in_flight_prefixes():
+    coalescer = CoalescingResolver()
+    sent = []
+    lock = threading.Lock()
+
+    def lookup_many(ips):
+        with lock:
+            sent.extend(ips)
+        time.sleep(0.2)
+        return {ip: answer(ip) for ip in ips}
+
+    batches = [[f'10.0.{i}.1' for i in range(start, start + 6)] for start in (0, 3, 0, 5)]
+    results = [None] * len(batches)
+
+    def run(i):
+        results[i] = coalescer.resolve_many(batches[i], lookup_many)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(batches))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(sent) == sorted({ip for batch in batches for ip in batch})  # Each prefix asked once
+    for batch, result in zip(batches, results):
+        assert set(result) == set(batch)
+        assert all(result[ip]['organization'] == answer(ip)['organization'] for ip in batch)
+
+
+def test_single_lookup_waits_for_an_in_flight_batch():
+    coalescer = CoalescingResolver()
+    lookups = []
+    batch = threading.Thread(target=coalescer.resolve_many, args=(['3.3.3.1'], slow(lambda ips: {ip: answer(ip) for ip in ips})))
+    batch.start()
+    time.sleep(0.05)
+    result = coalescer.resolve('3.3.3.2', lambda ip: lookups.append(ip) or answer(ip))
+    batch.join()
+    assert lookups == [] and result['coalesced_from'] == '3.3.3.1'
+
+
+def test_batch_errors_reach_the_waiters():
+    flight = SingleFlight()
+    led, joined = flight.claim(['a'])
+    _, waiting = flight.claim(['a'])
+    assert list(led) == list(waiting) == ['a'] and not joined
+    flight.finish('a', led['a'], error=RuntimeError('down'))
+    with pytest.raises(RuntimeError):
+        SingleFlight.wait(waiting['a'])
+    assert flight.claim(['a'])[0]  # Released for the next caller
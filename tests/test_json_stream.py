@@ -0,0 +1,52 @@
+import io
+import json
+import random
+
+import pytest
+
+from json_stream import iter_grouped_records
+
+
+def sample_export():
+    rng = random.Random(0)
+    return {
+        f'company {i} "ä"': [
+            {'name': f'Person {i}.{j}', 'score': rng.random() * 10 ** rng.randint(0, 12), 'tags': ['a', None, True],
+             'note': 'x' * rng.randint(0, 300)}
+            for j in range(rng.randint(0, 5))
+        ] + ([12345678901234567890] if i % 7 == 0 else [])
+        for i in range(60)
+    }
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 4096, 1 << 20])
+def test_matches_json_loads(chunk_size):
+    data = sample_export()
+    raw = json.dumps(data, indent=1, ensure_ascii=False).encode('utf-8-sig')
+    chunks, keys = [], []
+    records = list(iter_grouped_records(io.BytesIO(raw), chunk_size=chunk_size, on_chunk=chunks.append, on_key=keys.append))
+
+    assert records == [(key, index, record) for key, values in data.items() for index, record in enumerate(values)]
+    assert keys == list(data)  # Including keys without records
+    assert raw.startswith(b''.join(chunks)) and len(b''.join(chunks)) >= len(raw.rstrip())
+
+
+@pytest.mark.parametrize('raw', [b'{}', b' \n{ } '])
+def test_empty_object(raw):
+    assert list(iter_grouped_records(io.BytesIO(raw))) == []
+
+
+@pytest.mark.parametrize('raw', [
+    b'[]', b'{"a": {}}', b'{"a": [1 2]}', b'{"a": [1], }', b'{1: []}', b'{"a": [1]', b'{"a": [{"x": 1'
+])
+def test_malformed_input_raises(raw):
+    with pytest.raises(ValueError):
+        list(iter_grouped_records(io.BytesIO(raw), chunk_size=3))
+
+
+def test_unterminated_value_stops_at_the_size_cap():
+    reads = []
+    raw = b'{"a": [{"x": "' + b'y' * (1 << 20)
+    with pytest.raises(ValueError, match='No complete JSON value within'):
+        list(iter_grouped_records(io.BytesIO(raw), chunk_size=1024, on_chunk=reads.append, max_value_size=10000))
+    assert sum(len(chunk) for chunk in reads) < 20000
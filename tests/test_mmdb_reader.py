@@ -0,0 +1,65 @@
+import ipaddress
+import random
+
+import pytest
+
+from mmdb_reader import InvalidDatabaseError, MMDBReader
+
+mmdb_writer = pytest.importorskip('mmdb_writer')
+netaddr = pytest.importorskip('netaddr')
+
+
+def build_database(path, ip_version, networks):
+    writer = mmdb_writer.MMDBWriter(ip_version=ip_version, database_type='GeoLite2-ASN', ipv4_compatible=ip_version == 6)
+    for network, record in networks:
+        writer.insert_network(netaddr.IPSet([network]), record)
+    writer.to_db_file(str(path))
+
+
+def expected(networks, address):
+    """Record of the longest inserted network containing address"""
+    matches = [(network.prefixlen, record) for network, record in networks if address in network]
+    return max(matches, key=lambda match: match[0])[1] if matches else None
+
+
+@pytest.mark.parametrize('ip_version', [4, 6])
+def test_matches_inserted_networks(tmp_path, ip_version):
+    rng = random.Random(ip_version)
+    networks = [
+        ('52.16.0.0/14', {'autonomous_system_number': 16509, 'autonomous_system_organization': 'The Boeing Company'}),
+        ('8.8.8.0/24', {
+            'autonomous_system_number': 15169, 'autonomous_system_organization': 'Google LLC',
+            'extra': [1, -5, 2.5, True, {'long': 'b' * 300}]
+        }),
+    ]
+    for i in range(500):
+        network = ipaddress.ip_network((rng.getrandbits(32), rng.randint(16, 28)), strict=False)
+        if not any(network.overlaps(ipaddress.ip_network(other)) for other, _ in networks):
+            networks.append((str(network), {'autonomous_system_number': i, 'autonomous_system_organization': f'Org{i % 50}'}))
+    if ip_version == 6:
+        networks.append(('2001:db8::/32', {'autonomous_system_number': 1, 'autonomous_system_organization': 'V6 Org'}))
+
+    path = tmp_path / f'asn{ip_version}.mmdb'
+    build_database(path, ip_version, networks)
+    parsed = [(ipaddress.ip_network(network), record) for network, record in networks]
+
+    reader = MMDBReader(path)
+    try:
+        assert reader.ip_version == ip_version
+        probes = [ipaddress.ip_address(rng.getrandbits(32)) for _ in range(3000)]
+        probes += [network.network_address for network, _ in parsed] + [network.broadcast_address for network, _ in parsed]
+        for address in probes:
+            if address.version == 6 and ip_version == 4:
+                assert reader.get(str(address)) is None
+                continue
+            assert reader.get(str(address)) == expected(parsed, address), address
+        assert reader.get('8.8.8.8')['extra'][4]['long'] == 'b' * 300
+    finally:
+        reader.close()
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / 'not.mmdb'
+    path.write_bytes(b'\0' * 1024)
+    with pytest.raises(InvalidDatabaseError):
+        MMDBReader(path)
@@ -0,0 +1,98 @@
+import json
+
+import pytest
+
+import alias_matcher
+from name_matcher import FUZZY_MATCH_THRESHOLD, TrigramIndex, canonicalize_org, trigrams
+
+
+@pytest.fixture(scope='module')
+def shipped():
+    """Alias automaton and trigram index built the way the dashboard builds them"""
+    with open(alias_matcher.COMPANY_ALIASES_PATH, encoding='utf-8') as f:
+        aliases = json.load(f)
+    matcher = alias_matcher.AliasMatcher(aliases, normalize=canonicalize_org, whole_words=True)
+    index = TrigramIndex()
+    for key, names in aliases.items():
+        index.add_company(key, names)
+    return matcher, index
+
+
+def match_company_key(shipped, organization):
+    """enhanced_dashboard.match_company_key without the Streamlit caches"""
+    matcher, index = shipped
+    found = matcher.match(organization)
+    if found is not None:
+        return found
+    candidates = index.search(organization, k=1)
+    if candidates and candidates[0][2] >= FUZZY_MATCH_THRESHOLD:
+        return candidates[0][0]
+    return None
+
+
+@pytest.mark.parametrize('name, canonical', [
+    ('AS7018 The Boeing Co.', 'boeing'),
+    ('Lufthansa Technik AG', 'lufthansa technik'),
+    ('Rolls-Royce plc', 'rolls royce'),
+    ('The Company', 'the company')
+])
+def test_canonicalize_org(name, canonical):
+    assert canonicalize_org(name) == canonical
+
+
+def test_search_scores_by_trigram_similarity():
+    index = TrigramIndex()
+    index.add('Delta Air Lines', 'delta')
+    index.add('Delta Airlines', 'delta')
+    index.add('Lufthansa', 'lufthansa')
+    results = index.search('Delta Air Lines, Inc.', k=5)
+    assert results[0] == ('delta', 'delta air lines', 1.0)
+    assert [key for key, _, _ in results].count('delta') == 1  # Each company reported once
+    assert index.search('Zzyzx', k=5) == []
+
+
+def test_remove_and_readd():
+    index = TrigramIndex()
+    index.add('Boeing', 'boeing')
+    assert index.search('Boeing')[0][0] == 'boeing'
+    index.remove('boeing')
+    assert index.search('Boeing') == []
+    index.add('Boeing', 'boeing')
+    assert index.search('Boeing')[0][0] == 'boeing'
+
+
+@pytest.mark.parametrize('organization, key', [
+    ('Delta Air Lines Inc.', 'delta'),
+    ('AS3356 United Airlines', 'united'),
+    ('American Airline Inc', 'american'),
+    ('Americn Airlines', 'american'),
+    ('Deutsche Lufthansa AG', 'lufthansa'),
+    ('The Boeing Company', 'boeing')
+])
+def test_matches_airlines(shipped, organization, key):
+    assert match_company_key(shipped, organization) == key
+
+
+@pytest.mark.parametrize('organization', [
+    'American Express Company',
+    'American Tower Corp',
+    'United Parcel Service',
+    'United States Department of Defense',
+    'Delta Dental of California',
+    'Road Runner rr.com',
+    'UnitedHealth Group'
+])
+def test_generic_words_dont_match(shipped, organization):
+    assert match_company_key(shipped, organization) is None
+
+
+def test_remove_purges_postings_and_compacts():
+    index = TrigramIndex()
+    index.add_company('acme')
+    for _ in range(50):
+        index.add_company('delta', ['Delta Air Lines', 'Delta Airlines'])
+        index.remove('delta')
+    assert len(index) == 1 and len(index.names) < 10
+    assert set(index._lists) == trigrams('acme')
+    assert index.search('Delta Air Lines') == []
+    assert index.search('Acme Inc')[0][0] == 'acme'
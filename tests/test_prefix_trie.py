@@ -0,0 +1,51 @@
+import random
+
+import pytest
+
+from ip_resolver import PrefixTrie
+
+
+def brute_force(networks, width, address):
+    """Value of the longest network containing address (last insert wins on duplicates)"""
+    best, best_len = None, -1
+    for network, prefix_len, value in networks:
+        shift = width - prefix_len
+        if address >> shift == network >> shift and prefix_len >= best_len:
+            best, best_len = value, prefix_len
+    return best
+
+
+@pytest.mark.parametrize('width', [32, 128])
+def test_matches_brute_force(width):
+    rng = random.Random(width)
+    networks = []
+    trie = PrefixTrie(width)
+    for i in range(400):
+        if networks and rng.random() < 0.3:
+            # Nest a longer or shorter prefix inside an existing one to exercise edge splits
+            base, base_len, _ = rng.choice(networks)
+            prefix_len = rng.randint(0, width)
+            network = base ^ (rng.getrandbits(width) & ((1 << (width - min(base_len, prefix_len))) - 1))
+        else:
+            prefix_len = rng.randint(0, width)
+            network = rng.getrandbits(width)
+        network &= ~((1 << (width - prefix_len)) - 1)
+        networks.append((network, prefix_len, i))
+        trie.insert(network, prefix_len, i)
+
+    probes = [rng.getrandbits(width) for _ in range(2000)]
+    probes += [network for network, _, _ in networks]
+    probes += [network | ((1 << (width - prefix_len)) - 1) for network, prefix_len, _ in networks]
+    for address in probes:
+        assert trie.lookup(address) == brute_force(networks, width, address)
+    assert len(trie) == len({(network, prefix_len) for network, prefix_len, _ in networks})
+
+
+def test_empty_and_default_route():
+    trie = PrefixTrie(32)
+    assert trie.lookup(0x01020304) is None
+    trie.insert(0, 0, 'default')
+    trie.insert(0x0A000000, 8, 'ten')
+    assert trie.lookup(0x01020304) == 'default'
+    assert trie.lookup(0x0A010203) == 'ten'
+    assert len(trie) == 2
@@ -0,0 +1,51 @@
+import threading
+import time
+
+import pytest
+
+import rate_limiter
+from rate_limiter import TokenBucket
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Fake monotonic clock; sleeping advances it"""
+    now = [0.0]
+    lock = threading.Lock()
+
+    def sleep(seconds):
+        with lock:
+            now[0] += seconds
+
+    monkeypatch.setattr(rate_limiter.time, 'monotonic', lambda: now[0])
+    monkeypatch.setattr(rate_limiter.time, 'sleep', sleep)
+    return now
+
+
+def test_burst_then_steady_rate(clock):
+    bucket = TokenBucket(rate=60, period=60.0, capacity=3)
+    assert [bucket.acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.acquire() == pytest.approx(1.0)
+    assert bucket.acquire() == pytest.approx(1.0)
+
+
+def test_refills_up_to_capacity(clock):
+    bucket = TokenBucket(rate=60, period=60.0, capacity=2)
+    bucket.acquire()
+    bucket.acquire()
+    clock[0] += 100
+    assert [bucket.acquire() for _ in range(2)] == [0.0, 0.0]
+    assert bucket.acquire() > 0
+
+
+def test_concurrent_acquires_stay_within_the_rate():
+    # Real clock, fast bucket: 1 token up front, then 100 per second for the other 19 threads
+    bucket = TokenBucket(rate=100, period=1.0, capacity=1)
+    threads = [threading.Thread(target=bucket.acquire) for _ in range(20)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert time.monotonic() - started >= 0.18
+    assert bucket.tokens <= 0
@@ -0,0 +1,107 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import ip_resolver
+from disk_cache import DiskCache
+from http_client import HttpClient
+
+
+class StubProvider(BaseHTTPRequestHandler):
+    """ip-api.com stand-in: /batch answers in request order; 10.x has no org, a 9.9.9.9 batch fails"""
+
+    protocol_version = 'HTTP/1.1'
+    batches = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.batches.append(body)
+        if '9.9.9.9' in body:
+            payload, status = b'{}', 500
+        else:
+            payload, status = json.dumps([
+                {'status': 'fail', 'message': 'private range', 'query': ip} if ip.startswith('10.')
+                else {'status': 'success', 'org': f'Org {ip}', 'country': 'X', 'query': ip}
+                for ip in body
+            ]).encode(), 200
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubProvider)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    StubProvider.batches = []
+    monkeypatch.setattr(ip_resolver, 'IP_API_URL', f'http://127.0.0.1:{server.server_address[1]}')
+    client = HttpClient(retries=0)
+    yield client
+    client.close()
+    server.shutdown()
+    server.server_close()
+
+
+def test_deduplicates_and_batches(provider):
+    ips = [f'1.0.{i // 256}.{i % 256}' for i in range(250)]
+    results = ip_resolver.resolve_many(ips + ips[:50], client=provider, fallback=True)
+
+    assert [len(batch) for batch in StubProvider.batches] == [100, 100, 50]
+    assert sorted(ip for batch in StubProvider.batches for ip in batch) == sorted(ips)
+    assert len(results) == 300
+    assert [result['organization'] for result in results] == [f'Org {ip}' for ip in ips + ips[:50]]
+    # Each result is its own copy, even for repeated IPs
+    results[0]['organization'] = 'changed'
+    assert results[250]['organization'] == f'Org {ips[0]}'
+
+
+def test_partial_failures(provider, tmp_path):
+    cache = DiskCache(tmp_path / 'cache.sqlite3', table='ip_lookups', ttl=3600, negative_ttl=3600)
+    good = [f'2.0.0.{i}' for i in range(150)]
+    ips = good[:99] + ['10.0.0.1'] + good[99:] + ['9.9.9.9']
+    results = dict(zip(ips, ip_resolver.resolve_many(ips, cache=cache, client=provider, fallback=True)))
+
+    # The first batch succeeds (including a 'no company' answer); the second one errors as a whole
+    assert all(results[ip]['success'] for ip in good[:99])
+    assert results['10.0.0.1'] == {'success': False, 'error': ip_resolver.NO_COMPANY_ERROR}
+    assert all(results[ip]['error'].startswith('Error:') for ip in good[99:] + ['9.9.9.9'])
+
+    # Definitive answers are cached; the failed batch isn't, so it is asked again
+    StubProvider.batches = []
+    again = dict(zip(ips, ip_resolver.resolve_many(ips, cache=cache, client=provider, fallback=True)))
+    assert [len(batch) for batch in StubProvider.batches] == [52]
+    assert again[good[0]]['cached'] and again['10.0.0.1']['error'] == ip_resolver.NO_COMPANY_ERROR
+
+
+def test_local_answers_skip_the_provider(provider):
+    resolver = ip_resolver.LocalResolver()
+    resolver.add('3.0.0.0/8', {'organization': 'Local Org'})
+    results = ip_resolver.resolve_many(['3.1.2.3', '4.1.2.3'], resolver=resolver, client=provider, fallback=True)
+    assert results[0]['organization'] == 'Local Org' and results[0]['source'] == 'local'
+    assert results[1]['organization'] == 'Org 4.1.2.3'
+    assert StubProvider.batches == [['4.1.2.3']]
+
+
+class CountingLimiter:
+    def __init__(self):
+        self.acquired = 0
+
+    def acquire(self):
+        self.acquired += 1
+        return 0.0
+
+
+def test_takes_one_batch_token_per_request(provider):
+    resolver = ip_resolver.LocalResolver()
+    resolver.add('3.0.0.0/8', {'organization': 'Local Org'})
+    limiter = CountingLimiter()
+    ips = ['3.1.2.3'] + [f'5.0.0.{i}' for i in range(150)]
+    ip_resolver.resolve_many(ips, resolver=resolver, client=provider, limiter=limiter, fallback=True)
+    assert limiter.acquired == len(StubProvider.batches) == 2
@@ -0,0 +1,78 @@
+import ipaddress
+import os
+
+import pandas as pd
+import pytest
+
+from visitor_export import ExportFollower, _parse_ipv4, pack_ips, read_export_since, unpack_ips
+
+HEADER = 'ip_address,timestamp,page_visited,visitor_type\n'
+
+
+@pytest.mark.parametrize('text,value', [
+    ('1.2.3.4', 0x01020304),
+    ('0.0.0.0', 0),
+    ('255.255.255.255', 0xFFFFFFFF),
+    ('001.2.3.4', 0x01020304),
+    ('10.20.30.40', 0x0A141E28),
+])
+def test_parse_ipv4_valid(text, value):
+    values, valid = _parse_ipv4(pd.Series([text], dtype='str'))
+    assert valid[0] and int(values[0]) == value
+
+
+@pytest.mark.parametrize('text', [
+    '256.1.1.1', '1.2.3', '1.2.3.4.5', '1..2.3', '.1.2.3', '1.2.3.', '', ' 1.2.3.4', 'a.b.c.d',
+    '1234.1.1.1', '1.2.3.4/24', '::ffff:1.2.3.4', '1.2.3.4' + '0' * 20, None
+])
+def test_parse_ipv4_invalid(text):
+    _, valid = _parse_ipv4(pd.Series([text], dtype='str'))
+    assert not valid[0]
+
+
+def test_pack_round_trip():
+    ips = ['1.2.3.4', ' 8.8.8.8 ', '2001:db8::1', '::ffff:1.2.3.4', 'bogus', '300.1.1.1']
+    hi, lo, valid = pack_ips(ips)
+    assert valid.tolist() == [True, True, True, True, False, False]
+    assert unpack_ips(hi[valid], lo[valid]) == ['1.2.3.4', '8.8.8.8', '2001:db8::1', '1.2.3.4']
+    assert (int(hi[2]) << 64 | int(lo[2])) == int(ipaddress.IPv6Address('2001:db8::1'))
+
+
+def test_read_export_since_resumes(tmp_path):
+    path = tmp_path / 'export.csv'
+    first_row = '1.1.1.1,2025-10-10 10:00:00,/a,One\n'
+    path.write_text(HEADER + first_row + '2.2.2.2,2025-10-10 10:00:01,/b,Two')
+    chunks = list(read_export_since(path))
+    assert [(len(chunk), position) for chunk, position, _ in chunks] == [(1, len(HEADER + first_row)), (1, None)]
+    position, identity = chunks[0][1], chunks[0][2]
+
+    with open(path, 'a') as f:
+        f.write('\n3.3.3.3,2025-10-10 10:00:02,/c,Three\n')
+    chunks = list(read_export_since(path, position, identity))
+    assert [chunk['visitor_type'].tolist() for chunk, _, _ in chunks] == [['Two', 'Three']]
+    assert chunks[0][1] == path.stat().st_size
+
+    # A file replacing it (written aside, then renamed over it) is read from the start
+    replacement = tmp_path / 'export.csv.tmp'
+    replacement.write_text(HEADER + '4.4.4.4,2025-10-10 10:00:03,/d,Four\n')
+    os.replace(replacement, path)
+    chunks = list(read_export_since(path, position, identity))
+    assert [chunk['visitor_type'].tolist() for chunk, _, _ in chunks] == [['Four']]
+
+
+def test_follower_appends_only_new_rows(tmp_path):
+    path = tmp_path / 'export.csv'
+    path.write_text(HEADER + '1.1.1.1,2025-10-10 10:00:00,/a,One\n')
+    follower = ExportFollower(path)
+    assert follower.refresh() == 1 and follower.refresh() == 0
+    version = follower.version
+
+    with open(path, 'a') as f:
+        f.write('2.2.2.2,2025-10-10 10:00:01,/b,Two\n')
+    assert follower.refresh() == 1
+    assert follower.version > version
+    assert follower.frame['visitor_type'].tolist() == ['One', 'Two']
+
+    path.write_text(HEADER + '3.3.3.3,2025-10-10 10:00:02,/c,Three\n')  # Truncated and rewritten
+    assert follower.refresh() == 1
+    assert follower.frame['visitor_type'].tolist() == ['Three']
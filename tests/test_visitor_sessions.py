@@ -0,0 +1,68 @@
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from visitor_export import unpack_ips
+from visitor_sessions import SERVICE_LINES, hits_frame, sessionize
+
+PAGES = ['/', '/about', '/contact'] + list(SERVICE_LINES)
+
+
+def random_hits(seed, count=600):
+    rng = random.Random(seed)
+    ips = [f'10.0.0.{i}' for i in range(12)] + ['2001:db8::1']
+    start = pd.Timestamp('2025-10-10 08:00:00')
+    return [
+        (rng.choice(ips), (start + pd.Timedelta(seconds=rng.randint(0, 6 * 3600))).strftime('%Y-%m-%d %H:%M:%S'),
+         rng.choice(PAGES), 200, rng.choice(['UA1', 'UA2']))
+        for _ in range(count)
+    ]
+
+
+def naive_sessions(hits, gap, by_user_agent):
+    """Group hits per (IP, agent) in time order, starting a visit after more than gap seconds"""
+    groups = {}
+    for ip, time, page, _status, agent in hits:
+        groups.setdefault((ip, agent if by_user_agent else None), []).append((pd.Timestamp(time), page))
+    visits = set()
+    for (ip, agent), group in groups.items():
+        group.sort(key=lambda hit: hit[0])
+        current = [group[0]]
+        for hit in group[1:] + [None]:
+            if hit is not None and (hit[0] - current[-1][0]).total_seconds() <= gap:
+                current.append(hit)
+                continue
+            service = next((SERVICE_LINES[page] for _, page in current if page in SERVICE_LINES), None)
+            visits.add((
+                ip, agent, current[0][0], current[-1][0], len(current), current[0][1], current[-1][1], service
+            ))
+            current = [hit]
+    return visits
+
+
+@pytest.mark.parametrize('gap,by_user_agent', [(1800, False), (300, False), (600, True)])
+def test_matches_naive_grouping(gap, by_user_agent):
+    hits = random_hits(gap)
+    visits = sessionize(hits_frame(hits), gap=gap, by_user_agent=by_user_agent)
+
+    ips = unpack_ips(visits['ip_hi'], visits['ip_lo'])
+    agents = visits['user_agent'].astype(object) if by_user_agent else [None] * len(visits)
+    services = [None if pd.isna(line) else line for line in visits['service_line'].astype(object)]
+    got = set(zip(
+        ips, agents, visits['timestamp'], visits['end'], visits['pages'],
+        visits['page_visited'].astype(object), visits['exit_page'].astype(object), services
+    ))
+    assert got == naive_sessions(hits, gap, by_user_agent)
+    assert len(got) == len(visits)
+    assert (visits['duration'].to_numpy() == (visits['end'] - visits['timestamp']).dt.total_seconds().to_numpy()).all()
+
+
+def test_empty_and_invalid_hits():
+    assert len(sessionize(hits_frame([]))) == 0
+    visits = sessionize(hits_frame([('not-an-ip', '2025-10-10 08:00:00', '/', 200, 'UA'),
+                                    ('1.2.3.4', 'bad time', '/', 200, 'UA'),
+                                    ('1.2.3.4', '2025-10-10 08:00:00', '/', 200, 'UA')]))
+    assert len(visits) == 1
+    assert visits['pages'].tolist() == [1] and np.isnat(visits['end'].to_numpy()).sum() == 0
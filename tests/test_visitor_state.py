@@ -0,0 +1,113 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import visitor_state
+from visitor_sessions import hits_frame, sessionize
+
+GAP = 1800
+
+
+def line(ip, when):
+    return f'{ip} - - [10/Oct/2025:{when} +0000] "GET /services HTTP/1.1" 200 1 "-" "UA"\n'
+
+
+@pytest.fixture
+def state(tmp_path):
+    state = visitor_state.VisitorState(tmp_path / 'state.sqlite3')
+    yield state
+    state.close()
+
+
+def visitors(state):
+    return {ip: visits for ip, visits in state._conn.execute('SELECT ip, visits FROM visitor_state')}
+
+
+def test_same_second_visits_from_other_ips_are_kept(state):
+    visits = sessionize(hits_frame([('1.1.1.1', '2025-10-10 10:00:05', '/', 200, 'UA')]), GAP)
+    assert state.ingest('log', visits, position=10, gap=GAP) == 1
+    visits = sessionize(hits_frame([('2.2.2.2', '2025-10-10 10:00:05', '/', 200, 'UA'),
+                                    ('1.1.1.1', '2025-10-10 10:00:05', '/', 200, 'UA')]), GAP)
+    assert state.ingest('log', visits, position=20, gap=GAP) == 1
+    assert visitors(state) == {'1.1.1.1': 1, '2.2.2.2': 1}
+    assert state.watermark('log')[1:] == (20, None)
+
+
+def test_visit_split_across_reads_counts_once(state):
+    first = sessionize(hits_frame([('1.1.1.1', '2025-10-10 10:00:00', '/', 200, 'UA')]), GAP)
+    later = sessionize(hits_frame([('1.1.1.1', '2025-10-10 10:20:00', '/', 200, 'UA'),
+                                   ('1.1.1.1', '2025-10-10 12:00:00', '/', 200, 'UA')]), GAP)
+    state.ingest('log', first, gap=GAP)
+    assert state.ingest('log', later, gap=GAP) == 1  # 10:20 continues the first visit, 12:00 starts one
+    assert visitors(state) == {'1.1.1.1': 2}
+    assert state._conn.execute('SELECT last_seen FROM visitor_state').fetchone() == ('2025-10-10 12:00:00',)
+
+
+def test_ingest_log_reads_only_what_was_appended(state, tmp_path, monkeypatch):
+    path = tmp_path / 'access.log'
+    path.write_text(line('1.1.1.1', '10:00:00') + line('2.2.2.2', '10:00:05'))
+    assert visitor_state.ingest_log(state, str(path), gap=GAP) == 2
+    assert state.watermark(str(path))[1:] == (path.stat().st_size, path.stat().st_ino)
+
+    with open(path, 'a') as f:
+        f.write(line('3.3.3.3', '10:00:05') + '4.4.4.4 - - [10/Oct/2025')
+    parsed = []
+    original = visitor_state.visitor_sessions.hits_frame
+
+    def recording_hits_frame(hits):
+        parsed.append(list(hits))
+        return original(parsed[-1])
+
+    monkeypatch.setattr(visitor_state.visitor_sessions, 'hits_frame', recording_hits_frame)
+    assert visitor_state.ingest_log(state, str(path), gap=GAP) == 1
+    assert [hit[0] for batch in parsed for hit in batch] == ['3.3.3.3']
+
+    with open(path, 'a') as f:
+        f.write(':11:00:00 +0000] "GET / HTTP/1.1" 200 1 "-" "UA"\n')
+    assert visitor_state.ingest_log(state, str(path), gap=GAP) == 1
+    assert visitor_state.ingest_log(state, str(path), gap=GAP) == 0
+
+    # After rotation the new file is read from the start; visits already recorded aren't counted again
+    path.rename(tmp_path / 'access.log.1')
+    path.write_text(line('2.2.2.2', '10:00:05') + line('5.5.5.5', '12:00:00'))
+    assert visitor_state.ingest_log(state, str(path), gap=GAP) == 1
+    assert visitors(state) == {ip: 1 for ip in ['1.1.1.1', '2.2.2.2', '3.3.3.3', '4.4.4.4', '5.5.5.5']}
+
+
+def test_ingest_export_waits_for_the_last_row_to_end(state, tmp_path):
+    path = tmp_path / 'export.csv'
+    path.write_text('ip_address,timestamp,page_visited,visitor_type\n'
+                    '8.8.8.8,2025-10-10 10:00:00,/a,Google\n9.9.9.9,2025-10-10 10:00:00,/a,Quad')
+    assert visitor_state.ingest_export(state, str(path), gap=GAP) == 2
+    position = state.watermark(str(path))[1]
+    assert visitor_state.ingest_export(state, str(path), gap=GAP) == 0
+    assert state.watermark(str(path))[1] == position
+
+    with open(path, 'a') as f:
+        f.write('\n7.7.7.7,2025-10-10 10:00:00,/a,Seven\n')
+    assert visitor_state.ingest_export(state, str(path), gap=GAP) == 1
+    assert state.watermark(str(path))[1] == path.stat().st_size
+
+
+def test_ingest_skipped_once_another_worker_moved_the_watermark(state, tmp_path):
+    other = visitor_state.VisitorState(tmp_path / 'state.sqlite3')
+    visits = sessionize(hits_frame([('1.1.1.1', '2025-10-10 10:00:00', '/', 200, 'UA')]), GAP)
+    since = state.watermark('log')[1:]
+    assert other.ingest('log', visits, position=10, gap=GAP, since=since) == 1
+    assert state.ingest('log', visits, position=10, gap=GAP, since=since) is None
+    assert visitors(state) == {'1.1.1.1': 1}
+    other.close()
+
+
+def test_concurrent_workers_record_each_visit_once(tmp_path):
+    path = tmp_path / 'access.log'
+    path.write_text(''.join(
+        line(f'10.0.{i // 250}.{i % 250}', f'10:{i // 60 % 60:02d}:{i % 60:02d}') for i in range(3000)
+    ))
+    workers = [visitor_state.VisitorState(tmp_path / 'state.sqlite3') for _ in range(4)]
+    with ThreadPoolExecutor(len(workers)) as pool:
+        added = list(pool.map(lambda worker: visitor_state.ingest_log(worker, str(path), gap=GAP), workers))
+    assert sum(added) == 3000
+    assert set(visitors(workers[0]).values()) == {1}
+    for worker in workers:
+        worker.close()
@@ -0,0 +1,263 @@
+# visitor_export.py - Chunked, Typed Loader for Visitor CSV Exports
+import io
+import ipaddress
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Configuration (override with environment variables)
+VISITOR_CSV_PATH = os.environ.get('VISITOR_CSV_PATH', str(Path(__file__).parent / 'bhworldwide_relevant_ips.csv'))
+CSV_BLOCK_BYTES = 32 << 20  # appended rows parsed per block by read_export_since
+
+# ip_address,timestamp,page_visited,visitor_type; visitor_type holds the visiting organization
+CSV_DTYPES = {'ip_address': 'str', 'timestamp': 'str', 'page_visited': 'category', 'visitor_type': 'category'}
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# IPs are packed into two uint64 halves of the 128-bit address; IPv4 uses the
+# IPv4-mapped range (::ffff:a.b.c.d), so ip_hi is the same for all of them
+IPV4_MAPPED_HI = np.uint64(0)
+IPV4_MAPPED_LO = np.uint64(0xFFFF << 32)
+
+
+def _parse_ipv4(ips):
+    """Parse dotted quads column by column over a fixed-width code point matrix
+
+    Returns (values, valid); a 16-step vectorized scan instead of a Python
+    call per address.
+    """
+    n = len(ips)
+    chars = np.asarray(ips.to_numpy(dtype=object, na_value=''), dtype='U16').view(np.uint32).reshape(n, 16)
+    columns = chars.T.astype(np.int32) - 48  # One contiguous row per character position; digits become 0-9
+    value = np.zeros(n, dtype=np.uint32)
+    octet = np.zeros(n, dtype=np.int32)
+    digits = np.zeros(n, dtype=np.int8)
+    dots = np.zeros(n, dtype=np.int8)
+    ended = np.zeros(n, dtype=bool)
+    bad = np.zeros(n, dtype=bool)
+
+    for digit in columns:
+        is_digit = (digit >= 0) & (digit <= 9)
+        is_dot = digit == ord('.') - 48
+        is_nul = digit == -48
+        is_end = is_nul & ~ended
+        bad |= ~(is_digit | is_dot | is_nul)
+        np.copyto(octet, octet * 10 + digit, where=is_digit)
+        digits += is_digit
+
+        # An octet closes at a dot or at the end of the string
+        closes = is_dot | is_end
+        bad |= closes & ((digits == 0) | (digits > 3) | (octet > 255))
+        np.copyto(value, (value << 8) | octet.astype(np.uint32), where=closes)
+        octet[closes] = 0
+        digits[closes] = 0
+        dots += is_dot
+        ended |= is_end
+
+    return value.astype(np.uint64), ~bad & ended & (dots == 3)
+
+
+def pack_ips(ips):
+    """Pack IP strings into (ip_hi, ip_lo, valid) uint64/bool arrays
+
+    IPv4 addresses are parsed vectorized; the (rare) IPv6 ones go through
+    ipaddress. Invalid addresses come back with valid=False.
+    """
+    ips = pd.Series(ips, dtype='str').str.strip()
+    hi = np.full(len(ips), IPV4_MAPPED_HI, dtype=np.uint64)
+    lo, valid = _parse_ipv4(ips)
+    lo |= IPV4_MAPPED_LO
+
+    for i in np.flatnonzero(~valid & ips.str.contains(':', regex=False).fillna(False).to_numpy()):
+        try:
+            address = int(ipaddress.IPv6Address(ips.iat[i]))
+        except ValueError:
+            continue
+        hi[i], lo[i], valid[i] = address >> 64, address & 0xFFFFFFFFFFFFFFFF, True
+    return hi, lo, valid
+
+
+def unpack_ip(hi, lo):
+    """Format one packed address back into its string form"""
+    hi, lo = int(hi), int(lo)
+    if hi == IPV4_MAPPED_HI and lo >> 32 == 0xFFFF:
+        return str(ipaddress.IPv4Address(lo & 0xFFFFFFFF))
+    return str(ipaddress.IPv6Address(hi << 64 | lo))
+
+
+def unpack_ips(hi, lo):
+    """Format packed addresses back into strings (IPv4 vectorized)"""
+    hi, lo = np.asarray(hi, dtype=np.uint64), np.asarray(lo, dtype=np.uint64)
+    is_v4 = (hi == IPV4_MAPPED_HI) & (lo >> np.uint64(32) == np.uint64(0xFFFF))
+    octets = [pd.Series((lo[is_v4] >> np.uint64(shift)) & np.uint64(255)).astype('str') for shift in (24, 16, 8, 0)]
+    ips = np.empty(len(hi), dtype=object)
+    ips[is_v4] = (octets[0] + '.' + octets[1] + '.' + octets[2] + '.' + octets[3]).to_numpy(dtype=object)
+    for i in np.flatnonzero(~is_v4):
+        ips[i] = unpack_ip(hi[i], lo[i])
+    return ips.tolist()
+
+
+def format_timestamps(timestamps):
+    """Format datetime64 values as TIMESTAMP_FORMAT strings, vectorized"""
+    return np.char.replace(np.datetime_as_string(np.asarray(timestamps).astype('datetime64[s]')), 'T', ' ').tolist()
+
+
+def network_range(network):
+    """Packed (hi, lo) bounds of a CIDR/IP string, or None if it isn't one"""
+    try:
+        net = ipaddress.ip_network(network.strip(), strict=False)
+    except ValueError:
+        return None
+    first, last = int(net.network_address), int(net.broadcast_address)
+    if net.version == 4:
+        first, last = first | 0xFFFF << 32, last | 0xFFFF << 32
+    return (first >> 64, first & 0xFFFFFFFFFFFFFFFF), (last >> 64, last & 0xFFFFFFFFFFFFFFFF)
+
+
+def _typed_chunk(chunk):
+    hi, lo, valid = pack_ips(chunk['ip_address'])
+    frame = pd.DataFrame({
+        'ip_hi': hi,
+        'ip_lo': lo,
+        'timestamp': pd.to_datetime(chunk['timestamp'], format=TIMESTAMP_FORMAT, errors='coerce').to_numpy(),
+        'page_visited': chunk['page_visited'].array,
+        'visitor_type': chunk['visitor_type'].array
+    })
+    return frame[valid & frame['timestamp'].notna().to_numpy()]
+
+
+def _concat_categorical(columns):
+    """Concatenate categorical columns from different chunks onto one shared category set"""
+    categories = pd.Index(
+        np.unique(np.concatenate([np.asarray(column.cat.categories, dtype=object) for column in columns])), dtype='str'
+    )
+    codes = [column.cat.set_categories(categories).cat.codes.to_numpy() for column in columns]
+    return pd.Categorical.from_codes(np.concatenate(codes), categories=categories)
+
+
+def _empty_frame():
+    return _typed_chunk(pd.DataFrame({column: pd.Series(dtype=dtype) for column, dtype in CSV_DTYPES.items()}))
+
+
+def _concat_chunks(chunks):
+    """One typed frame from typed chunks, with their categories unified"""
+    if not chunks:
+        return _empty_frame()
+    return pd.DataFrame({
+        'ip_hi': np.concatenate([chunk['ip_hi'].to_numpy() for chunk in chunks]),
+        'ip_lo': np.concatenate([chunk['ip_lo'].to_numpy() for chunk in chunks]),
+        'timestamp': np.concatenate([chunk['timestamp'].to_numpy() for chunk in chunks]),
+        'page_visited': _concat_categorical([chunk['page_visited'] for chunk in chunks]),
+        'visitor_type': _concat_categorical([chunk['visitor_type'] for chunk in chunks])
+    })
+
+
+def read_export_since(path, position=0, identity=None, block_bytes=CSV_BLOCK_BYTES):
+    """Yield (typed chunk, position, identity) for the complete rows appended after byte position
+
+    identity is the inode of the file position was read from; if the path
+    now names another file, or one shorter than position, it was replaced
+    and is read from the start. Each chunk comes with the byte offset just
+    past its last row, where the next read resumes. A last row without a
+    newline comes last with position None: it's read again (completed)
+    next time.
+    """
+    with open(path, 'rb') as f:
+        stat = os.fstat(f.fileno())
+        header = f.readline()
+        if not header.endswith(b'\n'):
+            return
+        names = [name.strip() for name in header.decode('utf-8-sig').split(',')]
+        if identity != stat.st_ino or not len(header) <= position <= stat.st_size:
+            position = len(header)
+        f.seek(position)
+
+        def parse(lines):
+            return _typed_chunk(pd.read_csv(
+                io.BytesIO(lines), header=None, names=names, usecols=list(CSV_DTYPES), dtype=CSV_DTYPES
+            ))
+
+        partial = b''
+        while True:
+            block = f.read(block_bytes)
+            if not block:
+                break
+            block = partial + block
+            end = block.rfind(b'\n') + 1
+            partial = block[end:]
+            if end:
+                position += end
+                yield parse(block[:end]), position, stat.st_ino
+        if partial.strip():
+            yield parse(partial), None, stat.st_ino
+
+
+class ExportFollower:
+    """Typed rows of a visitor export, extended with only the rows appended since the last refresh
+
+    A replaced (new inode) or truncated export is read again from the start.
+    A last row without a newline is shown but kept apart, and re-read until
+    it's terminated. version increases whenever the rows change, for
+    caching what's derived from them.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.frame = _empty_frame()
+        self.position = 0
+        self.identity = None
+        self.version = 0
+        self._rows = self.frame  # Complete rows up to position
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Read the rows appended since the previous call; returns how many arrived"""
+        with self._lock:
+            stat = os.stat(self.path)
+            if (stat.st_ino, stat.st_size) == (self.identity, self._size):
+                return 0
+            before = len(self.frame)
+            if stat.st_ino != self.identity or stat.st_size < self.position:
+                self._rows, self.position, self.identity, before = _empty_frame(), 0, stat.st_ino, 0
+
+            chunks, tail = [], None
+            for chunk, position, identity in read_export_since(self.path, self.position, self.identity):
+                if identity != self.identity:  # Replaced between the stat above and the read
+                    chunks, self._rows, self.identity, before = [], _empty_frame(), identity, 0
+                if position is None:
+                    tail = chunk
+                else:
+                    chunks.append(chunk)
+                    self.position = position
+            if chunks:
+                self._rows = _concat_chunks([self._rows] + chunks)
+            self.frame = _concat_chunks([self._rows, tail]) if tail is not None else self._rows
+            self._size = stat.st_size
+            self.version += 1
+            return max(len(self.frame) - before, 0)
+
+
+def filter_visitors(frame, query):
+    """Rows whose IP falls in a network/IP query, or whose organization contains the text
+
+    Both tests run on the packed columns: integer range compares for
+    networks, and a substring match over the (few) distinct organizations.
+    """
+    query = (query or '').strip()
+    if not query:
+        return frame
+
+    bounds = network_range(query)
+    if bounds is not None:
+        (first_hi, first_lo), (last_hi, last_lo) = bounds
+        hi, lo = frame['ip_hi'].to_numpy(), frame['ip_lo'].to_numpy()
+        above = (hi > first_hi) | ((hi == first_hi) & (lo >= np.uint64(first_lo)))
+        below = (hi < last_hi) | ((hi == last_hi) & (lo <= np.uint64(last_lo)))
+        return frame[above & below]
+
+    organizations = frame['visitor_type'].cat.categories
+    matches = organizations[organizations.str.contains(query, case=False, regex=False)]
+    return frame[frame['visitor_type'].isin(matches)]
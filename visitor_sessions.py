@@ -0,0 +1,148 @@
+# visitor_sessions.py - Vectorized Sessionization of Page Hits into Visits
+import os
+
+import numpy as np
+import pandas as pd
+
+import visitor_export
+
+# Configuration (override with environment variables)
+VISITOR_SESSION_GAP = int(os.environ.get('VISITOR_SESSION_GAP', 30 * 60))  # seconds of inactivity that end a visit
+VISITOR_SESSION_BY_USER_AGENT = os.environ.get('VISITOR_SESSION_BY_USER_AGENT', '0') == '1'
+VISITOR_LOG_MAX_ROWS = int(os.environ.get('VISITOR_LOG_MAX_ROWS', 1000))
+
+# Landing page -> B&H Worldwide service line
+SERVICE_LINES = {
+    '/aog-services': 'AOG Services',
+    '/dangerous-goods': 'Dangerous Goods',
+    '/trade-compliance': 'Trade Compliance',
+    '/our-delivery': 'Delivery',
+    '/expertise': 'Expertise',
+    '/working-with-us': 'Partnerships',
+    '/services': 'Services'
+}
+
+VISITOR_COLUMNS = [
+    'timestamp', 'ip', 'organization', 'page_visited', 'country',
+    'session_duration', 'pages_viewed', 'lead_potential', 'status'
+]
+
+
+def hits_frame(hits):
+    """Typed hits frame (same columns as a visitor export, plus user_agent) from access log hit tuples"""
+    hits = list(hits)
+    ips, times, pages, _statuses, agents = zip(*hits) if hits else ([], [], [], [], [])
+    ip_hi, ip_lo, valid = visitor_export.pack_ips(pd.Series(ips, dtype='str'))
+    frame = pd.DataFrame({
+        'ip_hi': ip_hi,
+        'ip_lo': ip_lo,
+        'timestamp': pd.to_datetime(
+            pd.Series(times, dtype='str'), format=visitor_export.TIMESTAMP_FORMAT, errors='coerce'
+        ).to_numpy(),
+        'page_visited': pd.Categorical(pages),
+        'visitor_type': pd.Categorical([None] * len(hits), categories=pd.Index([], dtype='str')),
+        'user_agent': pd.Categorical(agents)
+    })
+    return frame[valid & frame['timestamp'].notna().to_numpy()]
+
+
+def sessionize(hits, gap=VISITOR_SESSION_GAP, by_user_agent=VISITOR_SESSION_BY_USER_AGENT):
+    """Group hits into visits: same IP (and user agent) with no gap longer than gap seconds
+
+    hits needs ip_hi, ip_lo, timestamp and categorical page_visited and
+    visitor_type columns (user_agent is optional). Returns one row per visit
+    with the same key columns, timestamp/end (first and last hit),
+    duration (seconds), pages, page_visited/exit_page (entry and exit page)
+    and service_line (first service page of the visit). Everything runs on
+    sorted arrays: one lexsort, then per-visit reductions at the boundaries.
+    """
+    n = len(hits)
+    ip_hi = hits['ip_hi'].to_numpy()
+    ip_lo = hits['ip_lo'].to_numpy()
+    seconds = hits['timestamp'].to_numpy().astype('datetime64[s]').astype(np.int64)
+    by_user_agent = by_user_agent and 'user_agent' in hits
+    agents = hits['user_agent'].cat.codes.to_numpy() if by_user_agent else np.zeros(n, dtype=np.int8)
+
+    order = np.lexsort((seconds, agents, ip_lo, ip_hi))
+    ip_hi, ip_lo, agents, seconds = ip_hi[order], ip_lo[order], agents[order], seconds[order]
+    times = hits['timestamp'].to_numpy()[order]
+
+    # A visit starts at a new IP/agent or after more than gap seconds of inactivity
+    starts_visit = np.ones(n, dtype=bool)
+    starts_visit[1:] = (
+        (ip_hi[1:] != ip_hi[:-1]) | (ip_lo[1:] != ip_lo[:-1]) | (agents[1:] != agents[:-1])
+        | (seconds[1:] - seconds[:-1] > gap)
+    )
+    starts = np.flatnonzero(starts_visit)
+    ends = np.append(starts[1:], n) - 1 if n else starts
+
+    pages = hits['page_visited'].cat
+    page_codes = pages.codes.to_numpy()[order]
+
+    # Service line of every page category, then the first service page hit of each visit
+    line_names = pd.Index(sorted(set(SERVICE_LINES.values())), dtype='str')
+    line_of_category = np.append(line_names.get_indexer([SERVICE_LINES.get(page) for page in pages.categories]), -1)
+    hit_lines = np.append(line_of_category[page_codes], -1)  # Page code -1 (missing) and index n map to no line
+    first_service = np.minimum.reduceat(np.where(hit_lines[:n] >= 0, np.arange(n), n), starts) if n else starts
+    service_codes = hit_lines[first_service]
+
+    visits = pd.DataFrame({
+        'ip_hi': ip_hi[starts],
+        'ip_lo': ip_lo[starts],
+        'timestamp': times[starts],
+        'end': times[ends],
+        'duration': (seconds[ends] - seconds[starts]).astype(np.int32),
+        'pages': (ends - starts + 1).astype(np.int32),
+        'page_visited': pd.Categorical.from_codes(page_codes[starts], dtype=hits['page_visited'].dtype),
+        'exit_page': pd.Categorical.from_codes(page_codes[ends], dtype=hits['page_visited'].dtype),
+        'service_line': pd.Categorical.from_codes(service_codes, categories=line_names),
+        'visitor_type': pd.Categorical.from_codes(
+            hits['visitor_type'].cat.codes.to_numpy()[order][starts], dtype=hits['visitor_type'].dtype
+        )
+    })
+    if by_user_agent:
+        visits['user_agent'] = pd.Categorical.from_codes(agents[starts], dtype=hits['user_agent'].dtype)
+    return visits
+
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes}:{seconds:02d}"
+
+
+def lead_potential(organization, service_line):
+    """High for known organizations that looked at a service, Medium for other known ones"""
+    if organization is None:
+        return 'Low'
+    return 'High' if service_line else 'Medium'
+
+
+def visitor_rows(visits, lookup=None, max_rows=VISITOR_LOG_MAX_ROWS):
+    """Rows for the visitor log table: the most recent max_rows visits, newest first
+
+    Strings are only materialized for the rows shown. lookup(ip) -> record
+    or None (e.g. LocalResolver.lookup) fills in the country, and the
+    organization when the source didn't name one.
+    """
+    rows = []
+    recent = visits.nlargest(max_rows, 'timestamp')
+    for hi, lo, timestamp, page, organization, duration, pages, service_line in zip(
+        recent['ip_hi'].to_numpy(), recent['ip_lo'].to_numpy(), recent['timestamp'], recent['page_visited'],
+        recent['visitor_type'], recent['duration'].to_numpy(), recent['pages'].to_numpy(), recent['service_line']
+    ):
+        ip = visitor_export.unpack_ip(hi, lo)
+        record = lookup(ip) if lookup is not None else None
+        if pd.isna(organization):
+            organization = record.get('organization') if record else None
+        rows.append({
+            'timestamp': timestamp.strftime(visitor_export.TIMESTAMP_FORMAT),
+            'ip': ip,
+            'organization': organization or 'Unknown',
+            'page_visited': page if not pd.isna(page) else '/',
+            'country': record.get('country', 'Unknown') if record else 'Unknown',
+            'session_duration': format_duration(duration),
+            'pages_viewed': int(pages),
+            'lead_potential': lead_potential(organization, None if pd.isna(service_line) else service_line),
+            'status': 'New'
+        })
+    return rows
@@ -0,0 +1,311 @@
+# visitor_state.py - Persisted Visitor Processing State and High-Water Marks
+import io
+import itertools
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import access_log
+import visitor_export
+import visitor_sessions
+from ip_resolver import IP_CACHE_PATH
+from visitor_export import TIMESTAMP_FORMAT, format_timestamps, unpack_ips
+from visitor_sessions import VISITOR_SESSION_GAP
+
+# Configuration (override with environment variables)
+VISITOR_STATE_PATH = os.environ.get('VISITOR_STATE_PATH', IP_CACHE_PATH)
+VISITOR_ENRICHMENT_TTL = int(os.environ.get('VISITOR_ENRICHMENT_TTL', 7 * 24 * 3600))
+VISITOR_ENRICH_BATCH = int(os.environ.get('VISITOR_ENRICH_BATCH', 100))  # pending visitors enriched per run
+INGEST_BATCH_HITS = 1000000  # hits sessionized per batch when a compressed log is read whole
+
+
+class VisitorState:
+    """Which visitors have been ingested and enriched, shared by all workers
+
+    watermarks holds, per source (log or export path), the byte position
+    read up to and the identity (inode) of the file it belongs to, so each
+    run parses only what was appended since. visitor_state holds one row
+    per IP with the end of its latest visit and when it was last enriched.
+    A visitor is pending (status 'New') until enriched, and again once that
+    enrichment is older than ttl; enriched visitors are 'Analyzed', or
+    'Processed' when the enrichment found no company.
+    """
+
+    def __init__(self, path, ttl=VISITOR_ENRICHMENT_TTL):
+        self.path = str(path)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS watermarks (
+                source TEXT PRIMARY KEY,
+                last_seen TEXT NOT NULL,
+                position INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL,
+                identity INTEGER
+            )
+        ''')
+        if 'identity' not in [column[1] for column in self._conn.execute('PRAGMA table_info(watermarks)')]:
+            self._conn.execute('ALTER TABLE watermarks ADD COLUMN identity INTEGER')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS visitor_state (
+                ip TEXT PRIMARY KEY,
+                organization TEXT,
+                first_seen TEXT NOT NULL,
+                last_seen TEXT NOT NULL,
+                visits INTEGER NOT NULL,
+                enriched_at REAL,
+                error TEXT
+            )
+        ''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS visitor_state_enriched ON visitor_state (enriched_at)')
+
+    def watermark(self, source):
+        """(last_seen timestamp string or None, position, identity) for a source"""
+        with self._lock:
+            return self._watermark(source)
+
+    def _watermark(self, source):
+        row = self._conn.execute(
+            'SELECT last_seen, position, identity FROM watermarks WHERE source = ?', (source,)
+        ).fetchone()
+        return (row[0] or None, row[1], row[2]) if row else (None, 0, None)
+
+    def _last_seen(self, ips):
+        """Stored end of the latest visit of each known IP (call with the lock held)"""
+        last_seen = {}
+        for start in range(0, len(ips), 500):  # Stay under SQLite's bound parameter limit
+            batch = ips[start:start + 500]
+            last_seen.update(self._conn.execute(
+                f"SELECT ip, last_seen FROM visitor_state WHERE ip IN ({','.join('?' * len(batch))})", batch
+            ))
+        return last_seen
+
+    def _new_rows(self, visits, gap):
+        """(visitor_state rows, new visit count, newest end) for visits not already recorded"""
+        if visits is None or not len(visits):
+            return [], 0, ''
+        codes, keys = pd.MultiIndex.from_arrays([visits['ip_hi'].to_numpy(), visits['ip_lo'].to_numpy()]).factorize()
+        ips = unpack_ips(keys.get_level_values(0), keys.get_level_values(1))
+        known = self._last_seen(ips)
+        recorded = pd.to_datetime(
+            pd.Series([known.get(ip) for ip in ips], dtype=object), format=TIMESTAMP_FORMAT
+        ).to_numpy()[codes]
+        starts, ends = visits['timestamp'].to_numpy(), visits['end'].to_numpy()
+        unknown = np.isnat(recorded)
+        keep = unknown | (ends > recorded)
+        counted = keep & (unknown | (starts > recorded + np.timedelta64(gap, 's')))
+        newest = format_timestamps([ends.max()])[0]
+        if not keep.any():
+            return [], 0, newest
+
+        per_ip = pd.DataFrame({
+            'code': codes, 'start': starts, 'end': ends, 'new': counted,
+            'organization': visits['visitor_type'].array
+        })[keep].groupby('code', sort=False).agg(
+            first_seen=('start', 'min'), last_seen=('end', 'max'), visits=('new', 'sum'),
+            organization=('organization', 'first')
+        )
+        organizations = per_ip['organization'].astype(object).to_numpy()
+        rows = list(zip(
+            [ips[code] for code in per_ip.index],
+            [organization if isinstance(organization, str) else None for organization in organizations],
+            format_timestamps(per_ip['first_seen']),
+            format_timestamps(per_ip['last_seen']),
+            per_ip['visits'].tolist()
+        ))
+        return rows, int(counted.sum()), newest
+
+    def ingest(self, source, visits, position=0, identity=None, gap=VISITOR_SESSION_GAP, since=None):
+        """Record visits read from a source up to position and advance its watermark
+
+        visits is a sessionized frame (visitor_sessions.sessionize), or None
+        to only move the watermark. Visits are deduplicated per IP against
+        the end of its latest recorded visit: ones ending by then were
+        already recorded (the source was re-read, e.g. after rotation), and
+        one starting within gap seconds of it continues that visit across
+        two reads, so it extends it without counting again.
+
+        since is the (position, identity) the visits were read from. The
+        watermark check, dedupe and writes all happen in one write
+        transaction, and if the stored watermark has moved from since,
+        another worker recorded these visits first and nothing is written.
+        Returns how many visits were new, or None when skipped.
+        """
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                if since is not None and self._watermark(source)[1:] != tuple(since):
+                    self._conn.execute('ROLLBACK')
+                    return None
+                rows, new, newest = self._new_rows(visits, gap)
+                self._conn.executemany('''
+                    INSERT INTO visitor_state (ip, organization, first_seen, last_seen, visits)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (ip) DO UPDATE SET
+                        organization = COALESCE(excluded.organization, organization),
+                        last_seen = MAX(last_seen, excluded.last_seen),
+                        visits = visits + excluded.visits
+                ''', rows)
+                self._conn.execute('''
+                    INSERT INTO watermarks (source, last_seen, position, identity, updated_at) VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (source) DO UPDATE SET
+                        last_seen = MAX(last_seen, excluded.last_seen), position = excluded.position,
+                        identity = excluded.identity, updated_at = excluded.updated_at
+                ''', (source, newest, position, identity, time.time()))
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        return new
+
+    def _pending_where(self):
+        return 'enriched_at IS NULL OR enriched_at < ?', (time.time() - self.ttl,)
+
+    def pending(self, limit=VISITOR_ENRICH_BATCH):
+        """Visitors to enrich this run (never enriched, or expired), most recent first"""
+        where, params = self._pending_where()
+        with self._lock:
+            rows = self._conn.execute(
+                f'SELECT ip, organization FROM visitor_state WHERE {where} ORDER BY last_seen DESC LIMIT ?',
+                params + (limit,)
+            ).fetchall()
+        return [{'ip': ip, 'organization': organization or 'Unknown'} for ip, organization in rows]
+
+    def pending_count(self):
+        where, params = self._pending_where()
+        with self._lock:
+            return self._conn.execute(f'SELECT COUNT(*) FROM visitor_state WHERE {where}', params).fetchone()[0]
+
+    def mark_enriched(self, ip, error=None):
+        """Record a finished enrichment (error set when it found no company)"""
+        with self._lock:
+            self._conn.execute(
+                'UPDATE visitor_state SET enriched_at = ?, error = ? WHERE ip = ?', (time.time(), error, ip)
+            )
+
+    def mark_failed(self, ip, error):
+        """Record a transient failure; the visitor stays pending for the next run"""
+        with self._lock:
+            self._conn.execute('UPDATE visitor_state SET error = ? WHERE ip = ?', (error, ip))
+
+    def statuses(self, ips):
+        """Map each known IP to 'New', 'Analyzed' or 'Processed'"""
+        expired = time.time() - self.ttl
+        statuses = {}
+        ips = list(dict.fromkeys(ips))
+        with self._lock:
+            for start in range(0, len(ips), 500):  # Stay under SQLite's bound parameter limit
+                batch = ips[start:start + 500]
+                statuses.update(
+                    (ip, 'New' if enriched_at is None or enriched_at < expired else 'Processed' if error else 'Analyzed')
+                    for ip, enriched_at, error in self._conn.execute(
+                        f"SELECT ip, enriched_at, error FROM visitor_state WHERE ip IN ({','.join('?' * len(batch))})",
+                        batch
+                    )
+                )
+        return statuses
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def load_visitor_state(path=None):
+    """Open the visitor state tables shared by all workers"""
+    return VisitorState(path or VISITOR_STATE_PATH)
+
+
+def ingest_log(state, path, gap=VISITOR_SESSION_GAP):
+    """Record the visits in what was appended to an access log since the last run; returns how many were new
+
+    Reading resumes at the stored position unless the log was rotated or
+    truncated since, and the watermark advances block by block. A visit
+    cut by a block boundary or a run boundary is merged back by ingest.
+    Compressed logs can't be resumed: they are skipped while unchanged and
+    otherwise read whole, relying on ingest's dedupe. Another worker
+    ingesting the same log meanwhile moves the watermark, and this run
+    stops at the first block it recorded first.
+    """
+    _, position, identity = state.watermark(path)
+    since = (position, identity)
+    with open(path, 'rb') as f:
+        compressed = f.read(2) == b'\x1f\x8b'
+        stat = os.fstat(f.fileno())
+    new = 0
+
+    if compressed:
+        if (stat.st_ino, stat.st_size) == (identity, position):
+            return 0
+        with access_log.open_log(path) as log:
+            hits = access_log.iter_hits(log)
+            while True:
+                batch = visitor_sessions.hits_frame(itertools.islice(hits, INGEST_BATCH_HITS))
+                if not len(batch):
+                    break
+                # The watermark only moves once the whole file is read
+                visits = visitor_sessions.sessionize(batch, gap)
+                added = state.ingest(path, visits, position=position, identity=identity, gap=gap, since=since)
+                if added is None:
+                    return new
+                new += added
+        state.ingest(path, None, position=stat.st_size, identity=stat.st_ino, since=since)
+        return new
+
+    tailer = access_log.LogTailer(path, position=position, identity=identity)
+    try:
+        while True:
+            lines = tailer.read()
+            if not lines:
+                break
+            hits = visitor_sessions.hits_frame(access_log.iter_hits(io.BytesIO(lines)))
+            visits = visitor_sessions.sessionize(hits, gap)
+            added = state.ingest(
+                path, visits, position=tailer.consumed, identity=tailer.identity, gap=gap, since=since
+            )
+            if added is None:
+                break
+            new += added
+            since = (tailer.consumed, tailer.identity)
+    finally:
+        tailer.close()
+    return new
+
+
+def ingest_export(state, path, gap=VISITOR_SESSION_GAP):
+    """Record the visits in the rows appended to a visitor CSV export since the last run; returns how many were new"""
+    since = state.watermark(path)[1:]
+    new = 0
+    for chunk, position, identity in visitor_export.read_export_since(path, *since):
+        # A last row without a newline is recorded but the watermark stays before it until it's complete
+        if position is None:
+            position, identity = since
+        visits = visitor_sessions.sessionize(chunk, gap)
+        added = state.ingest(path, visits, position=position, identity=identity, gap=gap, since=since)
+        if added is None:
+            break  # Another worker recorded these rows first
+        new += added
+        since = (position, identity)
+    return new
+
+
+if __name__ == '__main__':
+    # Scheduled ingestion: python visitor_state.py [access.log | export.csv]
+    source = sys.argv[1] if len(sys.argv) > 1 else access_log.VISITOR_LOG_PATH or visitor_export.VISITOR_CSV_PATH
+    visitor_state = load_visitor_state()
+    start = time.perf_counter()
+    if source.endswith('.csv'):
+        added = ingest_export(visitor_state, source)
+    else:
+        added = ingest_log(visitor_state, source)
+    print(
+        f"{source}: {added:,} new visits in {time.perf_counter() - start:.2f}s, "
+        f"{visitor_state.pending_count():,} visitors pending enrichment"
+    )